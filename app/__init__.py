@@ -14,6 +14,9 @@ from flask import Flask, jsonify, request
 from flask_login import LoginManager
 from flask_mail import Mail
 from app.config import Config
+from app.utils.gevent_utils import init_gevent_db_driver
+from app.utils.pool_utils import init_db_pool
+from app.utils.replica_utils import RoutingSession, init_read_replica
 from sqlalchemy import MetaData
 import sentry_sdk
 from sentry_sdk.integrations.flask import FlaskIntegration
@@ -31,7 +34,8 @@ db = SQLAlchemy(
             "uq": "uq_%(table_name)s_%(column_0_name)s",
             "ck": "ck_%(table_name)s_%(column_0_name)s",
         }
-    )
+    ),
+    session_options={"class_": RoutingSession},
 )
 migrate = Migrate()
 mail = Mail()
@@ -69,6 +73,9 @@ def create_app():
     register_blueprints(app)
 
     # Initialize flask extension objects
+    init_gevent_db_driver(app)
+    init_db_pool(app, db)
+    init_read_replica(app)
     db.init_app(app)
     migrate.init_app(app, db)
     mail.init_app(app)
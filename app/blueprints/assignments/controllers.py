@@ -18,8 +18,6 @@ from app.blueprints.enumerators.queries import (
 )
 from app.blueprints.forms.models import Form
 from app.blueprints.locations.errors import InvalidGeoLevelHierarchyError
-from app.blueprints.locations.models import GeoLevel
-from app.blueprints.locations.utils import GeoLevelHierarchy
 from app.blueprints.mapping.errors import MappingError
 from app.blueprints.mapping.utils import SurveyorMapping, TargetMapping
 from app.blueprints.roles.utils import check_if_survey_admin, get_user_role
@@ -28,6 +26,8 @@ from app.blueprints.targets.models import Target, TargetStatus
 from app.blueprints.targets.queries import (
     build_bottom_level_locations_with_location_hierarchy_subquery,
 )
+from app.utils.replica_utils import use_read_replica
+from app.utils.survey_context import SurveyContext
 from app.utils.utils import (
     custom_permissions_required,
     logged_in_active_user_required,
@@ -64,6 +64,7 @@ from .validators import (
 @logged_in_active_user_required
 @validate_query_params(AssignmentsQueryParamValidator)
 @custom_permissions_required("READ Assignments", "query", "form_uid")
+@use_read_replica
 def view_assignments(validated_query_params):
     """
     Returns assignment information for a form and user
@@ -72,13 +73,15 @@ def view_assignments(validated_query_params):
     form_uid = validated_query_params.form_uid.data
     user_uid = current_user.user_uid
 
-    survey_uid = Form.query.filter_by(form_uid=form_uid).first().survey_uid
+    survey_context = SurveyContext.for_form(form_uid)
+    survey_uid = survey_context.survey_uid
 
     # Check if the form has Targets or Enumerators, if not return a response saying targets are empty or enumerators are empty
-    if (
-        Target.query.filter(Target.form_uid == form_uid).first() is None
-        and Enumerator.query.filter(Enumerator.form_uid == form_uid).first() is None
-    ):
+    targets_exist = Target.query.filter(Target.form_uid == form_uid).first() is not None
+    enumerators_exist = (
+        Enumerator.query.filter(Enumerator.form_uid == form_uid).first() is not None
+    )
+    if not targets_exist and not enumerators_exist:
         return (
             jsonify(
                 {
@@ -90,7 +93,7 @@ def view_assignments(validated_query_params):
             ),
             422,
         )
-    elif Target.query.filter(Target.form_uid == form_uid).first() is None:
+    elif not targets_exist:
         return (
             jsonify(
                 {
@@ -102,7 +105,7 @@ def view_assignments(validated_query_params):
             ),
             422,
         )
-    elif Enumerator.query.filter(Enumerator.form_uid == form_uid).first() is None:
+    elif not enumerators_exist:
         return (
             jsonify(
                 {
@@ -123,11 +126,8 @@ def view_assignments(validated_query_params):
         ).first()
         is not None
     ):
-        # Get the geo levels for the survey
-        geo_levels = GeoLevel.query.filter_by(survey_uid=survey_uid).all()
-
         try:
-            geo_level_hierarchy = GeoLevelHierarchy(geo_levels)
+            geo_level_hierarchy = survey_context.geo_level_hierarchy
         except InvalidGeoLevelHierarchyError as e:
             return (
                 jsonify(
@@ -318,7 +318,7 @@ def view_assignments_enumerators(validated_query_params):
     form_uid = validated_query_params.form_uid.data
     user_uid = current_user.user_uid
 
-    survey_uid = Form.query.filter_by(form_uid=form_uid).first().survey_uid
+    survey_uid = SurveyContext.for_form(form_uid).survey_uid
 
     # Get the mapping of surveyors to the smallest supervisor level
     # This is used filter out surveyors mapped to the current user
@@ -452,6 +452,11 @@ def view_assignments_enumerators(validated_query_params):
             )
         )
 
+    # Order explicitly so the response does not depend on the query plan
+    assignment_enumerators_query = assignment_enumerators_query.order_by(
+        Enumerator.enumerator_uid
+    )
+
     response = jsonify(
         {
             "success": True,
@@ -483,7 +488,8 @@ def view_assignments_targets(validated_query_params):
     form_uid = validated_query_params.form_uid.data
     user_uid = current_user.user_uid
 
-    survey_uid = Form.query.filter_by(form_uid=form_uid).first().survey_uid
+    survey_context = SurveyContext.for_form(form_uid)
+    survey_uid = survey_context.survey_uid
 
     # We need to get the bottom level geo level UID for the survey in order to join in the location information
     if (
@@ -492,11 +498,8 @@ def view_assignments_targets(validated_query_params):
         ).first()
         is not None
     ):
-        # Get the geo levels for the survey
-        geo_levels = GeoLevel.query.filter_by(survey_uid=survey_uid).all()
-
         try:
-            geo_level_hierarchy = GeoLevelHierarchy(geo_levels)
+            geo_level_hierarchy = survey_context.geo_level_hierarchy
         except InvalidGeoLevelHierarchyError as e:
             return (
                 jsonify(
@@ -671,7 +674,7 @@ def update_assignments(validated_payload):
     validate_mapping = validated_payload.validate_mapping.data
 
     user_uid = current_user.user_uid
-    survey_uid = Form.query.filter_by(form_uid=form_uid).first().survey_uid
+    survey_uid = SurveyContext.for_form(form_uid).survey_uid
 
     try:
         target_mapping = TargetMapping(form_uid)
@@ -20,4 +20,7 @@ class SurveyorAssignment(db.Model):
     user_uid = db.Column(db.Integer(), default=-1)
     to_delete = db.Column(db.Integer(), default=0, nullable=False)
 
-    __table_args__ = ({"schema": "webapp"},)
+    __table_args__ = (
+        db.Index("ix_surveyor_assignments_enumerator_uid", "enumerator_uid"),
+        {"schema": "webapp"},
+    )
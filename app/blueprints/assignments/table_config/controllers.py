@@ -2,20 +2,10 @@ from flask import jsonify
 from flask_login import current_user
 
 from app import db
-from app.blueprints.enumerators.models import EnumeratorColumnConfig
-from app.blueprints.forms.models import Form
 from app.blueprints.locations.errors import InvalidGeoLevelHierarchyError
-from app.blueprints.locations.models import GeoLevel
-from app.blueprints.locations.utils import GeoLevelHierarchy
 from app.blueprints.roles.errors import InvalidRoleHierarchyError
-from app.blueprints.roles.models import Role
-from app.blueprints.roles.utils import (
-    RoleHierarchy,
-    check_if_survey_admin,
-    get_user_role,
-)
-from app.blueprints.surveys.models import Survey
-from app.blueprints.targets.models import TargetColumnConfig
+from app.blueprints.roles.utils import check_if_survey_admin, get_user_role
+from app.utils.survey_context import SurveyContext
 from app.utils.utils import (
     custom_permissions_required,
     logged_in_active_user_required,
@@ -63,45 +53,32 @@ def get_table_config(validated_query_params):
     filter_supervisors = validated_query_params.filter_supervisors.data
 
     # Get the survey UID from the form UID
-    form = Form.query.filter_by(form_uid=form_uid).first()
+    survey_context = SurveyContext.for_form(form_uid)
 
-    if form is None:
+    if survey_context is None:
         return (
             jsonify(message=f"The form 'form_uid={form_uid}' could not be found."),
             404,
         )
 
-    survey_uid = form.survey_uid
+    survey_uid = survey_context.survey_uid
 
     # Figure out if we need to handle location columns
     enumerator_location_configured = False
     target_location_configured = False
 
-    result = TargetColumnConfig.query.filter(
-        TargetColumnConfig.form_uid == form_uid,
-        TargetColumnConfig.column_type == "location",
-    ).first()
-
-    if result is not None:
+    if survey_context.get_target_column_configs(form_uid, "location"):
         target_location_configured = True
 
-    result = EnumeratorColumnConfig.query.filter(
-        EnumeratorColumnConfig.form_uid == form_uid,
-        EnumeratorColumnConfig.column_type == "location",
-    ).first()
-
-    if result is not None:
+    if survey_context.get_enumerator_column_configs(form_uid, "location"):
         enumerator_location_configured = True
 
     geo_level_hierarchy = None
     prime_geo_level_uid = None
 
     if enumerator_location_configured or target_location_configured:
-        # Get the geo levels for the survey
-        geo_levels = GeoLevel.query.filter_by(survey_uid=survey_uid).all()
-
         try:
-            geo_level_hierarchy = GeoLevelHierarchy(geo_levels)
+            geo_level_hierarchy = survey_context.geo_level_hierarchy
         except InvalidGeoLevelHierarchyError as e:
             return (
                 jsonify(
@@ -116,9 +93,7 @@ def get_table_config(validated_query_params):
             )
 
     if enumerator_location_configured:
-        prime_geo_level_uid = (
-            Survey.query.filter_by(survey_uid=survey_uid).first().prime_geo_level_uid
-        )
+        prime_geo_level_uid = survey_context.prime_geo_level_uid
 
         if prime_geo_level_uid is None:
             return (
@@ -145,25 +120,20 @@ def get_table_config(validated_query_params):
                 422,
             )
 
-    role_hierarchy = None
-    roles = [
-        role.to_dict() for role in Role.query.filter_by(survey_uid=survey_uid).all()
-    ]
-    if len(roles) > 0:
-        try:
-            role_hierarchy = RoleHierarchy(roles)
-        except InvalidRoleHierarchyError as e:
-            return (
-                jsonify(
-                    {
-                        "success": False,
-                        "errors": {
-                            "role_hierarchy": e.role_hierarchy_errors,
-                        },
-                    }
-                ),
-                422,
-            )
+    try:
+        role_hierarchy = survey_context.role_hierarchy
+    except InvalidRoleHierarchyError as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "errors": {
+                        "role_hierarchy": e.role_hierarchy_errors,
+                    },
+                }
+            ),
+            422,
+        )
 
     user_level = None
     # If filter_supervisors flag is True, fetch logged in user's role to
@@ -276,46 +246,33 @@ def update_table_config(validated_payload):
     table_config = validated_payload.table_config.data
 
     # Get the survey UID from the form UID
-    form = Form.query.filter_by(form_uid=form_uid).first()
+    survey_context = SurveyContext.for_form(form_uid)
 
-    if form is None:
+    if survey_context is None:
         return (
             jsonify(message=f"The form 'form_uid={form_uid}' could not be found."),
             404,
         )
 
-    survey_uid = form.survey_uid
+    survey_uid = survey_context.survey_uid
 
     # Figure out if we need to handle location columns
 
     enumerator_location_configured = False
     target_location_configured = False
 
-    result = TargetColumnConfig.query.filter(
-        TargetColumnConfig.form_uid == form_uid,
-        TargetColumnConfig.column_type == "location",
-    ).first()
-
-    if result is not None:
+    if survey_context.get_target_column_configs(form_uid, "location"):
         target_location_configured = True
 
-    result = EnumeratorColumnConfig.query.filter(
-        EnumeratorColumnConfig.form_uid == form_uid,
-        EnumeratorColumnConfig.column_type == "location",
-    ).first()
-
-    if result is not None:
+    if survey_context.get_enumerator_column_configs(form_uid, "location"):
         enumerator_location_configured = True
 
     geo_level_hierarchy = None
     prime_geo_level_uid = None
 
     if enumerator_location_configured or target_location_configured:
-        # Get the geo levels for the survey
-        geo_levels = GeoLevel.query.filter_by(survey_uid=survey_uid).all()
-
         try:
-            geo_level_hierarchy = GeoLevelHierarchy(geo_levels)
+            geo_level_hierarchy = survey_context.geo_level_hierarchy
         except InvalidGeoLevelHierarchyError as e:
             return (
                 jsonify(
@@ -330,9 +287,7 @@ def update_table_config(validated_payload):
             )
 
     if enumerator_location_configured:
-        prime_geo_level_uid = (
-            Survey.query.filter_by(survey_uid=survey_uid).first().prime_geo_level_uid
-        )
+        prime_geo_level_uid = survey_context.prime_geo_level_uid
 
         if prime_geo_level_uid is None:
             return (
@@ -359,25 +314,20 @@ def update_table_config(validated_payload):
                 422,
             )
 
-    role_hierarchy = None
-    roles = [
-        role.to_dict() for role in Role.query.filter_by(survey_uid=survey_uid).all()
-    ]
-    if len(roles) > 0:
-        try:
-            role_hierarchy = RoleHierarchy(roles)
-        except InvalidRoleHierarchyError as e:
-            return (
-                jsonify(
-                    {
-                        "success": False,
-                        "errors": {
-                            "role_hierarchy": e.role_hierarchy_errors,
-                        },
-                    }
-                ),
-                422,
-            )
+    try:
+        role_hierarchy = survey_context.role_hierarchy
+    except InvalidRoleHierarchyError as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "errors": {
+                        "role_hierarchy": e.role_hierarchy_errors,
+                    },
+                }
+            ),
+            422,
+        )
 
     # Validate the table config
     try:
@@ -444,45 +394,32 @@ def get_available_columns(validated_query_params):
     form_uid = validated_query_params.form_uid.data
 
     # Get the survey UID from the form UID
-    form = Form.query.filter_by(form_uid=form_uid).first()
+    survey_context = SurveyContext.for_form(form_uid)
 
-    if form is None:
+    if survey_context is None:
         return (
             jsonify(message=f"The form 'form_uid={form_uid}' could not be found."),
             404,
         )
 
-    survey_uid = form.survey_uid
+    survey_uid = survey_context.survey_uid
 
     # Figure out if we need to handle location columns
     enumerator_location_configured = False
     target_location_configured = False
 
-    result = TargetColumnConfig.query.filter(
-        TargetColumnConfig.form_uid == form_uid,
-        TargetColumnConfig.column_type == "location",
-    ).first()
-
-    if result is not None:
+    if survey_context.get_target_column_configs(form_uid, "location"):
         target_location_configured = True
 
-    result = EnumeratorColumnConfig.query.filter(
-        EnumeratorColumnConfig.form_uid == form_uid,
-        EnumeratorColumnConfig.column_type == "location",
-    ).first()
-
-    if result is not None:
+    if survey_context.get_enumerator_column_configs(form_uid, "location"):
         enumerator_location_configured = True
 
     geo_level_hierarchy = None
     prime_geo_level_uid = None
 
     if enumerator_location_configured or target_location_configured:
-        # Get the geo levels for the survey
-        geo_levels = GeoLevel.query.filter_by(survey_uid=survey_uid).all()
-
         try:
-            geo_level_hierarchy = GeoLevelHierarchy(geo_levels)
+            geo_level_hierarchy = survey_context.geo_level_hierarchy
         except InvalidGeoLevelHierarchyError as e:
             return (
                 jsonify(
@@ -497,9 +434,7 @@ def get_available_columns(validated_query_params):
             )
 
     if enumerator_location_configured:
-        prime_geo_level_uid = (
-            Survey.query.filter_by(survey_uid=survey_uid).first().prime_geo_level_uid
-        )
+        prime_geo_level_uid = survey_context.prime_geo_level_uid
 
         if prime_geo_level_uid is None:
             return (
@@ -526,24 +461,20 @@ def get_available_columns(validated_query_params):
                 422,
             )
 
-    roles = [
-        role.to_dict() for role in Role.query.filter_by(survey_uid=survey_uid).all()
-    ]
-    if len(roles) > 0:
-        try:
-            role_hierarchy = RoleHierarchy(roles)
-        except InvalidRoleHierarchyError as e:
-            return (
-                jsonify(
-                    {
-                        "success": False,
-                        "errors": {
-                            "role_hierarchy": e.role_hierarchy_errors,
-                        },
-                    }
-                ),
-                422,
-            )
+    try:
+        role_hierarchy = survey_context.role_hierarchy
+    except InvalidRoleHierarchyError as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "errors": {
+                        "role_hierarchy": e.role_hierarchy_errors,
+                    },
+                }
+            ),
+            422,
+        )
 
     available_columns = AvailableColumns(
         form_uid,
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 
 from passlib.hash import pbkdf2_sha256
+from sqlalchemy.dialects.postgresql import ARRAY
 
 from app import db
 
@@ -12,7 +13,11 @@ class User(db.Model):
 
     __tablename__ = "users"
 
-    __table_args__ = {"schema": "webapp"}
+    __table_args__ = (
+        # GIN index for role containment filters (roles @> ARRAY[...])
+        db.Index("ix_users_roles", "roles", postgresql_using="gin"),
+        {"schema": "webapp"},
+    )
 
     user_uid = db.Column(db.Integer(), primary_key=True, autoincrement=True)
     email = db.Column(db.String(), unique=True, nullable=False)
@@ -28,7 +33,7 @@ class User(db.Model):
     active = db.Column(db.Boolean(), nullable=False, server_default="t")
 
     ## rbac fields
-    roles = db.Column(db.ARRAY(db.Integer), default=[], nullable=True)
+    roles = db.Column(ARRAY(db.Integer), default=[], nullable=True)
     is_super_admin = db.Column(db.Boolean, default=False, nullable=True)
     can_create_survey = db.Column(db.Boolean, default=False, nullable=True)
 
@@ -26,7 +26,12 @@ from .models import (
     DQLogicCheckAssertions,
     DQLogicCheckQuestions,
 )
-from .utils import validate_dq_check
+from .utils import (
+    build_scto_question_lookup,
+    load_dq_check_components,
+    refresh_dq_check_validity,
+    validate_dq_check,
+)
 from .validators import (
     BulkDQCheckValidator,
     DQChecksQueryParamValidator,
@@ -424,186 +429,109 @@ def get_dq_checks(validated_query_params):
         DQCheck.type_id == type_id,
     ).all()
 
-    scto_questions = SCTOQuestion.query.filter(SCTOQuestion.form_uid == form_uid).all()
-
+    # Fetch all the form definitions and check components needed in bulk
+    # The form definitions are only used to flag repeat group questions, the
+    # validity of each check is stored on the check
+    scto_form_uids = {form_uid}
     if type_id in [7, 8, 9]:
-        dq_scto_form_uids = list(set([check.dq_scto_form_uid for check in dq_checks]))
-        dq_scto_questions = SCTOQuestion.query.filter(
-            SCTOQuestion.form_uid.in_(dq_scto_form_uids)
-        ).all()
+        scto_form_uids.update(check.dq_scto_form_uid for check in dq_checks)
+    scto_question_lookup = build_scto_question_lookup(scto_form_uids)
+
+    check_filters, logic_check_questions, logic_check_assertions = (
+        load_dq_check_components(
+            [check.dq_check_uid for check in dq_checks],
+            include_logic_check_components=(type_id == 1),
+        )
+    )
 
     check_data = []
     for check in dq_checks:
         check_dict = check.to_dict()
 
-        # Initialize note and repeat group flag
-        check_dict["note"] = None
+        # Checks using questions that are not in the form definition are inactive
+        if not check.is_valid:
+            check_dict["active"] = False
+        check_dict["note"] = check.note
         check_dict["is_repeat_group"] = False
 
         if not check.all_questions:
-            # Check if questions are available in the form definition and if it is a repeat group variable
-            question_found = False
-            dq_question_found = False
-
-            if type_id not in [8, 9]:
-                for question in scto_questions:
-                    if question.question_name == check.question_name:
-                        question_found = True
-                        if question.is_repeat_group:
-                            check_dict["is_repeat_group"] = True
-                        else:
-                            check_dict["is_repeat_group"] = False
-                        break
-
-            if type_id in [7, 8, 9]:
-                for question in dq_scto_questions:
-                    if (
-                        question.question_name == check.question_name
-                        and question.form_uid == check.dq_scto_form_uid
-                    ):
-                        dq_question_found = True
-
-                        # Repeat group for mismatch check is set based on main form question
-                        if type_id in [8, 9]:
-                            if question.is_repeat_group:
-                                check_dict["is_repeat_group"] = True
-                            else:
-                                check_dict["is_repeat_group"] = False
-                        break
-
-            if not dq_question_found and type_id in [7, 8, 9]:
-                check_dict["active"] = False
-                check_dict["note"] = "Question not found in DQ form definition"
-
-            if not question_found and type_id not in [8, 9]:
-                check_dict["active"] = False
-                check_dict["note"] = "Question not found in form definition"
-
-        check_filters = DQCheckFilters.query.filter(
-            DQCheckFilters.dq_check_uid == check.dq_check_uid
-        ).all()
+            # Check if the question is a repeat group variable
+            # Repeat group for protocol and spotcheck checks is set based on DQ form question
+            if type_id in [8, 9]:
+                question = scto_question_lookup.get(
+                    (check.dq_scto_form_uid, check.question_name)
+                )
+            else:
+                question = scto_question_lookup.get((form_uid, check.question_name))
+
+            if question is not None:
+                check_dict["is_repeat_group"] = question.is_repeat_group
 
         filter_list = [
             {"filter_group": [filter.to_dict() for filter in filter_group]}
             for key, filter_group in groupby(
-                check_filters, key=attrgetter("filter_group_id")
+                check_filters[check.dq_check_uid], key=attrgetter("filter_group_id")
             )
         ]
 
-        # check if all questions used in filters are valid
         for filter_group in filter_list:
             for filter_item in filter_group["filter_group"]:
-                filter_question_found = False
-
                 if type_id not in [7, 8, 9]:
-                    for question in scto_questions:
-                        filter_item["is_repeat_group"] = False
-                        if question.question_name == filter_item["question_name"]:
-                            filter_question_found = True
-                            filter_item["is_repeat_group"] = question.is_repeat_group
-                            break
+                    filter_question = scto_question_lookup.get(
+                        (form_uid, filter_item["question_name"])
+                    )
+                    filter_item["is_repeat_group"] = False
                 else:
-                    for question in dq_scto_questions:
-                        if (
-                            question.question_name == filter_item["question_name"]
-                            and question.form_uid == check.dq_scto_form_uid
-                        ):
-                            filter_question_found = True
-                            filter_item["is_repeat_group"] = question.is_repeat_group
-                            break
-
-                if (
-                    not filter_question_found
-                    and filter_item["question_name"] != check.question_name
-                ):  # Check if the question is not the same as the main question
-                    check_dict["active"] = False
-                    check_dict["note"] = "Filter question not found in form definition"
+                    filter_question = scto_question_lookup.get(
+                        (check.dq_scto_form_uid, filter_item["question_name"])
+                    )
+
+                if filter_question is not None:
+                    filter_item["is_repeat_group"] = filter_question.is_repeat_group
 
         check_dict["filters"] = filter_list
 
-        # For logic checks, get the logic check questions and assertions
+        # For logic checks, add the logic check questions and assertions
         if type_id == 1:
-            logic_check_questions = DQLogicCheckQuestions.query.filter(
-                DQLogicCheckQuestions.dq_check_uid == check.dq_check_uid
-            ).all()
-
-            # Check if questions are available in the form definition
             logic_check_questions_list = []
-            for question in logic_check_questions:
-                logic_check_question_found = False
-                question_dict = question.to_dict()
-                question_dict["is_repeat_group"] = False
-
-                for question in scto_questions:
-                    if question.question_name == question_dict["question_name"]:
-                        question_dict["is_repeat_group"] = question.is_repeat_group
-                        logic_check_question_found = True
-                        break
-
-                if (
-                    not logic_check_question_found and question != check.question_name
-                ):  # Check if the question is not the same as the main question
-                    check_dict["active"] = False
-                    check_dict["note"] = (
-                        "Logic check question not found in form definition"
-                    )
-
+            for logic_check_question in logic_check_questions[check.dq_check_uid]:
+                question_dict = logic_check_question.to_dict()
+                question = scto_question_lookup.get(
+                    (form_uid, question_dict["question_name"])
+                )
+                question_dict["is_repeat_group"] = (
+                    question.is_repeat_group if question is not None else False
+                )
                 logic_check_questions_list.append(question_dict)
             check_dict["check_components"][
                 "logic_check_questions"
             ] = logic_check_questions_list
 
-            logic_check_assertions = DQLogicCheckAssertions.query.filter(
-                DQLogicCheckAssertions.dq_check_uid == check.dq_check_uid
-            ).all()
-
             assertions_list = [
                 {"assert_group": [assertion.to_dict() for assertion in assert_group]}
                 for key, assert_group in groupby(
-                    logic_check_assertions, key=attrgetter("assert_group_id")
+                    logic_check_assertions[check.dq_check_uid],
+                    key=attrgetter("assert_group_id"),
                 )
             ]
             check_dict["check_components"]["logic_check_assertions"] = assertions_list
 
-        # For GPS checks, check if gps_variable or grid_id are available in the form definition
+        # For GPS checks, add the repeat group flag of the gps_variable or grid_id
         if type_id == 10:
-            gps_variable = check_dict["check_components"].get("gps_variable")
-            grid_id = check_dict["check_components"].get("grid_id")
-
-            gps_check_questions = {}
-            if gps_variable:
-                gps_variable_found = False
-                gps_variable_is_repeat_group = False
-                for question in scto_questions:
-                    if question.question_name == gps_variable:
-                        gps_variable_found = True
-                        gps_variable_is_repeat_group = question.is_repeat_group
-
-                if not gps_variable_found:
-                    check_dict["active"] = False
-                    check_dict["note"] = "GPS variable not found in form definition"
-
-                check_dict["check_components"]["gps_variable"] = {
-                    "question_name": gps_variable,
-                    "is_repeat_group": gps_variable_is_repeat_group,
-                }
-
-            if grid_id:
-                grid_id_found = False
-                grid_id_is_repeat_group = False
-                for question in scto_questions:
-                    if question.question_name == grid_id:
-                        grid_id_found = True
-                        grid_id_is_repeat_group = question.is_repeat_group
-
-                if not grid_id_found:
-                    check_dict["active"] = False
-                    check_dict["note"] = "Grid ID not found in form definition"
-
-                check_dict["check_components"]["grid_id"] = {
-                    "question_name": grid_id,
-                    "is_repeat_group": grid_id_is_repeat_group,
-                }
+            for component_name in ["gps_variable", "grid_id"]:
+                component_question_name = check_dict["check_components"].get(
+                    component_name
+                )
+                if component_question_name:
+                    question = scto_question_lookup.get(
+                        (form_uid, component_question_name)
+                    )
+                    check_dict["check_components"][component_name] = {
+                        "question_name": component_question_name,
+                        "is_repeat_group": (
+                            question.is_repeat_group if question is not None else False
+                        ),
+                    }
 
         check_data.append(check_dict)
 
@@ -682,6 +610,8 @@ def add_dq_check(validated_payload):
     logic_check_questions = check_components.pop("logic_check_questions", None)
     logic_check_assertions = check_components.pop("logic_check_assertions", None)
 
+    created_dq_checks = []
+
     def create_dq_check(question_name=None):
         """Helper function to create DQ check and related records"""
         dq_check = DQCheck(
@@ -743,6 +673,8 @@ def add_dq_check(validated_payload):
                         )
                 db.session.flush()
 
+            created_dq_checks.append(dq_check)
+
         except Exception as e:
             db.session.rollback()
             return jsonify({"message": str(e), "success": False}), 500
@@ -754,6 +686,8 @@ def add_dq_check(validated_payload):
         for question_name in question_list:
             create_dq_check(question_name)
 
+    refresh_dq_check_validity(created_dq_checks)
+
     try:
         db.session.commit()
     except IntegrityError as e:
@@ -862,6 +796,8 @@ def update_dq_check(check_uid, validated_payload):
                     db.session.add(logic_check_assertion)
             db.session.flush()
 
+        refresh_dq_check_validity([dq_check])
+
     except Exception as e:
         db.session.rollback()
         return jsonify({"message": str(e), "success": False}), 500
@@ -894,52 +830,10 @@ def activate_dq_checks(validated_payload):
         DQCheck.dq_check_uid.in_(check_uids),
     ).all()
 
-    invalid_checks = []
-
-    for dq_check in dq_checks:
-        if type_id not in [8, 9]:
-            if not dq_check.all_questions:
-                # Check if the question is available in the form definition
-                scto_question = SCTOQuestion.query.filter(
-                    SCTOQuestion.form_uid == form_uid,
-                    SCTOQuestion.question_name == dq_check.question_name,
-                ).first()
-
-                if scto_question is None:
-                    invalid_checks.append(dq_check.dq_check_uid)
-                    continue
-
-        if type_id in [7, 8, 9]:
-            # Check if the question is available in the DQ form definition
-            scto_question = SCTOQuestion.query.filter(
-                SCTOQuestion.form_uid == dq_check.dq_scto_form_uid,
-                SCTOQuestion.question_name == dq_check.question_name,
-            ).first()
-
-            if scto_question is None:
-                invalid_checks.append(dq_check.dq_check_uid)
-                continue
-
-        filters = DQCheckFilters.query.filter(
-            DQCheckFilters.dq_check_uid == dq_check.dq_check_uid
-        ).all()
-
-        # Check if all questions used in filters are valid
-        for filter_item in filters:
-            if type_id not in [7, 8, 9]:
-                scto_question = SCTOQuestion.query.filter(
-                    SCTOQuestion.form_uid == form_uid,
-                    SCTOQuestion.question_name == filter_item.question_name,
-                ).first()
-            else:
-                scto_question = SCTOQuestion.query.filter(
-                    SCTOQuestion.form_uid == dq_check.dq_scto_form_uid,
-                    SCTOQuestion.question_name == filter_item.question_name,
-                ).first()
-
-            if scto_question is None:
-                invalid_checks.append(dq_check.dq_check_uid)
-                continue
+    # Validity is kept up to date by refresh_dq_check_validity
+    invalid_checks = [
+        dq_check.dq_check_uid for dq_check in dq_checks if not dq_check.is_valid
+    ]
 
     if len(invalid_checks) > 0:
         return (
@@ -73,7 +73,15 @@ class DQCheck(db.Model):
 
     active = db.Column(db.Boolean(), default=True, nullable=False)
 
-    __table_args__ = {"schema": "webapp"}
+    # Whether the questions used by the check exist in the form definitions
+    # Maintained by refresh_dq_check_validity when the check or a form definition changes
+    is_valid = db.Column(db.Boolean(), default=True, server_default="t", nullable=False)
+    note = db.Column(db.String(), nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_dq_checks_form_uid_type_id", "form_uid", "type_id"),
+        {"schema": "webapp"},
+    )
 
     def __init__(
         self,
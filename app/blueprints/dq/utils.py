@@ -1,5 +1,17 @@
+from collections import defaultdict
+
+from sqlalchemy import or_
+
+from app import db
 from app.blueprints.forms.models import Form, SCTOQuestion
 
+from .models import (
+    DQCheck,
+    DQCheckFilters,
+    DQLogicCheckAssertions,
+    DQLogicCheckQuestions,
+)
+
 
 def validate_dq_check(
     form_uid,
@@ -286,3 +298,174 @@ def validate_dq_check(
             )
 
     return True
+
+
+def build_scto_question_lookup(form_uids):
+    """
+    Function to fetch the SCTO questions for the given forms in one query and
+    index them by (form_uid, question_name)
+
+    The first question found for a name is kept, matching a linear scan
+    """
+
+    scto_question_lookup = {}
+    for question in SCTOQuestion.query.filter(
+        SCTOQuestion.form_uid.in_(form_uids)
+    ).all():
+        scto_question_lookup.setdefault(
+            (question.form_uid, question.question_name), question
+        )
+
+    return scto_question_lookup
+
+
+def load_dq_check_components(dq_check_uids, include_logic_check_components=False):
+    """
+    Function to fetch the filters, and optionally the logic check questions and
+    assertions, of the given DQ checks with one query per table
+
+    Returns three dictionaries keyed by dq_check_uid, each holding the records
+    of the check in the order they are returned by the database
+
+    """
+
+    check_filters = defaultdict(list)
+    logic_check_questions = defaultdict(list)
+    logic_check_assertions = defaultdict(list)
+
+    if not dq_check_uids:
+        return check_filters, logic_check_questions, logic_check_assertions
+
+    for check_filter in DQCheckFilters.query.filter(
+        DQCheckFilters.dq_check_uid.in_(dq_check_uids)
+    ).all():
+        check_filters[check_filter.dq_check_uid].append(check_filter)
+
+    if include_logic_check_components:
+        for question in DQLogicCheckQuestions.query.filter(
+            DQLogicCheckQuestions.dq_check_uid.in_(dq_check_uids)
+        ).all():
+            logic_check_questions[question.dq_check_uid].append(question)
+
+        for assertion in DQLogicCheckAssertions.query.filter(
+            DQLogicCheckAssertions.dq_check_uid.in_(dq_check_uids)
+        ).all():
+            logic_check_assertions[assertion.dq_check_uid].append(assertion)
+
+    return check_filters, logic_check_questions, logic_check_assertions
+
+
+def get_dq_check_validity_note(
+    dq_check, check_filters, logic_check_questions, scto_question_lookup
+):
+    """
+    Function to get the reason a DQ check is invalid because a question it uses
+    is not found in the form definitions, or None if the check is valid
+
+    When several questions are missing, the last rule that fails sets the note
+
+    """
+
+    type_id = dq_check.type_id
+    note = None
+
+    if not dq_check.all_questions:
+        if (
+            type_id in [7, 8, 9]
+            and (dq_check.dq_scto_form_uid, dq_check.question_name)
+            not in scto_question_lookup
+        ):
+            note = "Question not found in DQ form definition"
+
+        if (
+            type_id not in [8, 9]
+            and (dq_check.form_uid, dq_check.question_name) not in scto_question_lookup
+        ):
+            note = "Question not found in form definition"
+
+    # For mismatch (7), protocol (8) and spotcheck (9), filter questions are from the DQ form
+    filter_form_uid = (
+        dq_check.dq_scto_form_uid if type_id in [7, 8, 9] else dq_check.form_uid
+    )
+    for check_filter in check_filters:
+        filter_question_key = (filter_form_uid, check_filter.question_name)
+        if (
+            filter_question_key not in scto_question_lookup
+            and check_filter.question_name != dq_check.question_name
+        ):  # Check if the question is not the same as the main question
+            note = "Filter question not found in form definition"
+
+    if type_id == 1:
+        for question in logic_check_questions:
+            if (dq_check.form_uid, question.question_name) not in scto_question_lookup:
+                note = "Logic check question not found in form definition"
+
+    if type_id == 10:
+        gps_variable = dq_check.check_components.get("gps_variable")
+        grid_id = dq_check.check_components.get("grid_id")
+
+        if (
+            gps_variable
+            and (dq_check.form_uid, gps_variable) not in scto_question_lookup
+        ):
+            note = "GPS variable not found in form definition"
+
+        if grid_id and (dq_check.form_uid, grid_id) not in scto_question_lookup:
+            note = "Grid ID not found in form definition"
+
+    return note
+
+
+def refresh_dq_check_validity(dq_checks):
+    """
+    Function to recompute and store the validity of the given DQ checks in bulk
+
+    Needs to be called whenever a check or a form definition used by it changes.
+    The caller is responsible for committing the session
+
+    """
+
+    if not dq_checks:
+        return
+
+    scto_form_uids = set()
+    for dq_check in dq_checks:
+        scto_form_uids.add(dq_check.form_uid)
+        if dq_check.dq_scto_form_uid is not None:
+            scto_form_uids.add(dq_check.dq_scto_form_uid)
+    scto_question_lookup = build_scto_question_lookup(scto_form_uids)
+
+    check_filters, logic_check_questions, _ = load_dq_check_components(
+        [dq_check.dq_check_uid for dq_check in dq_checks],
+        include_logic_check_components=any(
+            dq_check.type_id == 1 for dq_check in dq_checks
+        ),
+    )
+
+    for dq_check in dq_checks:
+        note = get_dq_check_validity_note(
+            dq_check,
+            check_filters[dq_check.dq_check_uid],
+            logic_check_questions[dq_check.dq_check_uid],
+            scto_question_lookup,
+        )
+        dq_check.is_valid = note is None
+        dq_check.note = note
+
+    db.session.flush()
+
+
+def refresh_form_dq_check_validity(form_uid):
+    """
+    Function to refresh the validity of all DQ checks that use the given form,
+    either as the main form or as the DQ form
+
+    Called after the form definition of the form is loaded or deleted
+
+    """
+
+    dq_checks = DQCheck.query.filter(
+        or_(DQCheck.form_uid == form_uid, DQCheck.dq_scto_form_uid == form_uid)
+    ).all()
+
+    refresh_dq_check_validity(dq_checks)
@@ -8,10 +8,12 @@ from sqlalchemy.sql.functions import func
 from app import db
 from app.blueprints.enumerators.models import Enumerator
 from app.blueprints.forms.models import Form
+from app.blueprints.mapping.errors import MappingError
 from app.utils.google_sheet_utils import (
     google_sheet_helpers,
     load_google_service_account_credentials,
 )
+from app.utils.replica_utils import use_read_replica
 from app.utils.utils import (
     custom_permissions_required,
     logged_in_active_user_required,
@@ -22,6 +24,7 @@ from app.utils.utils import (
 )
 
 from . import emails_bp
+from .errors import InvalidEmailColumnCatalogError
 from .models import (
     EmailConfig,
     EmailDeliveryReport,
@@ -39,6 +42,8 @@ from .utils import (
     get_default_email_assignments_column,
     get_default_email_variable_names,
     get_surveyor_details,
+    insert_email_templates,
+    load_email_config_details,
 )
 from .validators import (
     EmailConfigQueryParamValidator,
@@ -129,26 +134,22 @@ def create_email_config(validated_payload):
 def get_email_details(validated_query_params):
     """Function to get email configs per form including schedules and template details"""
     form_uid = validated_query_params.form_uid.data
-    # Query to get email configs including related schedules and templates
-    email_configs = (
-        EmailConfig.query.outerjoin(
-            EmailSchedule,
-            EmailConfig.email_config_uid == EmailSchedule.email_config_uid,
-        )
-        .outerjoin(
-            EmailTemplate,
-            EmailConfig.email_config_uid == EmailTemplate.email_config_uid,
-        )
-        .outerjoin(
-            ManualEmailTrigger,
-            EmailConfig.email_config_uid == ManualEmailTrigger.email_config_uid,
+
+    try:
+        config_data = load_email_config_details(form_uid)
+    except InvalidEmailColumnCatalogError as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "errors": e.email_column_catalog_errors,
+                }
+            ),
+            422,
         )
-        .filter(EmailConfig.form_uid == form_uid)
-        .all()
-    )
 
     # Return 404 if no email configs found
-    if not email_configs:
+    if not config_data:
         return (
             jsonify(
                 {
@@ -160,53 +161,6 @@ def get_email_details(validated_query_params):
             404,
         )
 
-    # Process and structure the config data
-    config_data = []
-    for email_config in email_configs:
-        email_config_dict = email_config.to_dict()
-        email_config_dict[
-            "email_source_columns"
-        ] = email_config.email_source_columns + get_default_email_variable_names(
-            form_uid
-        )
-        config_data.append(
-            {
-                **email_config_dict,
-                "schedules": [
-                    {
-                        **schedule.to_dict(),
-                        "filter_list": [
-                            {
-                                "table_name": table_name,
-                                "filter_list": [
-                                    {
-                                        "filter_group": [
-                                            filter.to_dict() for filter in filter_group
-                                        ]
-                                    }
-                                    for key, filter_group in groupby(
-                                        table, key=attrgetter("filter_group_id")
-                                    )
-                                ],
-                            }
-                            for table_name, table in groupby(
-                                EmailScheduleFilter.query.filter_by(
-                                    email_schedule_uid=schedule.email_schedule_uid
-                                ).all(),
-                                key=attrgetter("table_name"),
-                            )
-                        ],
-                    }
-                    for schedule in email_config.schedules
-                ],
-                "templates": [
-                    template.to_dict() for template in email_config.templates
-                ],
-                "manual_triggers": [
-                    trigger.to_dict() for trigger in email_config.manual_triggers
-                ],
-            }
-        )
     # Return the response
     response = jsonify(
         {
@@ -240,13 +194,24 @@ def get_email_configs(validated_query_params):
             404,
         )
 
+    try:
+        default_variables = get_default_email_variable_names(form_uid)
+    except InvalidEmailColumnCatalogError as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "errors": e.email_column_catalog_errors,
+                }
+            ),
+            422,
+        )
+
     config_data = []
     for email_config in email_configs:
         email_config_dict = email_config.to_dict()
-        email_config_dict[
-            "email_source_columns"
-        ] = email_config.email_source_columns + get_default_email_variable_names(
-            form_uid
+        email_config_dict["email_source_columns"] = (
+            email_config.email_source_columns + default_variables
         )
 
         config_data.append(email_config_dict)
@@ -282,11 +247,22 @@ def get_email_config(email_config_uid):
             404,
         )
 
+    try:
+        default_variables = get_default_email_variable_names(email_config.form_uid)
+    except InvalidEmailColumnCatalogError as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "errors": e.email_column_catalog_errors,
+                }
+            ),
+            422,
+        )
+
     email_config_dict = email_config.to_dict()
-    email_config_dict[
-        "email_source_columns"
-    ] = email_config.email_source_columns + get_default_email_variable_names(
-        email_config.form_uid
+    email_config_dict["email_source_columns"] = (
+        email_config.email_source_columns + default_variables
     )
 
     response = jsonify(
@@ -331,7 +307,19 @@ def update_email_config(email_config_uid, validated_payload):
     )
 
     # Avoid updating default column names with source columns
-    default_variables = get_default_email_variable_names(email_config.form_uid)
+    try:
+        default_variables = get_default_email_variable_names(email_config.form_uid)
+    except InvalidEmailColumnCatalogError as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "errors": e.email_column_catalog_errors,
+                }
+            ),
+            422,
+        )
+
     email_config.email_source_columns = [
         column
         for column in validated_payload.email_source_columns.data
@@ -942,11 +930,11 @@ def create_email_template(validated_payload):
             .first()
         ).form_uid
         update_module_status(15, form_uid=form_uid)
-        
+
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
-    
+
     return (
         jsonify(
             {
@@ -965,26 +953,24 @@ def create_email_template(validated_payload):
 @custom_permissions_required("WRITE Emails", "body", "email_config_uid")
 def create_email_template_bulk(validated_payload):
     """
-    Function to create an email template
+    Function to create email templates in bulk
     """
-    template_list = []
     email_config_uid = validated_payload.email_config_uid.data
-    for template in validated_payload.templates.data:
-        template_values = {
-            "email_config_uid": email_config_uid,
-            "subject": template.get("subject"),
-            "language": template.get("language"),
-            "content": template.get("content"),
-        }
-        language = template.get("language")
-
-        # Check if the email template already exists
-        check_email_template_exists = EmailTemplate.query.filter_by(
-            email_config_uid=email_config_uid,
-            language=language,
-        ).first()
+    templates = validated_payload.templates.data
+
+    # Check if any of the email templates already exist or are repeated in the payload
+    languages = [template.get("language") for template in templates]
+    existing_languages = {
+        row.language
+        for row in db.session.query(EmailTemplate.language).filter(
+            EmailTemplate.email_config_uid == email_config_uid,
+            EmailTemplate.language.in_(languages),
+        )
+    }
 
-        if check_email_template_exists is not None:
+    seen_languages = set()
+    for language in languages:
+        if language in existing_languages or language in seen_languages:
             return (
                 jsonify(
                     {
@@ -993,66 +979,13 @@ def create_email_template_bulk(validated_payload):
                 ),
                 400,
             )
+        seen_languages.add(language)
 
-        new_template = EmailTemplate(**template_values)
-
-        try:
-            db.session.add(new_template)
-            db.session.flush()
-        except Exception as e:
-            db.session.rollback()
-            return jsonify({"error": f"For language {language} " + str(e)}), 500
-
-        template_list.append(new_template)
-        # Upload Template Variables & tables
-        try:
-            for variable in template.get("variable_list", []):
-                variable_obj = EmailTemplateVariable(
-                    email_template_uid=new_template.email_template_uid,
-                    variable_name=variable.get("variable_name"),
-                    variable_expression=variable.get("variable_expression"),
-                )
-                db.session.add(variable_obj)
-            db.session.flush()
-        except Exception as e:
-            db.session.rollback()
-            return jsonify({"error": f"For language {language} " + str(e)}), 500
-
-        try:
-            for table in template.get("table_list", []):
-                table_obj = EmailTemplateTable(
-                    email_template_uid=new_template.email_template_uid,
-                    table_name=table.get("table_name"),
-                    column_mapping=table.get("column_mapping"),
-                    sort_list=table.get("sort_list"),
-                    variable_name=table.get("variable_name"),
-                )
-                db.session.add(table_obj)
-                db.session.flush()
-
-                table_uid = table_obj.email_template_table_uid
-                # Get the max filter group id
-                max_filter_group_id = 0
-
-                # Upload Filter List
-                for filter_group in table.get("filter_list", []):
-                    max_filter_group_id += 1
-
-                    for filter_item in filter_group.get("filter_group"):
-                        filter_obj = EmailTableFilter(
-                            email_template_table_uid=table_uid,
-                            filter_group_id=max_filter_group_id,
-                            filter_variable=filter_item.get("filter_variable"),
-                            filter_operator=filter_item.get("filter_operator"),
-                            filter_value=filter_item.get("filter_value"),
-                        )
-                        db.session.add(filter_obj)
-                db.session.flush()
-            db.session.commit()
-
-        except Exception as e:
-            db.session.rollback()
-            return jsonify({"error": f"For language {language} " + str(e)}), 500
+    try:
+        template_list = insert_email_templates(email_config_uid, templates)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
 
     try:
         # Get form_uid for updating module status
@@ -1061,18 +994,20 @@ def create_email_template_bulk(validated_payload):
             .filter_by(email_config_uid=email_config_uid)
             .first()
         ).form_uid
+
+        # This commits the templates together with the module status
         update_module_status(15, form_uid=form_uid)
 
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
-    
+
     return (
         jsonify(
             {
                 "success": True,
                 "message": "Email template created successfully",
-                "data": [new_template.to_dict() for new_template in template_list],
+                "data": template_list,
             }
         ),
         201,
@@ -1490,6 +1425,17 @@ def get_email_tablecatalog(validated_query_params):
             200,
         )
 
+    except InvalidEmailColumnCatalogError as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "errors": e.email_column_catalog_errors,
+                }
+            ),
+            422,
+        )
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1627,6 +1573,7 @@ def load_email_schedule_delivery_reports(validated_payload):
 @logged_in_active_user_required
 @validate_query_params(EmailDeliveryReportQueryValidator)
 @custom_permissions_required("READ Emails", "query", "email_config_uid")
+@use_read_replica
 def get_email_schedule_report(validated_query_params):
     """Function to get email delivery report for email schedule or trigger"""
 
@@ -1634,18 +1581,22 @@ def get_email_schedule_report(validated_query_params):
     form_uid = EmailConfig.query.get_or_404(email_config_uid).form_uid
 
     slot_type = validated_query_params.slot_type.data
+    from_date = validated_query_params.from_date.data
+    to_date = validated_query_params.to_date.data
+    page = validated_query_params.page.data
+    per_page = validated_query_params.per_page.data
 
     if slot_type == "schedule":
         email_schedule_uid = validated_query_params.email_schedule_uid.data
-        email_delivery_reports = EmailDeliveryReport.query.filter_by(
+        email_delivery_reports_query = EmailDeliveryReport.query.filter_by(
             email_schedule_uid=email_schedule_uid
-        ).all()
+        )
 
     elif slot_type == "trigger":
         manual_email_trigger_uid = validated_query_params.manual_email_trigger_uid.data
-        email_delivery_reports = EmailDeliveryReport.query.filter_by(
+        email_delivery_reports_query = EmailDeliveryReport.query.filter_by(
             manual_email_trigger_uid=manual_email_trigger_uid
-        ).all()
+        )
 
     else:
         return (
@@ -1658,50 +1609,76 @@ def get_email_schedule_report(validated_query_params):
             ),
             404,
         )
-    if email_delivery_reports is None:
+
+    if from_date is not None:
+        email_delivery_reports_query = email_delivery_reports_query.filter(
+            EmailDeliveryReport.slot_date >= from_date
+        )
+    if to_date is not None:
+        email_delivery_reports_query = email_delivery_reports_query.filter(
+            EmailDeliveryReport.slot_date <= to_date
+        )
+
+    email_delivery_reports_query = email_delivery_reports_query.order_by(
+        EmailDeliveryReport.slot_date,
+        EmailDeliveryReport.slot_time,
+        EmailDeliveryReport.email_delivery_report_uid,
+    )
+
+    # Check if we need to paginate the results
+    pagination = None
+    if page is not None and per_page is not None:
+        email_delivery_reports_page = email_delivery_reports_query.paginate(
+            page=page, per_page=per_page
+        )
+        email_delivery_reports = email_delivery_reports_page.items
+        pagination = {
+            "count": email_delivery_reports_page.total,
+            "page": page,
+            "per_page": per_page,
+            "pages": email_delivery_reports_page.pages,
+        }
+    else:
+        email_delivery_reports = email_delivery_reports_query.all()
+
+    try:
+        surveyor_details = get_surveyor_details(
+            form_uid,
+            [
+                email_delivery_report.email_delivery_report_uid
+                for email_delivery_report in email_delivery_reports
+            ],
+        )
+    except MappingError as e:
         return (
             jsonify(
                 {
                     "success": False,
-                    "data": None,
-                    "message": "Email delivery reports not found",
+                    "errors": {
+                        "mapping_errors": e.mapping_errors,
+                    },
                 }
             ),
-            404,
+            422,
         )
 
-    else:
-        result = []
-        for email_delivery_report in email_delivery_reports:
-            email_delivery_report_dict = email_delivery_report.to_dict()
-            email_enumerator_status = get_surveyor_details(
-                form_uid, email_delivery_report.email_delivery_report_uid
-            )
+    result = []
+    for email_delivery_report in email_delivery_reports:
+        email_delivery_report_dict = email_delivery_report.to_dict()
+        email_delivery_report_dict["enumerator_status"] = surveyor_details[
+            email_delivery_report.email_delivery_report_uid
+        ]
 
-            email_delivery_report_dict["enumerator_status"] = [
-                {
-                    "enumerator_id": enum[0],
-                    "enumerator_name": enum[1],
-                    "enumerator_email": enum[2],
-                    "supervisor_name": enum[3],
-                    "supervisor_email": enum[4],
-                    "status": enum[5],
-                    "error_message": enum[6],
-                }
-                for enum in email_enumerator_status
-            ]
+        result.append(email_delivery_report_dict)
 
-            result.append(email_delivery_report_dict)
+    response = {
+        "success": True,
+        "data": result,
+    }
+    if pagination is not None:
+        response["pagination"] = pagination
 
-        return (
-            jsonify(
-                {
-                    "success": True,
-                    "data": result,
-                }
-            ),
-            200,
-        )
+    return jsonify(response), 200
 
 
 @emails_bp.route("/tablecatalog/schedules", methods=["GET"])
@@ -1803,5 +1780,16 @@ def get_email_tablecatalog_schedule_filters(validated_query_params):
             200,
         )
 
+    except InvalidEmailColumnCatalogError as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "errors": e.email_column_catalog_errors,
+                }
+            ),
+            422,
+        )
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,3 @@
+class InvalidEmailColumnCatalogError(Exception):
+    def __init__(self, email_column_catalog_errors):
+        self.email_column_catalog_errors = email_column_catalog_errors
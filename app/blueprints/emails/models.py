@@ -248,10 +248,12 @@ class EmailTemplate(db.Model):
         self.language = language
         self.email_config_uid = email_config_uid
 
-    def to_dict(self):
-        email_template_variables = EmailTemplateVariable.query.filter_by(
-            email_template_uid=self.email_template_uid
-        ).all()
+    def to_dict(self, email_template_variables=None):
+        # The variables can be passed in when they were loaded in bulk
+        if email_template_variables is None:
+            email_template_variables = EmailTemplateVariable.query.filter_by(
+                email_template_uid=self.email_template_uid
+            ).all()
         return {
             "email_template_uid": self.email_template_uid,
             "subject": self.subject,
@@ -1,5 +1,8 @@
-from flask import jsonify
-from sqlalchemy import Integer, column, select
+import threading
+from collections import defaultdict
+
+from sqlalchemy import Integer, column, func, insert, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.sql import Values
 
 from app import db
@@ -12,213 +15,409 @@ from app.blueprints.enumerators.models import (
 from app.blueprints.forms.models import Form
 from app.blueprints.locations.errors import InvalidGeoLevelHierarchyError
 from app.blueprints.locations.models import GeoLevel
-from app.blueprints.locations.utils import GeoLevelHierarchy
-from app.blueprints.mapping.errors import MappingError
 from app.blueprints.mapping.utils import SurveyorMapping
 from app.blueprints.surveys.models import Survey
 from app.blueprints.targets.models import TargetColumnConfig
 from app.blueprints.user_management.models import User
+from app.utils.survey_context import SurveyContext
+
+from .errors import InvalidEmailColumnCatalogError
+from .models import (
+    EmailConfig,
+    EmailEnumeratorDeliveryStatus,
+    EmailSchedule,
+    EmailScheduleFilter,
+    EmailTableFilter,
+    EmailTemplate,
+    EmailTemplateTable,
+    EmailTemplateVariable,
+    ManualEmailTrigger,
+)
 
-from .models import EmailEnumeratorDeliveryStatus
-
-
-def get_default_email_assignments_column(form_uid):
+# Columns of the default Assignments email table that do not depend on the form config
+DEFAULT_EMAIL_ASSIGNMENTS_COLUMNS = [
+    {
+        "column_description": "Enumerators : name",
+        "column_name": "Surveyor Name",
+    },
+    {
+        "column_description": "Enumerators : enumerator_id",
+        "column_name": "Surveyor ID",
+    },
+    {
+        "column_description": "Enumerators : gender",
+        "column_name": "Surveyor Gender",
+    },
+    {
+        "column_description": "Enumerators : language",
+        "column_name": "Surveyor Language",
+    },
+    {
+        "column_description": "Enumerators : email",
+        "column_name": "Surveyor Email",
+    },
+    {
+        "column_description": "Enumerators : mobile_primary",
+        "column_name": "Surveyor Mobile",
+    },
+    {
+        "column_description": "Targets: target_id",
+        "column_name": "Target ID",
+    },
+    {
+        "column_description": "Targets: gender",
+        "column_name": "Gender",
+    },
+    {
+        "column_description": "Targets: language",
+        "column_name": "Language",
+    },
+    {
+        "column_description": "Target_Status: final_survey_status_label",
+        "column_name": "Final Survey Status",
+    },
+    {
+        "column_description": "Target_Status: final_survey_status",
+        "column_name": "Final Survey Status Code",
+    },
+    {
+        "column_description": "Target_Status: revisit_sections",
+        "column_name": "Revisit Sections",
+    },
+    {
+        "column_description": "Target_Status: num_attempts",
+        "column_name": "Total Attempts",
+    },
+    {
+        "column_description": "Target_Status: refusal_flag",
+        "column_name": "Refused",
+    },
+    {
+        "column_description": "Target_Status: completed_flag",
+        "column_name": "Completed",
+    },
+]
+
+# Email variables available for every form
+DEFAULT_EMAIL_VARIABLE_NAMES = [
+    "Surveyor Name",
+    "Surveyor Email",
+    "Surveyor Language",
+    "Surveyor ID",
+    "Assignment Date",
+    "Survey Name",
+    "Schedule Name",
+    "Config Name",
+    "SCTO Form ID",
+]
+
+
+class EmailColumnCatalog:
     """
-    Create a list of columns for the default Assignments email table.
+    Class to represent the default email columns and variables of a form
 
-    Args:
-        form_uid: Form UID
-
-    Returns:
-        list: List of columns
+    The catalog is built from the target and enumerator column configs of the
+    form and the geo level hierarchy and prime geo level of its survey. If the
+    location configuration is invalid, the errors are kept on the catalog and
+    raised as InvalidEmailColumnCatalogError when the affected list is accessed.
     """
 
-    default_column_list = []
+    def __init__(self, form_uid):
+        self.form_uid = form_uid
 
-    survey_uid = Form.query.filter_by(form_uid=form_uid).first().survey_uid
+        self.__assignments_columns = []
+        self.__variable_names = []
+        self.__assignments_columns_errors = None
+        self.__variable_names_errors = None
 
-    enumerator_location_configured = False
-    target_location_configured = False
+        self.__build()
 
-    result = TargetColumnConfig.query.filter(
-        TargetColumnConfig.form_uid == form_uid,
-        TargetColumnConfig.column_type == "location",
-    ).first()
+    @property
+    def assignments_columns(self):
+        """
+        List of columns for the default Assignments email table
+        """
 
-    if result is not None:
-        target_location_configured = True
+        if self.__assignments_columns_errors is not None:
+            raise InvalidEmailColumnCatalogError(self.__assignments_columns_errors)
 
-    result = EnumeratorColumnConfig.query.filter(
-        EnumeratorColumnConfig.form_uid == form_uid,
-        EnumeratorColumnConfig.column_type == "location",
-    ).first()
+        return [dict(column) for column in self.__assignments_columns]
 
-    if result is not None:
-        enumerator_location_configured = True
+    @property
+    def variable_names(self):
+        """
+        List of default email variable names
+        """
 
-    geo_level_hierarchy = None
-    prime_geo_level_uid = None
+        if self.__variable_names_errors is not None:
+            raise InvalidEmailColumnCatalogError(self.__variable_names_errors)
 
-    if enumerator_location_configured or target_location_configured:
-        # Get the geo levels for the survey
-        geo_levels = GeoLevel.query.filter_by(survey_uid=survey_uid).all()
+        return list(self.__variable_names)
 
-        try:
-            geo_level_hierarchy = GeoLevelHierarchy(geo_levels)
-        except InvalidGeoLevelHierarchyError as e:
-            return (
-                jsonify(
-                    {
-                        "success": False,
-                        "errors": {
-                            "geo_level_hierarchy": e.geo_level_hierarchy_errors,
-                        },
-                    }
-                ),
-                422,
-            )
+    def __build(self):
+        survey_context = SurveyContext.for_form(self.form_uid)
+
+        target_column_configs = [
+            row
+            for row in survey_context.get_target_column_configs(self.form_uid)
+            if row.column_type in ["location", "custom_fields"]
+        ]
+        enumerator_column_configs = [
+            row
+            for row in survey_context.get_enumerator_column_configs(self.form_uid)
+            if row.column_type in ["location", "custom_fields"]
+        ]
 
-    if enumerator_location_configured:
-        prime_geo_level_uid = (
-            Survey.query.filter_by(survey_uid=survey_uid).first().prime_geo_level_uid
+        target_location_configured = any(
+            row.column_type == "location" for row in target_column_configs
+        )
+        enumerator_location_configured = any(
+            row.column_type == "location" for row in enumerator_column_configs
         )
 
-        if prime_geo_level_uid is None:
-            return (
-                jsonify(
+        ordered_geo_levels = []
+        location_errors = None
+        prime_geo_level_errors = None
+        prime_geo_level_uid = None
+
+        if enumerator_location_configured or target_location_configured:
+            try:
+                ordered_geo_levels = (
+                    survey_context.geo_level_hierarchy.ordered_geo_levels
+                )
+            except InvalidGeoLevelHierarchyError as e:
+                location_errors = {
+                    "geo_level_hierarchy": e.geo_level_hierarchy_errors,
+                }
+
+        if enumerator_location_configured and location_errors is None:
+            prime_geo_level_uid = survey_context.prime_geo_level_uid
+
+            if prime_geo_level_uid is None:
+                prime_geo_level_errors = "The prime_geo_level_uid is not configured for this survey but is found as a column in the enumerator_column_config table."
+            elif prime_geo_level_uid not in [
+                geo_level.geo_level_uid for geo_level in ordered_geo_levels
+            ]:
+                prime_geo_level_errors = f"The prime_geo_level_uid '{prime_geo_level_uid}' is not in the location type hierarchy for this survey."
+
+        # Assignments table columns
+        self.__assignments_columns_errors = location_errors or prime_geo_level_errors
+
+        location_columns = []
+        if target_location_configured and location_errors is None:
+            for geo_level in ordered_geo_levels:
+                location_columns.append(
                     {
-                        "success": False,
-                        "errors": "The prime_geo_level_uid is not configured for this survey but is found as a column in the enumerator_column_config table.",
+                        "column_description": f"Locations : {geo_level.geo_level_name}_id",
+                        "column_name": f"{geo_level.geo_level_name} ID",
                     }
-                ),
-                422,
-            )
-
-        if prime_geo_level_uid not in [
-            geo_level.geo_level_uid
-            for geo_level in geo_level_hierarchy.ordered_geo_levels
-        ]:
-            return (
-                jsonify(
+                )
+                location_columns.append(
                     {
-                        "success": False,
-                        "errors": f"The prime_geo_level_uid '{prime_geo_level_uid}' is not in the location type hierarchy for this survey.",
+                        "column_description": f"Locations : {geo_level.geo_level_name}_name",
+                        "column_name": f"{geo_level.geo_level_name} Name",
                     }
-                ),
-                422,
-            )
-    location_column_list = []
-    if target_location_configured:
-        for i, geo_level in enumerate(geo_level_hierarchy.ordered_geo_levels):
-            location_column_list.append(
-                {
-                    "column_description": f"Locations : {geo_level.geo_level_name}_id",
-                    "column_name": f"{geo_level.geo_level_name} ID",
-                }
-            )
-            location_column_list.append(
-                {
-                    "column_description": f"Locations : {geo_level.geo_level_name}_name",
-                    "column_name": f"{geo_level.geo_level_name} Name",
-                }
-            )
-
-    result = TargetColumnConfig.query.filter(
-        TargetColumnConfig.form_uid == form_uid,
-        TargetColumnConfig.column_type == "custom_fields",
-    ).all()
+                )
 
-    target_custom_fields = []
-    for row in result:
-        target_custom_fields.append(
+        target_custom_fields = [
             {
                 "column_description": f"Targets: custom_fields['{row.column_name}']",
                 "column_name": "Targets: " + row.column_name,
             }
-        )
-
-    result = EnumeratorColumnConfig.query.filter(
-        EnumeratorColumnConfig.form_uid == form_uid,
-        EnumeratorColumnConfig.column_type == "custom_fields",
-    ).all()
-
-    enumerator_custom_fields = []
-    for row in result:
-        enumerator_custom_fields.append(
+            for row in target_column_configs
+            if row.column_type == "custom_fields"
+        ]
+        enumerator_custom_fields = [
             {
                 "column_description": f"Enumerators: custom_fields['{row.column_name}']",
                 "column_name": "Enumerators: " + row.column_name,
             }
-        )
-    default_column_list = (
-        [
-            {
-                "column_description": "Enumerators : name",
-                "column_name": "Surveyor Name",
-            },
-            {
-                "column_description": "Enumerators : enumerator_id",
-                "column_name": "Surveyor ID",
-            },
-            {
-                "column_description": "Enumerators : gender",
-                "column_name": "Surveyor Gender",
-            },
-            {
-                "column_description": "Enumerators : language",
-                "column_name": "Surveyor Language",
-            },
-            {
-                "column_description": "Enumerators : email",
-                "column_name": "Surveyor Email",
-            },
-            {
-                "column_description": "Enumerators : mobile_primary",
-                "column_name": "Surveyor Mobile",
-            },
-            {
-                "column_description": "Targets: target_id",
-                "column_name": "Target ID",
-            },
-            {
-                "column_description": "Targets: gender",
-                "column_name": "Gender",
-            },
-            {
-                "column_description": "Targets: language",
-                "column_name": "Language",
-            },
-            {
-                "column_description": "Target_Status: final_survey_status_label",
-                "column_name": "Final Survey Status",
-            },
-            {
-                "column_description": "Target_Status: final_survey_status",
-                "column_name": "Final Survey Status Code",
-            },
-            {
-                "column_description": "Target_Status: revisit_sections",
-                "column_name": "Revisit Sections",
-            },
-            {
-                "column_description": "Target_Status: num_attempts",
-                "column_name": "Total Attempts",
-            },
-            {
-                "column_description": "Target_Status: refusal_flag",
-                "column_name": "Refused",
-            },
-            {
-                "column_description": "Target_Status: completed_flag",
-                "column_name": "Completed",
-            },
+            for row in enumerator_column_configs
+            if row.column_type == "custom_fields"
         ]
-        + location_column_list
-        + target_custom_fields
-        + enumerator_custom_fields
+
+        self.__assignments_columns = (
+            DEFAULT_EMAIL_ASSIGNMENTS_COLUMNS
+            + location_columns
+            + target_custom_fields
+            + enumerator_custom_fields
+        )
+
+        # Email variable names
+        # For locations we will generate all location hierarchies above or equal to prime geo level
+        location_variable_names = []
+        if enumerator_location_configured:
+            self.__variable_names_errors = location_errors or prime_geo_level_errors
+
+            if self.__variable_names_errors is None:
+                for geo_level in ordered_geo_levels:
+                    location_variable_names.append(
+                        f"Locations : {geo_level.geo_level_name}_id"
+                    )
+                    location_variable_names.append(
+                        f"Locations : {geo_level.geo_level_name}_name"
+                    )
+                    if geo_level.geo_level_uid == prime_geo_level_uid:
+                        break
+
+        self.__variable_names = (
+            DEFAULT_EMAIL_VARIABLE_NAMES
+            + location_variable_names
+            + [
+                f"Enumerators : {row.column_name}"
+                for row in enumerator_column_configs
+                if row.column_type == "custom_fields"
+            ]
+        )
+
+
+def get_email_column_catalog_fingerprint(form_uid):
+    """
+    Get a fingerprint of all the config the email column catalog of a form is built from
+
+    The fingerprint changes whenever the target or enumerator column config of the
+    form, the geo levels of its survey or the prime geo level of the survey change,
+    and is computed with a single query.
+
+    Args:
+        form_uid: form_uid of the SCTO Form
+    """
+
+    target_column_configs = (
+        select(
+            func.array_agg(
+                aggregate_order_by(
+                    func.concat(
+                        TargetColumnConfig.column_type,
+                        ":",
+                        TargetColumnConfig.column_name,
+                    ),
+                    TargetColumnConfig.column_name,
+                )
+            )
+        )
+        .where(
+            TargetColumnConfig.form_uid == Form.form_uid,
+            TargetColumnConfig.column_type.in_(["location", "custom_fields"]),
+        )
+        .scalar_subquery()
+    )
+    enumerator_column_configs = (
+        select(
+            func.array_agg(
+                aggregate_order_by(
+                    func.concat(
+                        EnumeratorColumnConfig.column_type,
+                        ":",
+                        EnumeratorColumnConfig.column_name,
+                    ),
+                    EnumeratorColumnConfig.column_name,
+                )
+            )
+        )
+        .where(
+            EnumeratorColumnConfig.form_uid == Form.form_uid,
+            EnumeratorColumnConfig.column_type.in_(["location", "custom_fields"]),
+        )
+        .scalar_subquery()
     )
+    geo_levels = (
+        select(
+            func.array_agg(
+                aggregate_order_by(
+                    func.concat(
+                        GeoLevel.geo_level_uid,
+                        ":",
+                        GeoLevel.parent_geo_level_uid,
+                        ":",
+                        GeoLevel.geo_level_name,
+                    ),
+                    GeoLevel.geo_level_uid,
+                )
+            )
+        )
+        .where(GeoLevel.survey_uid == Form.survey_uid)
+        .scalar_subquery()
+    )
+
+    fingerprint = (
+        db.session.query(
+            Form.survey_uid,
+            Survey.prime_geo_level_uid,
+            target_column_configs,
+            enumerator_column_configs,
+            geo_levels,
+        )
+        .join(Survey, Survey.survey_uid == Form.survey_uid)
+        .filter(Form.form_uid == form_uid)
+        .first()
+    )
+
+    return tuple(
+        tuple(value) if isinstance(value, list) else value
+        for value in (fingerprint or ())
+    )
+
+
+# Email column catalogs of this process by form_uid, with the fingerprint they were built for
+_email_column_catalogs = {}
+_email_column_catalogs_lock = threading.Lock()
+
+
+def get_email_column_catalog(form_uid):
+    """
+    Get the email column catalog of a form
+
+    Catalogs are cached per process and rebuilt only when the fingerprint of the
+    config they are built from changes, so changes made through any worker are
+    picked up on the next call.
+
+    Args:
+        form_uid: form_uid of the SCTO Form
+
+    Returns:
+        EmailColumnCatalog
+    """
+
+    fingerprint = get_email_column_catalog_fingerprint(form_uid)
 
-    return default_column_list
+    with _email_column_catalogs_lock:
+        cached = _email_column_catalogs.get(form_uid)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+    email_column_catalog = EmailColumnCatalog(form_uid)
+
+    with _email_column_catalogs_lock:
+        _email_column_catalogs[form_uid] = (fingerprint, email_column_catalog)
+
+    return email_column_catalog
+
+
+def clear_email_column_catalogs():
+    """
+    Clear the email column catalogs cached by this process
+    """
+
+    with _email_column_catalogs_lock:
+        _email_column_catalogs.clear()
+
+
+def get_default_email_assignments_column(form_uid):
+    """
+    Create a list of columns for the default Assignments email table.
+
+    Args:
+        form_uid: Form UID
+
+    Returns:
+        list: List of columns
+
+    Raises:
+        InvalidEmailColumnCatalogError: If the location config of the form is invalid
+    """
+
+    return get_email_column_catalog(form_uid).assignments_columns
 
 
 def get_default_email_variable_names(form_uid):
@@ -230,127 +429,329 @@ def get_default_email_variable_names(form_uid):
 
     Returns:
         List of columns
+
+    Raises:
+        InvalidEmailColumnCatalogError: If the location config of the form is invalid
     """
 
-    default_column_list = [
-        "Surveyor Name",
-        "Surveyor Email",
-        "Surveyor Language",
-        "Surveyor ID",
-        "Assignment Date",
-        "Survey Name",
-        "Schedule Name",
-        "Config Name",
-        "SCTO Form ID",
-    ]
+    return get_email_column_catalog(form_uid).variable_names
+
 
-    location_column_list = []
-    enumerator_custom_fields = []
+def load_email_config_details(form_uid):
+    """
+    Load the email configs of a form with their schedules, schedule filters,
+    templates and manual triggers.
 
-    form = Form.query.filter_by(form_uid=form_uid).first()
-    survey_uid = form.survey_uid
+    The related rows are loaded with one IN query per table instead of one
+    query per config or schedule, so the number of queries does not grow
+    with the number of configs and schedules.
 
-    result = EnumeratorColumnConfig.query.filter(
-        EnumeratorColumnConfig.form_uid == form_uid,
-        EnumeratorColumnConfig.column_type == "custom_fields",
-    ).all()
-    for row in result:
-        enumerator_custom_fields.append(f"Enumerators : {row.column_name}")
-
-    # For locations we will generate all location hierarchies above or equal to prime geo level
-    # Check if geo level configured for the form
-    result = EnumeratorColumnConfig.query.filter(
-        EnumeratorColumnConfig.form_uid == form_uid,
-        EnumeratorColumnConfig.column_type == "location",
-    ).first()
-
-    if result is not None:
-        geo_level_hierarchy = None
-        prime_geo_level_uid = None
-        # Get the geo levels for the survey
-        geo_levels = GeoLevel.query.filter_by(survey_uid=survey_uid).all()
-
-        try:
-            geo_level_hierarchy = GeoLevelHierarchy(geo_levels)
-        except InvalidGeoLevelHierarchyError as e:
-            return (
-                jsonify(
+    Args:
+        form_uid: form_uid of the SCTO Form
+
+    Returns:
+        List of email config dicts, empty if the form has no email configs
+    """
+
+    email_configs = (
+        EmailConfig.query.filter(EmailConfig.form_uid == form_uid)
+        .order_by(EmailConfig.email_config_uid)
+        .all()
+    )
+
+    if not email_configs:
+        return []
+
+    email_config_uids = [
+        email_config.email_config_uid for email_config in email_configs
+    ]
+
+    schedules = defaultdict(list)
+    for schedule in (
+        EmailSchedule.query.filter(
+            EmailSchedule.email_config_uid.in_(email_config_uids)
+        )
+        .order_by(EmailSchedule.email_schedule_uid)
+        .all()
+    ):
+        schedules[schedule.email_config_uid].append(schedule)
+
+    # Group the schedule filters by schedule, table name and filter group,
+    # keeping the order in which they were added
+    schedule_filters = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+    schedule_uids = [
+        schedule.email_schedule_uid
+        for config_schedules in schedules.values()
+        for schedule in config_schedules
+    ]
+    if schedule_uids:
+        for schedule_filter in (
+            EmailScheduleFilter.query.filter(
+                EmailScheduleFilter.email_schedule_uid.in_(schedule_uids)
+            )
+            .order_by(EmailScheduleFilter.schedule_filter_uid)
+            .all()
+        ):
+            schedule_filters[schedule_filter.email_schedule_uid][
+                schedule_filter.table_name
+            ][schedule_filter.filter_group_id].append(schedule_filter)
+
+    templates = defaultdict(list)
+    for template in (
+        EmailTemplate.query.filter(
+            EmailTemplate.email_config_uid.in_(email_config_uids)
+        )
+        .order_by(EmailTemplate.email_template_uid)
+        .all()
+    ):
+        templates[template.email_config_uid].append(template)
+
+    template_variables = defaultdict(list)
+    template_uids = [
+        template.email_template_uid
+        for config_templates in templates.values()
+        for template in config_templates
+    ]
+    if template_uids:
+        for variable in (
+            EmailTemplateVariable.query.filter(
+                EmailTemplateVariable.email_template_uid.in_(template_uids)
+            )
+            .order_by(EmailTemplateVariable.email_template_variable_uid)
+            .all()
+        ):
+            template_variables[variable.email_template_uid].append(variable)
+
+    manual_triggers = defaultdict(list)
+    for trigger in (
+        ManualEmailTrigger.query.filter(
+            ManualEmailTrigger.email_config_uid.in_(email_config_uids)
+        )
+        .order_by(ManualEmailTrigger.manual_email_trigger_uid)
+        .all()
+    ):
+        manual_triggers[trigger.email_config_uid].append(trigger)
+
+    # The default variables depend only on the form
+    default_email_variable_names = get_default_email_variable_names(form_uid)
+
+    config_data = []
+    for email_config in email_configs:
+        email_config_dict = email_config.to_dict()
+        email_config_dict["email_source_columns"] = (
+            email_config.email_source_columns + default_email_variable_names
+        )
+        config_data.append(
+            {
+                **email_config_dict,
+                "schedules": [
                     {
-                        "success": False,
-                        "errors": {
-                            "geo_level_hierarchy": e.geo_level_hierarchy_errors,
-                        },
+                        **schedule.to_dict(),
+                        "filter_list": [
+                            {
+                                "table_name": table_name,
+                                "filter_list": [
+                                    {
+                                        "filter_group": [
+                                            filter.to_dict() for filter in filter_group
+                                        ]
+                                    }
+                                    for filter_group in table_filter_groups.values()
+                                ],
+                            }
+                            for table_name, table_filter_groups in schedule_filters[
+                                schedule.email_schedule_uid
+                            ].items()
+                        ],
                     }
-                ),
-                422,
-            )
+                    for schedule in schedules[email_config.email_config_uid]
+                ],
+                "templates": [
+                    template.to_dict(
+                        email_template_variables=template_variables[
+                            template.email_template_uid
+                        ]
+                    )
+                    for template in templates[email_config.email_config_uid]
+                ],
+                "manual_triggers": [
+                    trigger.to_dict()
+                    for trigger in manual_triggers[email_config.email_config_uid]
+                ],
+            }
+        )
+
+    return config_data
 
-        prime_geo_level_uid = (
-            Survey.query.filter_by(survey_uid=survey_uid).first().prime_geo_level_uid
+
+def insert_email_templates(email_config_uid, templates):
+    """
+    Insert the email templates of a config with their variables, tables and
+    table filters.
+
+    Each table is written with one multi-row INSERT, and RETURNING is used to
+    get the uids needed for the foreign keys of the next table, so the number
+    of statements does not grow with the number of templates. The caller is
+    responsible for checking that the templates do not already exist and for
+    committing the transaction.
+
+    Args:
+        email_config_uid: email_config_uid of the Email Config
+        templates: List of template dicts from EmailTemplateBulkValidator
+
+    Returns:
+        List of email template dicts in the order of the templates
+    """
+
+    if not templates:
+        return []
+
+    template_rows = db.session.execute(
+        insert(EmailTemplate)
+        .values(
+            [
+                {
+                    "email_config_uid": email_config_uid,
+                    "subject": template.get("subject"),
+                    "language": template.get("language"),
+                    "content": template.get("content"),
+                }
+                for template in templates
+            ]
         )
+        .returning(
+            EmailTemplate.email_template_uid,
+            EmailTemplate.subject,
+            EmailTemplate.language,
+            EmailTemplate.content,
+        )
+    ).all()
 
-        if prime_geo_level_uid is None:
-            return (
-                jsonify(
-                    {
-                        "success": False,
-                        "errors": "The prime_geo_level_uid is not configured for this survey but is found as a column in the enumerator_column_config table.",
-                    }
-                ),
-                422,
+    # Languages are unique per config, so they identify the inserted templates
+    template_uids = {row.language: row.email_template_uid for row in template_rows}
+
+    variable_records = [
+        {
+            "email_template_uid": template_uids[template.get("language")],
+            "variable_name": variable.get("variable_name"),
+            "variable_expression": variable.get("variable_expression"),
+        }
+        for template in templates
+        for variable in template.get("variable_list", [])
+    ]
+
+    template_variables = defaultdict(list)
+    if variable_records:
+        for row in db.session.execute(
+            insert(EmailTemplateVariable)
+            .values(variable_records)
+            .returning(
+                EmailTemplateVariable.email_template_uid,
+                EmailTemplateVariable.variable_name,
+                EmailTemplateVariable.variable_expression,
+            )
+        ):
+            template_variables[row.email_template_uid].append(
+                {
+                    "variable_name": row.variable_name,
+                    "variable_expression": row.variable_expression,
+                }
             )
 
-        if prime_geo_level_uid not in [
-            geo_level.geo_level_uid
-            for geo_level in geo_level_hierarchy.ordered_geo_levels
-        ]:
-            return (
-                jsonify(
-                    {
-                        "success": False,
-                        "errors": f"The prime_geo_level_uid '{prime_geo_level_uid}' is not in the location type hierarchy for this survey.",
-                    }
-                ),
-                422,
+    table_records = []
+    table_filter_lists = {}
+    for template in templates:
+        email_template_uid = template_uids[template.get("language")]
+        for table in template.get("table_list", []):
+            table_records.append(
+                {
+                    "email_template_uid": email_template_uid,
+                    "table_name": table.get("table_name"),
+                    "column_mapping": table.get("column_mapping"),
+                    "sort_list": table.get("sort_list"),
+                    "variable_name": table.get("variable_name"),
+                }
+            )
+            table_key = (
+                email_template_uid,
+                table.get("table_name"),
+                table.get("variable_name"),
+            )
+            table_filter_lists[table_key] = table.get("filter_list", [])
+
+    if table_records:
+        table_rows = db.session.execute(
+            insert(EmailTemplateTable)
+            .values(table_records)
+            .returning(
+                EmailTemplateTable.email_template_table_uid,
+                EmailTemplateTable.email_template_uid,
+                EmailTemplateTable.table_name,
+                EmailTemplateTable.variable_name,
             )
-        for i, geo_level in enumerate(geo_level_hierarchy.ordered_geo_levels):
+        ).all()
 
-            location_column_list.append(f"Locations : {geo_level.geo_level_name}_id")
-            location_column_list.append(f"Locations : {geo_level.geo_level_name}_name")
-            if geo_level.geo_level_uid == prime_geo_level_uid:
-                break
+        # Filter group ids are numbered from 1 within each table
+        filter_records = [
+            {
+                "email_template_table_uid": row.email_template_table_uid,
+                "filter_group_id": filter_group_id,
+                "filter_variable": filter_item.get("filter_variable"),
+                "filter_operator": filter_item.get("filter_operator"),
+                "filter_value": filter_item.get("filter_value"),
+            }
+            for row in table_rows
+            for filter_group_id, filter_group in enumerate(
+                table_filter_lists[
+                    (row.email_template_uid, row.table_name, row.variable_name)
+                ],
+                start=1,
+            )
+            for filter_item in filter_group.get("filter_group")
+        ]
 
-    return default_column_list + location_column_list + enumerator_custom_fields
+        if filter_records:
+            db.session.execute(insert(EmailTableFilter).values(filter_records))
+
+    return [
+        {
+            "email_template_uid": row.email_template_uid,
+            "subject": row.subject,
+            "language": row.language,
+            "content": row.content,
+            "email_config_uid": email_config_uid,
+            "variable_list": template_variables[row.email_template_uid],
+        }
+        for row in template_rows
+    ]
 
 
-def get_surveyor_details(form_uid, email_delivery_report_uid):
+def get_surveyor_details(form_uid, email_delivery_report_uids):
     """
-    Get the details of surveyors for the given email_delivery_report_uid.
+    Get the details of surveyors for the given email delivery reports.
+
+    The surveyor to supervisor mapping is generated once and the delivery
+    statuses of all the reports are fetched with a single query, then grouped
+    by report in memory.
 
     Args:
         form_uid: Form UID
-        email_delivery_report_uid: Email delivery report UID
+        email_delivery_report_uids: List of email delivery report UIDs
 
     Returns:
-        List of surveyors dictionary with surveyor & supervisor details
+        Dict of email_delivery_report_uid to a list of surveyor dictionaries
+        with surveyor & supervisor details
+
+    Raises:
+        MappingError: If the surveyor mapping for the form cannot be generated
     """
 
-    try:
-        surveyor_mapping = SurveyorMapping(form_uid)
-    except MappingError as e:
-        return (
-            jsonify(
-                {
-                    "success": False,
-                    "errors": {
-                        "mapping": e.message,
-                    },
-                }
-            ),
-            422,
-        )
+    surveyor_details = defaultdict(list)
+
+    if not email_delivery_report_uids:
+        return surveyor_details
 
-    surveyor_mappings = surveyor_mapping.generate_mappings()
+    surveyor_mappings = SurveyorMapping(form_uid).generate_mappings()
     surveyor_mappings_query = select(
         Values(
             column("enumerator_uid", Integer),
@@ -370,6 +771,7 @@ def get_surveyor_details(form_uid, email_delivery_report_uid):
 
     assignment_enumerators_query = (
         db.session.query(
+            EmailEnumeratorDeliveryStatus.email_delivery_report_uid,
             Enumerator.enumerator_id,
             Enumerator.name,
             Enumerator.email,
@@ -400,9 +802,27 @@ def get_surveyor_details(form_uid, email_delivery_report_uid):
         )
         .filter(
             SurveyorForm.form_uid == form_uid,
-            EmailEnumeratorDeliveryStatus.email_delivery_report_uid
-            == email_delivery_report_uid,
+            EmailEnumeratorDeliveryStatus.email_delivery_report_uid.in_(
+                email_delivery_report_uids
+            ),
+        )
+        .order_by(
+            EmailEnumeratorDeliveryStatus.email_delivery_report_uid,
+            Enumerator.enumerator_uid,
         )
     )
 
-    return assignment_enumerators_query
+    for row in assignment_enumerators_query.all():
+        surveyor_details[row.email_delivery_report_uid].append(
+            {
+                "enumerator_id": row.enumerator_id,
+                "enumerator_name": row.name,
+                "enumerator_email": row.email,
+                "supervisor_name": row.supervisor_name,
+                "supervisor_email": row.supervisor_email,
+                "status": row.status,
+                "error_message": row.error_message,
+            }
+        )
+
+    return surveyor_details
@@ -4,6 +4,7 @@ from datetime import datetime
 from flask_wtf import FlaskForm
 from wtforms import (
     BooleanField,
+    DateField,
     DateTimeField,
     FieldList,
     FormField,
@@ -348,3 +349,7 @@ class EmailDeliveryReportQueryValidator(FlaskForm):
         AnyOf(["trigger", "schedule"], message="Invalid slot type"),
         default=None,
     )
+    from_date = DateField(format="%Y-%m-%d", default=None)
+    to_date = DateField(format="%Y-%m-%d", default=None)
+    page = IntegerField(default=None)
+    per_page = IntegerField(default=None)
@@ -18,7 +18,9 @@ from app.blueprints.locations.models import GeoLevel, Location
 from app.blueprints.locations.utils import GeoLevelHierarchy
 from app.blueprints.module_questionnaire.models import ModuleQuestionnaire
 from app.blueprints.surveys.models import Survey
+from app.utils.replica_utils import use_read_replica
 from app.utils.utils import (
+    build_jsonb_merge_expression,
     custom_permissions_required,
     logged_in_active_user_required,
     update_module_status,
@@ -239,6 +241,7 @@ def upload_enumerators(validated_query_params, validated_payload):
 @logged_in_active_user_required
 @validate_query_params(GetEnumeratorsQueryParamValidator)
 @custom_permissions_required("READ Enumerators", "query", "form_uid")
+@use_read_replica
 def get_enumerators(validated_query_params):
     """
     Method to retrieve the enumerators information from the database
@@ -1066,22 +1069,23 @@ def bulk_update_enumerators(validated_payload):
             elif key in bulk_editable_fields["custom_fields"]:
                 custom_fields_patch_keys.append(key)
 
-    # Update personal details
-    if len(personal_details_patch_keys) > 0:
-        Enumerator.query.filter(Enumerator.enumerator_uid.in_(enumerator_uids)).update(
-            {key: payload[key] for key in personal_details_patch_keys},
-            synchronize_session=False,
-        )
-
-    # Update custom fields
+    # Apply the personal details and custom fields patches to all the selected
+    # enumerators with a single statement
+    patch_values = {key: payload[key] for key in personal_details_patch_keys}
     if len(custom_fields_patch_keys) > 0:
-        enumerator_records = Enumerator.query.filter(
-            Enumerator.enumerator_uid.in_(enumerator_uids)
-        ).all()
+        patch_values["custom_fields"] = build_jsonb_merge_expression(
+            Enumerator.custom_fields,
+            {key: payload[key] for key in custom_fields_patch_keys},
+        )
 
-        for enumerator_record in enumerator_records:
-            for custom_field in custom_fields_patch_keys:
-                enumerator_record.custom_fields[custom_field] = payload[custom_field]
+    updated_count = 0
+    if len(patch_values) > 0:
+        updated_count = db.session.execute(
+            update(Enumerator)
+            .values(patch_values)
+            .where(Enumerator.enumerator_uid.in_(enumerator_uids))
+            .execution_options(synchronize_session=False)
+        ).rowcount
 
     if enumerator_status == "Dropout":
         # Delete the surveyor assignments for the enumerators
@@ -1231,7 +1235,7 @@ def bulk_update_enumerators(validated_payload):
         db.session.rollback()
         return jsonify(message=str(e)), 500
 
-    return jsonify({"success": True}), 200
+    return jsonify({"success": True, "data": {"updated_count": updated_count}}), 200
 
 
 @enumerators_bp.route("/column-config", methods=["PUT"])
@@ -1466,6 +1470,7 @@ def update_surveyor_stats(validated_payload):
 @logged_in_active_user_required
 @validate_query_params(SurveyorStatsQueryParamValidator)
 @custom_permissions_required("READ Enumerators", "query", "form_uid")
+@use_read_replica
 def get_surveyor_stats(validated_query_params):
     """
     Method to get surveyor stats
@@ -126,6 +126,11 @@ class SurveyorLocation(db.Model):
 
     __table_args__ = (
         db.PrimaryKeyConstraint("form_uid", "enumerator_uid", "location_uid"),
+        db.Index(
+            "ix_location_surveyor_mapping_form_uid_location_uid",
+            "form_uid",
+            "location_uid",
+        ),
         {"schema": "webapp"},
     )
 
@@ -785,6 +785,11 @@ def ingest_scto_form_definition(form_uid):
                 )
                 db.session.add(scto_question_label)
 
+    # Refresh the validity of the DQ checks that use questions from this form
+    from app.blueprints.dq.utils import refresh_form_dq_check_validity
+
+    refresh_form_dq_check_validity(form_uid)
+
     try:
         db.session.commit()
         survey_uid = form.survey_uid
@@ -835,6 +840,10 @@ def delete_scto_form_definition(form_uid):
     SCTOQuestion.query.filter(SCTOQuestion.form_uid == form_uid).delete()
     SCTOChoiceList.query.filter(SCTOChoiceList.form_uid == form_uid).delete()
 
+    from app.blueprints.dq.utils import refresh_form_dq_check_validity
+
+    refresh_form_dq_check_validity(form_uid)
+
     db.session.commit()
     return "", 204
 
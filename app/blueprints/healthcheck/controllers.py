@@ -1,6 +1,7 @@
 from . import healthcheck_bp
 from flask import jsonify
 from app import db
+from app.utils.pool_utils import get_pool_status
 
 
 @healthcheck_bp.route("", methods=["GET"])
@@ -13,3 +14,12 @@ def healthcheck():
         return jsonify(message="Healthy"), 200
     except:
         return jsonify(message="Failed DB connection"), 500
+
+
+@healthcheck_bp.route("/db-pool", methods=["GET"])
+def db_pool_status():
+    """
+    Get the DB connection pool usage and checkout wait time metrics of this worker
+    """
+
+    return jsonify(message="Healthy", data=get_pool_status(db.engine)), 200
@@ -1,15 +1,18 @@
 import base64
 import binascii
+import csv
+import io
 
 import pandas as pd
-from flask import jsonify, request
+from flask import Response, jsonify, request, stream_with_context
 from flask_login import current_user
-from sqlalchemy import Integer, cast, insert
+from sqlalchemy import Integer, cast
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql import case
 
 from app import db
 from app.blueprints.surveys.models import Survey
+from app.utils.replica_utils import use_read_replica
 from app.utils.utils import (
     custom_permissions_required,
     logged_in_active_user_required,
@@ -25,6 +28,7 @@ from .errors import (
     InvalidLocationsError,
 )
 from .models import GeoLevel, Location
+from .queries import build_locations_wide_query
 from .routes import locations_bp
 from .utils import (
     GeoLevelHierarchy,
@@ -33,6 +37,7 @@ from .utils import (
     LocationsUpload,
 )
 from .validators import (
+    GetLocationsQueryParamValidator,
     LocationsFileUploadValidator,
     LocationsQueryParamValidator,
     LocationUpdateParamValidator,
@@ -41,6 +46,9 @@ from .validators import (
     SurveyPrimeGeoLevelValidator,
 )
 
+# Number of rows fetched and written per chunk when streaming CSV exports
+CSV_STREAM_BATCH_SIZE = 5000
+
 
 @locations_bp.route("/geo-levels", methods=["GET"])
 @logged_in_active_user_required
@@ -705,64 +713,11 @@ def upload_locations(validated_query_params, validated_payload):
 
     db.session.flush()
 
-    for i, geo_level in enumerate(geo_level_hierarchy.ordered_geo_levels):
-        # Get the location_id and location_name column names for the geo level
-        location_type_columns = column_mapping.get_by_uid(geo_level.geo_level_uid)
-        location_id_column_name = location_type_columns["location_id_column"]
-        location_name_column_name = location_type_columns["location_name_column"]
-
-        columns = [location_id_column_name, location_name_column_name]
-
-        parent_geo_level_uid = geo_level.parent_geo_level_uid
-
-        parent_locations = {}
-        parent_location_id_column_name = None
-
-        if parent_geo_level_uid is not None:
-            parent_locations = {
-                str(location.location_id): location.location_uid
-                for location in Location.query.filter_by(
-                    survey_uid=survey_uid, geo_level_uid=parent_geo_level_uid
-                )
-            }
-
-            parent_location_id_column_name = column_mapping.get_by_uid(
-                parent_geo_level_uid
-            )["location_id_column"]
-
-            columns.append(parent_location_id_column_name)
-
-        # Create and add location models for the geo level
-
-        location_records_to_insert = []
-        for i, row in enumerate(
-            locations_upload.locations_df[columns].drop_duplicates().itertuples()
-        ):
-            parent_location_uid = None
-            if parent_geo_level_uid is not None:
-                parent_location_uid = parent_locations.get(str(row[3]))
-
-            location_records_to_insert.append(
-                {
-                    "survey_uid": survey_uid,
-                    "location_id": row[1],
-                    "location_name": row[2],
-                    "parent_location_uid": parent_location_uid,
-                    "geo_level_uid": geo_level.geo_level_uid,
-                }
-            )
-
-            # Insert the records in batches of 1000
-            if i > 0 and i % 1000 == 0:
-                db.session.execute(insert(Location).values(location_records_to_insert))
-                db.session.flush()
-                location_records_to_insert.clear()
-
-        # We need to flush the session to get the location_uids
-        # These will be used to set the parent_location_uids for the next geo level
-        if len(location_records_to_insert) > 0:
-            db.session.execute(insert(Location).values(location_records_to_insert))
-            db.session.flush()
+    locations_upload.save_records(
+        survey_uid,
+        geo_level_hierarchy.ordered_geo_levels,
+        column_mapping.geo_level_mapping_lookup,
+    )
 
     try:
         db.session.commit()
@@ -778,14 +733,16 @@ def upload_locations(validated_query_params, validated_payload):
 
 @locations_bp.route("", methods=["GET"])
 @logged_in_active_user_required
-@validate_query_params(SurveyGeoLevelsQueryParamValidator)
+@validate_query_params(GetLocationsQueryParamValidator)
 @custom_permissions_required("READ Survey Locations", "query", "survey_uid")
+@use_read_replica
 def get_locations(validated_query_params):
     """
-    Method to retrieve the locations information from the database
+    Method to retrieve the locations information from the database in wide format
     """
 
     survey_uid = validated_query_params.survey_uid.data
+    file_format = validated_query_params.file_format.data or "json"
     user_uid = current_user.user_uid
 
     # Check if the logged in user has permission to access the given survey
@@ -831,79 +788,53 @@ def get_locations(validated_query_params):
         expected_columns.append(geo_level.geo_level_name + " ID")
         expected_columns.append(geo_level.geo_level_name + " Name")
 
-    final_df = pd.DataFrame()
-    for i, geo_level in enumerate(geo_level_hierarchy.ordered_geo_levels):
-        locations = (
-            db.session.query(
-                Location.location_uid,
-                Location.location_id,
-                Location.location_name,
-                Location.parent_location_uid,
-            )
-            .filter_by(survey_uid=survey_uid, geo_level_uid=geo_level.geo_level_uid)
-            .all()
-        )
-
-        if locations is None or len(locations) == 0:
-            return (
-                jsonify(
-                    {
-                        "success": True,
-                        "data": {
-                            "records": [],
-                            "ordered_columns": expected_columns,
-                        },
-                    }
-                ),
-                200,
-            )
+    # If any geo level has no locations, return an empty response
+    geo_level_uids_with_locations = {
+        location.geo_level_uid
+        for location in db.session.query(Location.geo_level_uid)
+        .filter(Location.survey_uid == survey_uid)
+        .distinct()
+    }
+    if any(
+        geo_level.geo_level_uid not in geo_level_uids_with_locations
+        for geo_level in geo_level_hierarchy.ordered_geo_levels
+    ):
+        if file_format == "csv":
+            return _locations_csv_response(survey_uid, expected_columns, [])
 
-        df = pd.DataFrame(
-            [
+        return (
+            jsonify(
                 {
-                    "location_uid": location.location_uid,
-                    "location_id": location.location_id,
-                    "location_name": location.location_name,
-                    "parent_location_uid": location.parent_location_uid,
+                    "success": True,
+                    "data": {
+                        "records": [],
+                        "ordered_columns": expected_columns,
+                    },
                 }
-                for location in locations
-            ]
-        ).rename(
-            columns={
-                "location_id": geo_level.geo_level_name + " ID",
-                "location_name": geo_level.geo_level_name + " Name",
-            }
+            ),
+            200,
         )
 
-        if i == 0:
-            final_df = pd.concat([final_df, df], ignore_index=True)
-
-        else:
-            final_df = final_df.merge(
-                df,
-                how="left",
-                left_on="location_uid",
-                right_on="parent_location_uid",
-            )
-
-            final_df.drop(
-                columns=["parent_location_uid_x", "location_uid_x"], inplace=True
-            )
-            final_df.rename(
-                columns={
-                    "parent_location_uid_y": "parent_location_uid",
-                    "location_uid_y": "location_uid",
-                },
-                inplace=True,
-            )
+    # Pivot the locations into wide format in a single query
+    locations_query = build_locations_wide_query(
+        survey_uid, geo_level_hierarchy.ordered_geo_levels
+    )
 
-    final_df.drop(columns=["location_uid", "parent_location_uid"], inplace=True)
+    if file_format == "csv":
+        # Stream the rows from a server side cursor instead of loading them all
+        locations = locations_query.execution_options(stream_results=True).yield_per(
+            CSV_STREAM_BATCH_SIZE
+        )
+        return _locations_csv_response(survey_uid, expected_columns, locations)
 
     response = jsonify(
         {
             "success": True,
             "data": {
-                "records": final_df.to_dict(orient="records"),
+                "records": [
+                    dict(zip(expected_columns, location))
+                    for location in locations_query.all()
+                ],
                 "ordered_columns": expected_columns,
             },
         }
@@ -912,6 +843,34 @@ def get_locations(validated_query_params):
     return response, 200
 
 
+def _locations_csv_response(survey_uid, columns, rows):
+    """
+    Method to stream the wide format locations as a CSV file download
+    """
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+
+        for i, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if i % CSV_STREAM_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+
+        yield buffer.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/csv",
+        headers={
+            "Content-Disposition": f"attachment; filename=locations_{survey_uid}.csv"
+        },
+    )
+
+
 @locations_bp.route("/long", methods=["GET"])
 @logged_in_active_user_required
 @validate_query_params(LocationsQueryParamValidator)
@@ -1234,67 +1193,12 @@ def append_locations(validated_query_params, validated_payload):
             422,
         )
 
-    for i, geo_level in enumerate(geo_level_hierarchy.ordered_geo_levels):
-        # Get the location_id and location_name column names for the geo level
-        location_type_columns = column_mapping.get_by_uid(geo_level.geo_level_uid)
-        location_id_column_name = location_type_columns["location_id_column"]
-        location_name_column_name = location_type_columns["location_name_column"]
-
-        columns = [location_id_column_name, location_name_column_name]
-
-        parent_geo_level_uid = geo_level.parent_geo_level_uid
-
-        parent_locations = {}
-        parent_location_id_column_name = None
-
-        if parent_geo_level_uid is not None:
-            parent_locations = {
-                str(location.location_id): location.location_uid
-                for location in Location.query.filter_by(
-                    survey_uid=survey_uid, geo_level_uid=parent_geo_level_uid
-                )
-            }
-
-            parent_location_id_column_name = column_mapping.get_by_uid(
-                parent_geo_level_uid
-            )["location_id_column"]
-
-            columns.append(parent_location_id_column_name)
-
-        # Create and add location models for the geo level
-
-        location_records_to_insert = []
-        for i, row in enumerate(
-            locations_upload.locations_df[columns].drop_duplicates().itertuples()
-        ):
-            parent_location_uid = None
-            if parent_geo_level_uid is not None:
-                parent_location_uid = parent_locations.get(str(row[3]))
-
-            if row[1] in existing_locations_df[location_id_column_name].values:
-                continue
-
-            location_records_to_insert.append(
-                {
-                    "survey_uid": survey_uid,
-                    "location_id": row[1],
-                    "location_name": row[2],
-                    "parent_location_uid": parent_location_uid,
-                    "geo_level_uid": geo_level.geo_level_uid,
-                }
-            )
-
-            # Insert the records in batches of 1000
-            if i > 0 and i % 1000 == 0:
-                db.session.execute(insert(Location).values(location_records_to_insert))
-                db.session.flush()
-                location_records_to_insert.clear()
-
-        # We need to flush the session to get the location_uids
-        # These will be used to set the parent_location_uids for the next geo level
-        if len(location_records_to_insert) > 0:
-            db.session.execute(insert(Location).values(location_records_to_insert))
-            db.session.flush()
+    locations_upload.save_records(
+        survey_uid,
+        geo_level_hierarchy.ordered_geo_levels,
+        column_mapping.geo_level_mapping_lookup,
+        write_mode="append",
+    )
 
     try:
         db.session.commit()
@@ -105,6 +105,7 @@ class Location(db.Model):
             "survey_uid",
             "geo_level_uid",
         ),
+        db.Index("ix_locations_parent_location_uid", "parent_location_uid"),
         {"schema": "webapp"},
     )
 
@@ -1,5 +1,6 @@
 from app import db
 from app.blueprints.locations.models import GeoLevel, Location
+from sqlalchemy.orm import aliased
 from sqlalchemy.sql.functions import func
 
 
@@ -76,3 +77,43 @@ def build_location_hierarchy_query(survey_uid):
     location_hierarchy_query = top_query.union(bottom_query)
 
     return location_hierarchy_query
+
+
+def build_locations_wide_query(survey_uid, ordered_geo_levels):
+    """
+    Build a query that returns the locations for the survey in wide format,
+    with one row per path from a top level location down the hierarchy
+
+    Each geo level is joined as an alias of the locations table onto its parent
+    level, so the pivot happens in a single query. Locations without children
+    are kept with nulls for the lower geo levels. The selected columns are
+    ordered as [<level 1> ID, <level 1> Name, <level 2> ID, ...]
+    """
+
+    location_aliases = [aliased(Location) for _ in ordered_geo_levels]
+
+    columns = []
+    for i, location_alias in enumerate(location_aliases):
+        columns.append(location_alias.location_id.label(f"location_id_{i}"))
+        columns.append(location_alias.location_name.label(f"location_name_{i}"))
+
+    query = db.session.query(*columns).select_from(location_aliases[0])
+
+    for i in range(1, len(location_aliases)):
+        query = query.outerjoin(
+            location_aliases[i],
+            (
+                location_aliases[i].parent_location_uid
+                == location_aliases[i - 1].location_uid
+            )
+            & (
+                location_aliases[i].geo_level_uid == ordered_geo_levels[i].geo_level_uid
+            ),
+        )
+
+    query = query.filter(
+        location_aliases[0].survey_uid == survey_uid,
+        location_aliases[0].geo_level_uid == ordered_geo_levels[0].geo_level_uid,
+    ).order_by(*[location_alias.location_uid for location_alias in location_aliases])
+
+    return query
@@ -1,8 +1,14 @@
 import io
+from collections import Counter
 from csv import DictReader
+from functools import lru_cache
 
 import numpy as np
 import pandas as pd
+from psycopg2.extras import execute_values
+
+from app import db
+from app.utils.gevent_utils import is_green_db_driver
 
 from .errors import (
     HeaderRowEmptyError,
@@ -10,165 +16,152 @@ from .errors import (
     InvalidGeoLevelMappingError,
     InvalidLocationsError,
 )
+from .models import Location
 
 
 class GeoLevelHierarchy:
     """
     Class to represent the geo level hierarchy and run validations on it
+
+    The validation result and ordering are memoized on the (geo_level_uid,
+    geo_level_name, parent_geo_level_uid) values of the geo levels, so a survey's
+    hierarchy is only recomputed when its geo levels change
     """
 
     def __init__(self, geo_levels):
         self.geo_levels = geo_levels
 
-        try:
-            self.__validate_hierarchy()
-        except:
-            raise
-
-        self.ordered_geo_levels = self.__get_ordered_geo_levels()
+        errors_list, ordered_geo_level_uids = _resolve_geo_level_hierarchy(
+            tuple(
+                (
+                    geo_level.geo_level_uid,
+                    geo_level.geo_level_name,
+                    geo_level.parent_geo_level_uid,
+                )
+                for geo_level in geo_levels
+            )
+        )
+        if errors_list:
+            raise InvalidGeoLevelHierarchyError(list(errors_list))
 
-    def __get_ordered_geo_levels(self):
-        """
-        Method to create an ordered list of geo levels based on the geo level hierarchy
-        This method assumes that the geo level hierarchy has been validated
-        """
-        ordered_geo_levels = [
-            geo_level
-            for geo_level in self.geo_levels
-            if geo_level.parent_geo_level_uid is None
+        geo_levels_by_uid = {
+            geo_level.geo_level_uid: geo_level for geo_level in geo_levels
+        }
+        self.ordered_geo_levels = [
+            geo_levels_by_uid[geo_level_uid] for geo_level_uid in ordered_geo_level_uids
         ]
-        for i in range(len(self.geo_levels) - 1):
-            for geo_level in self.geo_levels:
-                if (
-                    geo_level.parent_geo_level_uid
-                    == ordered_geo_levels[i].geo_level_uid
-                ):
-                    ordered_geo_levels.append(geo_level)
-
-        return ordered_geo_levels
 
-    def __validate_hierarchy(self):
-        """
-        Method to run validations on the geo level hierarchy and raise an exception containing a list of errors
-        """
-        errors_list = []
-
-        # Prechecks before we validate the tree
-
-        # There should be at least one geo level
-        if len(self.geo_levels) == 0:
-            errors_list.append(
-                "Cannot create the location type hierarchy because no location types have been defined for the survey."
-            )
-            raise InvalidGeoLevelHierarchyError(errors_list)
 
-        # There should be no duplicates on geo_level_uid
-        geo_level_uids = [geo_level.geo_level_uid for geo_level in self.geo_levels]
+@lru_cache(maxsize=1024)
+def _resolve_geo_level_hierarchy(geo_levels):
+    """
+    Function to validate a geo level hierarchy and order its geo levels from the top level down
 
-        for geo_level_uid in geo_level_uids:
-            if geo_level_uids.count(geo_level_uid) > 1:
-                error_message = f"Each location type unique id defined in the location type hierarchy should appear exactly once in the hierarchy. Location type with geo_level_uid='{geo_level_uid}' appears {geo_level_uids.count(geo_level_uid)} times in the hierarchy."
+    :param geo_levels: Tuple of (geo_level_uid, geo_level_name, parent_geo_level_uid) tuples
+    Returns a tuple of the validation errors and a tuple of the ordered geo_level_uids
+    """
 
-                if error_message not in errors_list:
-                    errors_list.append(error_message)
+    # Prechecks before we validate the tree
 
-        # There should be no duplicates on geo_level_name
-        geo_level_names = [geo_level.geo_level_name for geo_level in self.geo_levels]
-        for geo_level_name in geo_level_names:
-            if geo_level_names.count(geo_level_name) > 1:
-                error_message = f"Each location type name defined in the location type hierarchy should appear exactly once in the hierarchy. Location type with geo_level_name='{geo_level_name}' appears {geo_level_names.count(geo_level_name)} times in the hierarchy."
+    # There should be at least one geo level
+    if len(geo_levels) == 0:
+        return (
+            "Cannot create the location type hierarchy because no location types have been defined for the survey.",
+        ), ()
 
-                if error_message not in errors_list:
-                    errors_list.append(error_message)
+    errors_list = []
 
-        if len(errors_list) > 0:
-            raise InvalidGeoLevelHierarchyError(errors_list)
+    # There should be no duplicates on geo_level_uid
+    for geo_level_uid, count in Counter(
+        geo_level_uid for geo_level_uid, _, _ in geo_levels
+    ).items():
+        if count > 1:
+            errors_list.append(
+                f"Each location type unique id defined in the location type hierarchy should appear exactly once in the hierarchy. Location type with geo_level_uid='{geo_level_uid}' appears {count} times in the hierarchy."
+            )
 
-        # Now validate the tree
+    # There should be no duplicates on geo_level_name
+    for geo_level_name, count in Counter(
+        geo_level_name for _, geo_level_name, _ in geo_levels
+    ).items():
+        if count > 1:
+            errors_list.append(
+                f"Each location type name defined in the location type hierarchy should appear exactly once in the hierarchy. Location type with geo_level_name='{geo_level_name}' appears {count} times in the hierarchy."
+            )
 
-        # Exactly one geo level should have no parent
-        root_nodes = [
+    if len(errors_list) > 0:
+        return tuple(errors_list), ()
+
+    # Now validate the tree
+
+    # Exactly one geo level should have no parent
+    child_geo_levels = {}
+    for geo_level in geo_levels:
+        child_geo_levels.setdefault(geo_level[2], []).append(geo_level)
+    root_nodes = child_geo_levels.get(None, [])
+
+    if len(root_nodes) == 0:
+        return (
+            f"The hierarchy should have exactly one top level location type (ie, a location type with no parent). The current hierarchy has 0 location types with no parent.",
+        ), ()
+    elif len(root_nodes) > 1:
+        return (
+            f"The hierarchy should have exactly one top level location type (ie, a location type with no parent). The current hierarchy has {len(root_nodes)} location types with no parent:\n{', '.join([geo_level[1] for geo_level in root_nodes])}",
+        ), ()
+
+    # Traverse the tree to validate the following:
+    # 1. Each location type should have at most one child location type
+    # 2. The location type hierarchy should not have any cycles
+    # 3. There are no location types that couldn't be visited from the top level location type (graph is connected)
+    visited_nodes = [root_nodes[0]]
+    visited_geo_level_uids = {root_nodes[0][0]}
+
+    while True:
+        child_nodes = child_geo_levels.get(visited_nodes[-1][0], [])
+
+        if len(child_nodes) > 1:
+            return (
+                f"Each location type should have at most one child location type. Location type '{visited_nodes[-1][1]}' has {len(child_nodes)} child location types:\n{', '.join([geo_level[1] for geo_level in child_nodes])}",
+            ), ()
+        elif len(child_nodes) == 1:
+            if child_nodes[0][0] in visited_geo_level_uids:
+                return (
+                    f"The location type hierarchy should not have any cycles. The current hierarchy has a cycle starting with location type '{child_nodes[0][1]}'.",
+                ), ()
+            visited_nodes.append(child_nodes[0])
+            visited_geo_level_uids.add(child_nodes[0][0])
+        elif len(child_nodes) == 0:
+            break
+
+    # Now check that all nodes were visited
+    if len(visited_nodes) != len(geo_levels):
+        unvisited_nodes = [
             geo_level
-            for geo_level in self.geo_levels
-            if geo_level.parent_geo_level_uid is None
+            for geo_level in geo_levels
+            if geo_level[0] not in visited_geo_level_uids
         ]
 
-        if len(root_nodes) == 0:
-            errors_list.append(
-                f"The hierarchy should have exactly one top level location type (ie, a location type with no parent). The current hierarchy has 0 location types with no parent."
-            )
-            raise InvalidGeoLevelHierarchyError(errors_list)
-        elif len(root_nodes) > 1:
-            errors_list.append(
-                f"The hierarchy should have exactly one top level location type (ie, a location type with no parent). The current hierarchy has {len(root_nodes)} location types with no parent:\n{', '.join([geo_level.geo_level_name for geo_level in root_nodes])}"
-            )
-            raise InvalidGeoLevelHierarchyError(errors_list)
-
-        # Traverse the tree to validate the following:
-        # 1. Each location type should have at most one child location type
-        # 2. The location type hierarchy should not have any cycles
-        # 3. There are no location types that couldn't be visited from the top level location type (graph is connected)
-        root_node = root_nodes[0]
-        visited_nodes = [root_node]
-
-        while True:
-            child_nodes = [
-                geo_level
-                for geo_level in self.geo_levels
-                if geo_level.parent_geo_level_uid == visited_nodes[-1].geo_level_uid
-            ]
+        errors_list.append(
+            f"All location types in the hierarchy should be able to be connected back to the top level location type via a chain of parent location type references. The current hierarchy has {len(unvisited_nodes)} location types that cannot be connected:\n{', '.join([geo_level[1] for geo_level in unvisited_nodes])}"
+        )
 
-            if len(child_nodes) > 1:
+        # Attempt to diagnose the unvisited nodes
+        # Not exhaustive of all issues
+        geo_level_uids = {geo_level[0] for geo_level in geo_levels}
+        for geo_level_uid, geo_level_name, parent_geo_level_uid in unvisited_nodes:
+            # Check for self-referencing
+            if parent_geo_level_uid == geo_level_uid:
                 errors_list.append(
-                    f"Each location type should have at most one child location type. Location type '{visited_nodes[-1].geo_level_name}' has {len(child_nodes)} child location types:\n{', '.join([geo_level.geo_level_name for geo_level in child_nodes])}"
+                    f"Location type '{geo_level_name}' is referenced as its own parent. Self-referencing is not allowed."
                 )
-                raise InvalidGeoLevelHierarchyError(errors_list)
-            elif len(child_nodes) == 1:
-                if child_nodes[0].geo_level_uid in [
-                    geo_level.geo_level_uid for geo_level in visited_nodes
-                ]:
-                    errors_list.append(
-                        f"The location type hierarchy should not have any cycles. The current hierarchy has a cycle starting with location type '{child_nodes[0].geo_level_name}'."
-                    )
-                    raise InvalidGeoLevelHierarchyError(errors_list)
-                visited_nodes.append(child_nodes[0])
-            elif len(child_nodes) == 0:
-                break
-
-        # Now check that all nodes were visited
-        if len(visited_nodes) != len(self.geo_levels):
-            unvisited_nodes = [
-                geo_level
-                for geo_level in self.geo_levels
-                if geo_level.geo_level_uid
-                not in [visited_node.geo_level_uid for visited_node in visited_nodes]
-            ]
-
-            errors_list.append(
-                f"All location types in the hierarchy should be able to be connected back to the top level location type via a chain of parent location type references. The current hierarchy has {len(unvisited_nodes)} location types that cannot be connected:\n{', '.join([geo_level.geo_level_name for geo_level in unvisited_nodes])}"
-            )
 
-            # Attempt to diagnose the unvisited nodes
-            # Not exhaustive of all issues
-            for geo_level in unvisited_nodes:
-                # Check for self-referencing
-                if geo_level.parent_geo_level_uid == geo_level.geo_level_uid:
-                    errors_list.append(
-                        f"Location type '{geo_level.geo_level_name}' is referenced as its own parent. Self-referencing is not allowed."
-                    )
-
-                # Check for parent referencing a non-existent geo level
-                elif geo_level.parent_geo_level_uid not in [
-                    geo_level.geo_level_uid for geo_level in self.geo_levels
-                ]:
-                    errors_list.append(
-                        f"Location type '{geo_level.geo_level_name}' references a parent location type with unique id '{geo_level.parent_geo_level_uid}' that is not found in the hierarchy."
-                    )
-
-        if len(errors_list) > 0:
-            raise InvalidGeoLevelHierarchyError(errors_list)
+            # Check for parent referencing a non-existent geo level
+            elif parent_geo_level_uid not in geo_level_uids:
+                errors_list.append(
+                    f"Location type '{geo_level_name}' references a parent location type with unique id '{parent_geo_level_uid}' that is not found in the hierarchy."
+                )
 
-        return
+    return tuple(errors_list), tuple(geo_level[0] for geo_level in visited_nodes)
 
 
 class LocationColumnMapping:
@@ -555,6 +548,198 @@ class LocationsUpload:
         record_errors["summary"]["total_rows_with_errors"] = 0
         return
 
+    def save_records(
+        self,
+        survey_uid,
+        ordered_geo_levels,
+        geo_level_mapping_lookup,
+        write_mode="overwrite",
+        copy_threshold=50000,
+    ):
+        """
+        Method to save the locations data to the database
+
+        Locations are written one geo level at a time starting from the top of the hierarchy.
+        The location_uids returned by each geo level's insert are merged onto the rows of the
+        next geo level to resolve the parent locations, so parents are never re-queried.
+
+        :param survey_uid: The survey uid for which the locations are being saved
+        :param ordered_geo_levels: List of geo levels for the survey from the database in descending order based on the location type hierarchy
+        :param geo_level_mapping_lookup: Dictionary of geo level column mappings from the request payload keyed by geo level uid
+        :param write_mode: "overwrite" if the existing locations for the survey have already been removed, "append" to skip locations that already exist
+        :param copy_threshold: Geo levels with at least this many new locations are loaded with COPY instead of a multi-row insert
+        """
+
+        existing_locations_df = pd.DataFrame(
+            columns=["geo_level_uid", "location_id", "location_uid"]
+        )
+        if write_mode == "append":
+            existing_locations_df = pd.DataFrame(
+                db.session.query(
+                    Location.geo_level_uid,
+                    Location.location_id,
+                    Location.location_uid,
+                )
+                .filter(Location.survey_uid == survey_uid)
+                .all(),
+                columns=["geo_level_uid", "location_id", "location_uid"],
+            )
+
+        parent_locations_df = None
+        for geo_level in ordered_geo_levels:
+            column_mapping = geo_level_mapping_lookup[geo_level.geo_level_uid]
+            columns = {
+                column_mapping["location_id_column"]: "location_id",
+                column_mapping["location_name_column"]: "location_name",
+            }
+            if geo_level.parent_geo_level_uid is not None:
+                columns[
+                    geo_level_mapping_lookup[geo_level.parent_geo_level_uid][
+                        "location_id_column"
+                    ]
+                ] = "parent_location_id"
+
+            locations_df = (
+                self.locations_df[list(columns)]
+                .drop_duplicates()
+                .rename(columns=columns)
+            )
+
+            # Resolve the parent location_uids from the previously written geo level
+            if parent_locations_df is not None:
+                locations_df = locations_df.merge(
+                    parent_locations_df.rename(
+                        columns={
+                            "location_id": "parent_location_id",
+                            "location_uid": "parent_location_uid",
+                        }
+                    ),
+                    how="left",
+                    on="parent_location_id",
+                )
+            else:
+                locations_df["parent_location_uid"] = None
+
+            # Locations that already exist for the geo level are not inserted again
+            # but are still needed to resolve the parents of the next geo level
+            geo_level_existing_df = existing_locations_df.loc[
+                existing_locations_df["geo_level_uid"] == geo_level.geo_level_uid,
+                ["location_id", "location_uid"],
+            ]
+            locations_df = locations_df[
+                ~locations_df["location_id"].isin(geo_level_existing_df["location_id"])
+            ]
+
+            # COPY is not available with the gevent wait callback installed
+            if len(locations_df) >= copy_threshold and not is_green_db_driver():
+                inserted_df = self.__copy_locations(
+                    survey_uid, geo_level.geo_level_uid, locations_df
+                )
+            else:
+                inserted_df = self.__insert_locations(
+                    survey_uid, geo_level.geo_level_uid, locations_df
+                )
+
+            parent_locations_df = pd.concat(
+                [geo_level_existing_df, inserted_df], ignore_index=True
+            )
+
+        return
+
+    def __insert_locations(self, survey_uid, geo_level_uid, locations_df):
+        """
+        Method to insert the locations for a geo level with a single multi-row insert
+
+        Returns a dataframe of the location_id and the generated location_uid of the inserted locations
+        """
+
+        if len(locations_df) == 0:
+            return pd.DataFrame(columns=["location_id", "location_uid"])
+
+        # Convert the parent location_uids to python ints with None for missing parents
+        parent_location_uids = (
+            pd.array(locations_df["parent_location_uid"], dtype="Int64")
+            .to_numpy(dtype=object, na_value=None)
+            .tolist()
+        )
+
+        location_records_to_insert = [
+            (
+                survey_uid,
+                geo_level_uid,
+                location_id,
+                location_name,
+                parent_location_uid,
+            )
+            for location_id, location_name, parent_location_uid in zip(
+                locations_df["location_id"],
+                locations_df["location_name"],
+                parent_location_uids,
+            )
+        ]
+
+        # execute_values sends the rows as a single multi-row insert without the overhead
+        # of compiling a bind parameter per value, which dominates for large geo levels
+        # Use the session's own connection so the insert runs in the same transaction
+        dbapi_connection = db.session.connection().connection
+        with dbapi_connection.cursor() as cursor:
+            inserted_locations = execute_values(
+                cursor,
+                f"INSERT INTO {Location.__table__.fullname} (survey_uid, geo_level_uid, location_id, location_name, parent_location_uid) VALUES %s RETURNING location_id, location_uid",
+                location_records_to_insert,
+                page_size=len(location_records_to_insert),
+                fetch=True,
+            )
+
+        return pd.DataFrame(inserted_locations, columns=["location_id", "location_uid"])
+
+    def __copy_locations(self, survey_uid, geo_level_uid, locations_df):
+        """
+        Method to load the locations for a geo level with COPY, used for very large geo levels
+
+        COPY does not return the generated location_uids so they are read back in a single query
+
+        Returns a dataframe of the location_id and the generated location_uid of the inserted locations
+        """
+
+        copy_df = pd.DataFrame(
+            {
+                "survey_uid": survey_uid,
+                "geo_level_uid": geo_level_uid,
+                "location_id": locations_df["location_id"],
+                "location_name": locations_df["location_name"],
+                "parent_location_uid": pd.array(
+                    locations_df["parent_location_uid"], dtype="Int64"
+                ),
+            }
+        )
+
+        buffer = io.StringIO()
+        copy_df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+
+        # Use the session's own connection so the COPY runs in the same transaction
+        dbapi_connection = db.session.connection().connection
+        with dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {Location.__table__.fullname} (survey_uid, geo_level_uid, location_id, location_name, parent_location_uid) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+
+        geo_level_locations_df = pd.DataFrame(
+            db.session.query(Location.location_id, Location.location_uid)
+            .filter(
+                Location.survey_uid == survey_uid,
+                Location.geo_level_uid == geo_level_uid,
+            )
+            .all(),
+            columns=["location_id", "location_uid"],
+        )
+
+        return geo_level_locations_df[
+            geo_level_locations_df["location_id"].isin(copy_df["location_id"])
+        ]
+
 
 class GeoLevelPayloadItem:
     """
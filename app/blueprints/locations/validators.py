@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
 from wtforms import FieldList, FormField, IntegerField, StringField
-from wtforms.validators import DataRequired
+from wtforms.validators import AnyOf, DataRequired, Optional
 
 
 class SurveyGeoLevelsQueryParamValidator(FlaskForm):
@@ -10,6 +10,19 @@ class SurveyGeoLevelsQueryParamValidator(FlaskForm):
     survey_uid = IntegerField(validators=[DataRequired()])
 
 
+class GetLocationsQueryParamValidator(FlaskForm):
+    class Meta:
+        csrf = False
+
+    survey_uid = IntegerField(validators=[DataRequired()])
+    file_format = StringField(
+        validators=[
+            Optional(),
+            AnyOf(["json", "csv"], message="Value must be one of %(values)s"),
+        ]
+    )
+
+
 class SurveyGeoLevelValidator(FlaskForm):
     class Meta:
         csrf = False
@@ -20,7 +20,10 @@ class UserTargetMapping(db.Model):
     )
     user_uid = db.Column(db.Integer, db.ForeignKey(User.user_uid, ondelete="CASCADE"))
 
-    __table_args__ = ({"schema": "webapp"},)
+    __table_args__ = (
+        db.Index("ix_user_target_mapping_user_uid", "user_uid"),
+        {"schema": "webapp"},
+    )
 
     def __init__(self, target_uid, user_uid):
         self.target_uid = target_uid
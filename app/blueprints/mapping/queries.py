@@ -162,7 +162,7 @@ def build_supervisors_with_mapping_criteria_values_subquery(
             User.user_uid,
             User.gender,
         )
-        .filter(User.active.is_(True), User.roles.any(bottom_level_role_uid))
+        .filter(User.active.is_(True), User.roles.contains([bottom_level_role_uid]))
         .cte()
     )
 
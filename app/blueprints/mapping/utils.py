@@ -3,12 +3,9 @@ from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app import db
 from app.blueprints.enumerators.models import SurveyorForm
-from app.blueprints.forms.models import Form
-from app.blueprints.module_questionnaire.models import ModuleQuestionnaire
-from app.blueprints.roles.models import Role
-from app.blueprints.roles.utils import InvalidRoleHierarchyError, RoleHierarchy
-from app.blueprints.surveys.models import Survey
+from app.blueprints.roles.utils import InvalidRoleHierarchyError
 from app.blueprints.targets.models import Target
+from app.utils.survey_context import SurveyContext
 
 from .errors import InvalidMappingRecordsError, MappingError
 from .models import UserMappingConfig, UserSurveyorMapping, UserTargetMapping
@@ -29,7 +26,8 @@ class TargetMapping:
         self.form_uid = form_uid
 
         # Get basics needed for the mapping
-        self.survey_uid = self.__get_survey_uid()
+        self.survey_context = SurveyContext.for_form(form_uid)
+        self.survey_uid = self.survey_context.survey_uid
         try:
             self.mapping_criteria = self.__get_mapping_criteria()
             self.prime_geo_level_uid = self.__get_prime_geo_level_uid()
@@ -37,41 +35,23 @@ class TargetMapping:
         except:
             raise
 
-    def __get_survey_uid(self):
-        """
-        Method to get the survey uid for the form
-
-        """
-        survey_uid = Form.query.filter_by(form_uid=self.form_uid).first().survey_uid
-        return survey_uid
-
     def __get_mapping_criteria(self):
         """
         Method to get the mapping criteria for the form
 
         """
-        module_questionnaire = ModuleQuestionnaire.query.filter_by(
-            survey_uid=self.survey_uid
-        ).first()
-        if (
-            module_questionnaire is None
-            or module_questionnaire.target_mapping_criteria is None
-            or len(module_questionnaire.target_mapping_criteria) == 0
-        ):
+        mapping_criteria = self.survey_context.target_mapping_criteria
+        if mapping_criteria is None or len(mapping_criteria) == 0:
             raise MappingError("Target to supervisor mapping criteria not found.")
 
-        return module_questionnaire.target_mapping_criteria
+        return mapping_criteria
 
     def __get_prime_geo_level_uid(self):
         """
         Method to get the prime geo level uid for the form
 
         """
-        prime_geo_level_uid = (
-            Survey.query.filter_by(survey_uid=self.survey_uid)
-            .first()
-            .prime_geo_level_uid
-        )
+        prime_geo_level_uid = self.survey_context.prime_geo_level_uid
         if "Location" in self.mapping_criteria:
             if prime_geo_level_uid is None:
                 raise MappingError(
@@ -84,17 +64,13 @@ class TargetMapping:
         Method to get the bottom level role uid for the survey
 
         """
-        roles = [
-            role.to_dict()
-            for role in Role.query.filter_by(survey_uid=self.survey_uid).all()
-        ]
-        if not roles:
+        if not self.survey_context.roles:
             raise MappingError(
                 "Roles not configured for the survey. Cannot perform target to supervisor mapping without roles."
             )
 
         try:
-            roles = RoleHierarchy(roles)
+            roles = self.survey_context.role_hierarchy
         except InvalidRoleHierarchyError as e:
             raise MappingError(e.role_hierarchy_errors)
 
@@ -456,7 +432,8 @@ class SurveyorMapping:
         self.form_uid = form_uid
 
         # Get basics needed for the mapping
-        self.survey_uid = self.__get_survey_uid()
+        self.survey_context = SurveyContext.for_form(form_uid)
+        self.survey_uid = self.survey_context.survey_uid
         try:
             self.mapping_criteria = self.__get_mapping_criteria()
             self.prime_geo_level_uid = self.__get_prime_geo_level_uid()
@@ -464,41 +441,23 @@ class SurveyorMapping:
         except:
             raise
 
-    def __get_survey_uid(self):
-        """
-        Method to get the survey uid for the form
-
-        """
-        survey_uid = Form.query.filter_by(form_uid=self.form_uid).first().survey_uid
-        return survey_uid
-
     def __get_mapping_criteria(self):
         """
         Method to get the surveyor - supervisor mapping criteria for the form
 
         """
-        module_questionnaire = ModuleQuestionnaire.query.filter_by(
-            survey_uid=self.survey_uid
-        ).first()
-        if (
-            module_questionnaire is None
-            or module_questionnaire.surveyor_mapping_criteria is None
-            or len(module_questionnaire.surveyor_mapping_criteria) == 0
-        ):
+        mapping_criteria = self.survey_context.surveyor_mapping_criteria
+        if mapping_criteria is None or len(mapping_criteria) == 0:
             raise MappingError("Surveyor to supervisor mapping criteria not found.")
 
-        return module_questionnaire.surveyor_mapping_criteria
+        return mapping_criteria
 
     def __get_prime_geo_level_uid(self):
         """
         Method to get the prime geo level uid for the form
 
         """
-        prime_geo_level_uid = (
-            Survey.query.filter_by(survey_uid=self.survey_uid)
-            .first()
-            .prime_geo_level_uid
-        )
+        prime_geo_level_uid = self.survey_context.prime_geo_level_uid
         if "Location" in self.mapping_criteria:
             if prime_geo_level_uid is None:
                 raise MappingError(
@@ -511,17 +470,13 @@ class SurveyorMapping:
         Method to get the bottom level role uid for the survey
 
         """
-        roles = [
-            role.to_dict()
-            for role in Role.query.filter_by(survey_uid=self.survey_uid).all()
-        ]
-        if not roles:
+        if not self.survey_context.roles:
             raise MappingError(
                 "Roles not configured for the survey. Cannot perform surveyor to supervisor mapping without roles."
             )
 
         try:
-            roles = RoleHierarchy(roles)
+            roles = self.survey_context.role_hierarchy
         except InvalidRoleHierarchyError as e:
             raise MappingError(e.role_hierarchy_errors)
 
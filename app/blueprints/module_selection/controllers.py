@@ -1,6 +1,5 @@
 from flask import jsonify
 
-from app.blueprints.surveys.models import Survey
 from app.blueprints.surveys.utils import ModuleStatusCalculator, get_final_module_status
 from app.utils.utils import (
     custom_permissions_required,
@@ -124,7 +123,9 @@ def get_module_status(survey_uid):
     """
     Get the modules along with their stored status for a survey
     """
-    survey_state = Survey.query.filter_by(survey_uid=survey_uid).first().state
+    # Shared by all modules so that the survey data is loaded only once
+    module_status_calculator = ModuleStatusCalculator(survey_uid)
+    survey_state = module_status_calculator.state
 
     module_status = (
         db.session.query(ModuleStatus)
@@ -141,6 +142,7 @@ def get_module_status(survey_uid):
             module.module_id,
             survey_state,
             module.config_status,
+            module_status_calculator,
         )
 
         data.append(
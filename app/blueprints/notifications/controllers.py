@@ -1,16 +1,18 @@
+from collections import defaultdict
 from datetime import datetime
 
 from flask import jsonify
 from flask_login import current_user
+from sqlalchemy import and_, func, insert, or_, tuple_
 
-from app.blueprints.module_selection.models import Module, ModuleStatus
-from app.blueprints.roles.models import Permission, Role, RolePermission, SurveyAdmin
+from app.blueprints.module_selection.models import Module
 from app.blueprints.surveys.models import Survey
 from app.blueprints.user_management.models import User
 from app.utils.utils import (
     custom_permissions_required,
     logged_in_active_user_required,
     validate_payload,
+    validate_query_params,
 )
 
 from .models import (
@@ -21,10 +23,20 @@ from .models import (
     UserNotification,
     db,
 )
+from .queries import build_user_notifications_feed_subquery
 from .routes import notifications_bp
-from .utils import check_module_notification_exists, check_notification_condition
+from .utils import (
+    NotificationConditionEvaluator,
+    check_module_notification_exists,
+    check_notification_condition,
+    decode_notifications_cursor,
+    encode_notifications_cursor,
+    get_in_progress_notification_keys,
+)
 from .validators import (
     BulkPostActionPayloadValidator,
+    GetNotificationsCountQueryParamValidator,
+    GetNotificationsQueryParamValidator,
     PostActionPayloadValidator,
     PostNotificationsPayloadValidator,
     PutNotificationsPayloadValidator,
@@ -34,14 +46,17 @@ from .validators import (
 
 @notifications_bp.route("", methods=["GET"])
 @logged_in_active_user_required
-def get_notifications():
+@validate_query_params(GetNotificationsQueryParamValidator)
+def get_notifications(validated_query_params):
     """
     Get all notification for a user.
     Collects all notificacations based on role of user.
 
+    The user and survey notifications are fetched with a single query ordered by
+    created_at. Results are paginated with a cursor only if `limit` is specified.
+
     """
     user = current_user
-    user_uid = user.user_uid
 
     if not user:
         return (
@@ -54,137 +69,119 @@ def get_notifications():
             404,
         )
 
-    user_notifications = []
-    user_notifications = (
-        UserNotification.query.filter(UserNotification.user_uid == user_uid)
-        .order_by(UserNotification.created_at.desc())
-        .all()
-    )
+    resolution_status = validated_query_params.resolution_status.data
+    limit = validated_query_params.limit.data
+    cursor = validated_query_params.cursor.data
 
-    user_notification_dict = [
-        {
-            "type": "user",
-            **notification.to_dict(),
-        }
-        for notification in user_notifications
-    ]
+    notifications_feed = build_user_notifications_feed_subquery(
+        user, resolution_status
+    )
+    # Newest first. Notifications created at the same time keep the order they
+    # were created in, with survey notifications before user notifications
+    notifications_query = db.session.query(notifications_feed).order_by(
+        notifications_feed.c.created_at.desc(),
+        notifications_feed.c.type,
+        notifications_feed.c.notification_uid,
+    )
 
-    survey_notifications_dict = []
-    # If the user is a super admin, return all survey notifications
-    if user.is_super_admin:
-        survey_notifications = (
-            db.session.query(
-                SurveyNotification,
-                Survey.survey_id,
-                Module.module_id,
-                Module.name.label("module_name"),
+    if cursor:
+        created_at, notification_type, notification_uid = decode_notifications_cursor(
+            cursor
+        )
+        notifications_query = notifications_query.filter(
+            or_(
+                notifications_feed.c.created_at < created_at,
+                and_(
+                    notifications_feed.c.created_at == created_at,
+                    tuple_(
+                        notifications_feed.c.type, notifications_feed.c.notification_uid
+                    )
+                    > tuple_(notification_type, notification_uid),
+                ),
             )
-            .join(Survey, Survey.survey_uid == SurveyNotification.survey_uid)
-            .join(Module, Module.module_id == SurveyNotification.module_id)
-            .join(
-                ModuleStatus,
-                (ModuleStatus.module_id == Module.module_id)
-                & (ModuleStatus.survey_uid == SurveyNotification.survey_uid),
-            )  # Added to get only modules that are active
-            .order_by(SurveyNotification.created_at.desc())
-            .all()
         )
-        survey_notifications_dict = [
-            {
-                "survey_id": notification.survey_id,
-                "survey_uid": notification.SurveyNotification.survey_uid,
-                "module_name": notification.module_name,
-                "module_id": notification.module_id,
-                "type": "survey",
-                **notification.SurveyNotification.to_dict(),
-            }
-            for notification in survey_notifications
-        ]
+
+    if limit is not None:
+        # Fetch one extra row to know if there is a next page
+        notifications = notifications_query.limit(limit + 1).all()
+        has_next_page = len(notifications) > limit
+        notifications = notifications[:limit]
     else:
-        # Check if user is survey admin for any survey
-        survey_admin = SurveyAdmin.query.filter(SurveyAdmin.user_uid == user_uid).all()
-        admin_access_survey_uids = [
-            survey.survey_uid for survey in survey_admin if survey_admin is not None
-        ]
-
-        # IF Survey Admin for any survey pull all notifications for that survey
-        if len(admin_access_survey_uids) > 0:
-            survey_notifications = SurveyNotification.query.filter(
-                SurveyNotification.survey_uid.in_(admin_access_survey_uids)
-            ).all()
-            survey_notifications = (
-                db.session.query(
-                    SurveyNotification,
-                    Survey.survey_id,
-                    Module.module_id,
-                    Module.name.label("module_name"),
-                )
-                .join(Survey, Survey.survey_uid == SurveyNotification.survey_uid)
-                .join(Module, Module.module_id == SurveyNotification.module_id)
-                .filter(SurveyNotification.survey_uid.in_(admin_access_survey_uids))
-                .order_by(SurveyNotification.created_at.desc())
-                .all()
-            )
-            survey_notifications_dict += [
+        notifications = notifications_query.all()
+
+    notifications_dict = []
+    for notification in notifications:
+        notification_dict = {
+            "type": notification.type,
+            "notification_uid": notification.notification_uid,
+            "severity": notification.severity,
+            "resolution_status": notification.resolution_status,
+            "message": notification.message,
+            "created_at": notification.created_at,
+        }
+        if notification.type == "survey":
+            notification_dict.update(
                 {
                     "survey_id": notification.survey_id,
-                    "survey_uid": notification.SurveyNotification.survey_uid,
+                    "survey_uid": notification.survey_uid,
                     "module_name": notification.module_name,
                     "module_id": notification.module_id,
-                    "type": "survey",
-                    **notification.SurveyNotification.to_dict(),
                 }
-                for notification in survey_notifications
-            ]
-
-        survey_notifications = (
-            db.session.query(
-                SurveyNotification,
-                Survey.survey_id,
-                Module.module_id,
-                Module.name.label("module_name"),
-            )
-            .select_from(SurveyNotification)
-            .join(Survey, Survey.survey_uid == SurveyNotification.survey_uid)
-            .join(Module, Module.module_id == SurveyNotification.module_id)
-            .join(Role, Role.survey_uid == SurveyNotification.survey_uid)
-            .join(User, User.roles.any(Role.role_uid))
-            .join(Permission, Module.module_id == Permission.module_id)
-            .join(
-                RolePermission,
-                (Role.role_uid == RolePermission.role_uid)
-                & (RolePermission.permission_uid == Permission.permission_uid),
             )
-            .filter(
-                User.user_uid == user_uid,
-                Permission.active,
-                SurveyNotification.survey_uid.notin_(admin_access_survey_uids),
-            )
-            .order_by(SurveyNotification.created_at.desc())
-            .all()
+        notifications_dict.append(notification_dict)
+
+    response = {
+        "success": True,
+        "data": notifications_dict,
+    }
+
+    if limit is not None:
+        response["pagination"] = {
+            "limit": limit,
+            "next_cursor": (
+                encode_notifications_cursor(notifications[-1])
+                if has_next_page
+                else None
+            ),
+        }
+
+    return jsonify(response)
+
+
+@notifications_bp.route("/count", methods=["GET"])
+@logged_in_active_user_required
+@validate_query_params(GetNotificationsCountQueryParamValidator)
+def get_notifications_count(validated_query_params):
+    """
+    Get the number of notifications for a user, by default only the unresolved ones.
+    Uses the same role based visibility as the notifications list.
+
+    """
+    user = current_user
+
+    if not user:
+        return (
+            jsonify(
+                {
+                    "error": "User not found",
+                    "success": False,
+                }
+            ),
+            404,
         )
-        survey_notifications_dict += [
-            {
-                "survey_id": notification.survey_id,
-                "survey_uid": notification.SurveyNotification.survey_uid,
-                "module_name": notification.module_name,
-                "module_id": notification.module_id,
-                "type": "survey",
-                **notification.SurveyNotification.to_dict(),
-            }
-            for notification in survey_notifications
-        ]
-
-    # Sort notifications by created_at
-    notifications = sorted(
-        survey_notifications_dict + user_notification_dict,
-        key=lambda x: x["created_at"],
-        reverse=True,
+
+    notifications_feed = build_user_notifications_feed_subquery(
+        user, validated_query_params.resolution_status.data
     )
+
+    count = db.session.query(func.count()).select_from(notifications_feed).scalar()
+
     return jsonify(
         {
             "success": True,
-            "data": notifications,
+            "data": {
+                "count": count,
+            },
         }
     )
 
@@ -601,81 +598,122 @@ def create_bulk_notifications_via_action(validated_payload):
     notifications_created = []
     errors = []
 
+    # Load the surveys, actions and action templates of all the actions up front
+    surveys = {
+        str(survey.survey_uid): survey
+        for survey in Survey.query.filter(
+            Survey.survey_uid.in_(
+                list({action_data["survey_uid"] for action_data in actions})
+            )
+        ).all()
+    }
+
+    notification_actions = {}
+    for notification_action in (
+        NotificationAction.query.filter(
+            NotificationAction.name.in_(
+                list({action_data["action"] for action_data in actions})
+            )
+        )
+        .order_by(NotificationAction.notification_action_uid)
+        .all()
+    ):
+        notification_actions.setdefault(notification_action.name, notification_action)
+
+    action_templates = defaultdict(list)
+    if notification_actions:
+        for template in (
+            db.session.query(
+                NotificationTemplate,
+                NotificationActionMapping.notification_action_uid,
+                NotificationActionMapping.condition,
+            )
+            .join(
+                NotificationActionMapping,
+                NotificationTemplate.notification_template_uid
+                == NotificationActionMapping.notification_template_uid,
+            )
+            .filter(
+                NotificationActionMapping.notification_action_uid.in_(
+                    [
+                        notification_action.notification_action_uid
+                        for notification_action in notification_actions.values()
+                    ]
+                )
+            )
+            .all()
+        ):
+            action_templates[template.notification_action_uid].append(
+                {
+                    **template.NotificationTemplate.to_dict(),
+                    "condition": template.condition,
+                }
+            )
+
+    survey_uids = [survey.survey_uid for survey in surveys.values()]
+    condition_evaluator = NotificationConditionEvaluator(survey_uids)
+
+    # Keys of the in progress notifications, checked for all actions in one query
+    existing_notification_keys = get_in_progress_notification_keys(
+        survey_uids,
+        list(
+            {
+                template["module_id"]
+                for templates in action_templates.values()
+                for template in templates
+            }
+        ),
+    )
+    notification_keys_to_update = set()
+    notifications_to_insert = {}
+
     for action_data in actions:
         survey_uid = action_data["survey_uid"]
         action = action_data["action"]
         form_uid = action_data["form_uid"]
 
-        survey = Survey.query.filter(Survey.survey_uid == survey_uid).first()
+        survey = surveys.get(str(survey_uid))
 
         if not survey:
             errors.append(f"Survey with UID {survey_uid} not found")
             continue
 
-        notification_action = NotificationAction.query.filter(
-            NotificationAction.name == action
-        ).first()
+        notification_action = notification_actions.get(action)
 
         if not notification_action:
             errors.append(f"Action {action} not found")
             continue
 
-        notification_template = (
-            db.session.query(NotificationTemplate, NotificationActionMapping.condition)
-            .join(
-                NotificationActionMapping,
-                NotificationTemplate.notification_template_uid
-                == NotificationActionMapping.notification_template_uid,
-            )
-            .filter(
-                NotificationActionMapping.notification_action_uid
-                == notification_action.notification_action_uid
-            )
-            .all()
-        )
-        notification_templates = [
-            {
-                **template.NotificationTemplate.to_dict(),
-                "condition": template.condition,
-            }
-            for template in notification_template
-        ]
-
         notification_created_flag = False
-        for template in notification_templates:
-            module_notification_exists = check_module_notification_exists(
-                survey_uid, template["module_id"], template["severity"]
+        for template in action_templates[notification_action.notification_action_uid]:
+            notification_key = (
+                survey.survey_uid,
+                template["module_id"],
+                template["severity"],
             )
 
-            if module_notification_exists:
-                SurveyNotification.query.filter(
-                    SurveyNotification.survey_uid == survey_uid,
-                    SurveyNotification.module_id == template["module_id"],
-                    SurveyNotification.severity == template["severity"],
-                    SurveyNotification.resolution_status == "in progress",
-                ).update({"created_at": datetime.now()}, synchronize_session="fetch")
+            if notification_key in existing_notification_keys:
+                notification_keys_to_update.add(notification_key)
                 notification_created_flag = True
 
-            elif check_notification_condition(
-                survey_uid,
+            elif notification_key in notifications_to_insert:
+                notification_created_flag = True
+
+            elif condition_evaluator.check(
+                survey.survey_uid,
                 form_uid,
                 template["condition"],
             ):
-
                 message = notification_action.message + " " + template["message"]
-                notification = SurveyNotification(
-                    survey_uid=survey_uid,
-                    module_id=template["module_id"],
-                    resolution_status="in progress",
-                    message=message,
-                    severity=template["severity"],
-                )
-
-                db.session.add(notification)
+                notifications_to_insert[notification_key] = {
+                    "survey_uid": survey.survey_uid,
+                    "module_id": template["module_id"],
+                    "resolution_status": "in progress",
+                    "message": message,
+                    "severity": template["severity"],
+                }
                 notification_created_flag = True
 
-            db.session.flush()
-
         if notification_created_flag:
             notifications_created.append(
                 {
@@ -686,6 +724,23 @@ def create_bulk_notifications_via_action(validated_payload):
             )
 
     try:
+        if notification_keys_to_update:
+            SurveyNotification.query.filter(
+                tuple_(
+                    SurveyNotification.survey_uid,
+                    SurveyNotification.module_id,
+                    SurveyNotification.severity,
+                ).in_(list(notification_keys_to_update)),
+                SurveyNotification.resolution_status == "in progress",
+            ).update({"created_at": datetime.now()}, synchronize_session=False)
+
+        if notifications_to_insert:
+            db.session.execute(
+                insert(SurveyNotification).values(
+                    list(notifications_to_insert.values())
+                )
+            )
+
         db.session.commit()
     except Exception as e:
         db.session.rollback()
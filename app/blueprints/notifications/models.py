@@ -39,9 +39,16 @@ class SurveyNotification(db.Model):
         db.TIMESTAMP, nullable=False, server_default=db.func.current_timestamp()
     )
 
-    __table_args__ = {
-        "schema": "webapp",
-    }
+    __table_args__ = (
+        db.Index(
+            "ix_survey_notifications_survey_module_severity_resolution",
+            "survey_uid",
+            "module_id",
+            "severity",
+            "resolution_status",
+        ),
+        {"schema": "webapp"},
+    )
 
     def __init__(
         self,
@@ -0,0 +1,89 @@
+from sqlalchemy import Integer, String, cast, exists, literal, null, or_, select, union_all
+
+from app.blueprints.module_selection.models import Module, ModuleStatus
+from app.blueprints.roles.models import Permission, Role, RolePermission, SurveyAdmin
+from app.blueprints.surveys.models import Survey
+
+from .models import SurveyNotification, UserNotification
+
+
+def build_user_notifications_feed_subquery(user, resolution_status=None):
+    """
+    Build a subquery with all the user and survey notifications visible to a user
+
+    Super admins see the survey notifications of all active modules, survey admins
+    see all the notifications of their surveys and other users see the notifications
+    of the modules their roles have active permissions on. Each notification is
+    returned once, with a `type` column of "survey" or "user".
+
+    Args:
+        user: User to get the notifications for
+        resolution_status: Only include notifications with this resolution status
+    """
+
+    survey_notifications_query = (
+        select(
+            literal("survey", String).label("type"),
+            SurveyNotification.notification_uid,
+            SurveyNotification.survey_uid,
+            Survey.survey_id,
+            Module.module_id,
+            Module.name.label("module_name"),
+            SurveyNotification.severity,
+            SurveyNotification.resolution_status,
+            SurveyNotification.message,
+            SurveyNotification.created_at,
+        )
+        .join(Survey, Survey.survey_uid == SurveyNotification.survey_uid)
+        .join(Module, Module.module_id == SurveyNotification.module_id)
+    )
+
+    if user.is_super_admin:
+        # Only include notifications of modules that are active for the survey
+        survey_notifications_query = survey_notifications_query.join(
+            ModuleStatus,
+            (ModuleStatus.module_id == Module.module_id)
+            & (ModuleStatus.survey_uid == SurveyNotification.survey_uid),
+        )
+    else:
+        survey_admin_survey_uids = select(SurveyAdmin.survey_uid).where(
+            SurveyAdmin.user_uid == user.user_uid
+        )
+        role_permission_exists = exists().where(
+            Role.survey_uid == SurveyNotification.survey_uid,
+            Role.role_uid.in_(user.roles or []),
+            RolePermission.role_uid == Role.role_uid,
+            Permission.permission_uid == RolePermission.permission_uid,
+            Permission.module_id == SurveyNotification.module_id,
+            Permission.active,
+        )
+
+        survey_notifications_query = survey_notifications_query.where(
+            or_(
+                SurveyNotification.survey_uid.in_(survey_admin_survey_uids),
+                role_permission_exists,
+            )
+        )
+
+    user_notifications_query = select(
+        literal("user", String).label("type"),
+        UserNotification.notification_uid,
+        cast(null(), Integer).label("survey_uid"),
+        cast(null(), String).label("survey_id"),
+        cast(null(), Integer).label("module_id"),
+        cast(null(), String).label("module_name"),
+        UserNotification.severity,
+        UserNotification.resolution_status,
+        UserNotification.message,
+        UserNotification.created_at,
+    ).where(UserNotification.user_uid == user.user_uid)
+
+    if resolution_status is not None:
+        survey_notifications_query = survey_notifications_query.where(
+            SurveyNotification.resolution_status == resolution_status
+        )
+        user_notifications_query = user_notifications_query.where(
+            UserNotification.resolution_status == resolution_status
+        )
+
+    return union_all(survey_notifications_query, user_notifications_query).subquery()
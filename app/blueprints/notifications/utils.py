@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from sqlalchemy import column, distinct, func, literal_column, select, union
 
 from app.blueprints.dq.models import DQCheck, DQCheckFilters
@@ -166,25 +168,18 @@ def check_form_variable_missing(survey_uid, form_uid, db):
     return
 
 
-def check_notification_condition(survey_uid, form_uid, input_conditions):
+def get_notification_condition_checks(survey_uid, form_uid):
     """
-    Match notification conditions according to survey configuration and dependency conditions
+    Get the notification condition checks for a survey and form
 
     Args:
-        survey_uid: UID of surveys
+        survey_uid: UID of survey
         form_uid: UID of form
-        input_conditions: List of Notification conditions
-    """
-    if input_conditions is None or len(input_conditions) == 0:
-        return True
-
-    if form_uid is None:
-        # TODO: Refactor this for multiple main forms
-        form = Form.query.filter_by(survey_uid=survey_uid, form_type="parent").first()
-        if form is not None:
-            form_uid = form.form_uid
 
-    condition_checks = {
+    Returns:
+        Dict of condition name to a function evaluating the condition
+    """
+    return {
         "location_exists": lambda: check_location_exists(survey_uid),
         "location_not_exists": lambda: not check_location_exists(survey_uid),
         "enumerator_exists": lambda: check_enumerator_exists(form_uid),
@@ -211,6 +206,48 @@ def check_notification_condition(survey_uid, form_uid, input_conditions):
         "media_config_exists": lambda: media_config_exists(form_uid),
     }
 
+
+def get_parent_form_uids(survey_uids):
+    """
+    Get the parent form_uid of each survey, used for the notification conditions
+    of survey level notifications
+
+    Args:
+        survey_uids: List of survey UIDs
+
+    Returns:
+        Dict of survey_uid to parent form_uid, without the surveys that have no
+        parent form
+    """
+    # TODO: Refactor this for multiple main forms
+    parent_form_uids = {}
+    for form in (
+        Form.query.filter(Form.survey_uid.in_(survey_uids), Form.form_type == "parent")
+        .order_by(Form.form_uid)
+        .all()
+    ):
+        parent_form_uids.setdefault(form.survey_uid, form.form_uid)
+
+    return parent_form_uids
+
+
+def check_notification_condition(survey_uid, form_uid, input_conditions):
+    """
+    Match notification conditions according to survey configuration and dependency conditions
+
+    Args:
+        survey_uid: UID of surveys
+        form_uid: UID of form
+        input_conditions: List of Notification conditions
+    """
+    if input_conditions is None or len(input_conditions) == 0:
+        return True
+
+    if form_uid is None:
+        form_uid = get_parent_form_uids([survey_uid]).get(survey_uid)
+
+    condition_checks = get_notification_condition_checks(survey_uid, form_uid)
+
     survey_conditions = {
         condition: condition_checks[condition]()
         for condition in input_conditions
@@ -220,6 +257,74 @@ def check_notification_condition(survey_uid, form_uid, input_conditions):
     return all(survey_conditions.values())
 
 
+class NotificationConditionEvaluator:
+    """
+    Class to evaluate notification conditions for many actions at once
+
+    The parent forms of the surveys are loaded in one query up front, and each
+    (survey_uid, form_uid, condition) predicate is evaluated at most once for
+    the lifetime of the evaluator, so it should be scoped to a single request.
+    """
+
+    def __init__(self, survey_uids):
+        self.__condition_results = {}
+        self.__parent_form_uids = get_parent_form_uids(survey_uids)
+
+    def check(self, survey_uid, form_uid, input_conditions):
+        """
+        Memoized equivalent of check_notification_condition
+
+        Args:
+            survey_uid: UID of survey
+            form_uid: UID of form
+            input_conditions: List of Notification conditions
+        """
+        if input_conditions is None or len(input_conditions) == 0:
+            return True
+
+        if form_uid is None:
+            form_uid = self.__parent_form_uids.get(survey_uid)
+
+        condition_checks = get_notification_condition_checks(survey_uid, form_uid)
+
+        for condition in input_conditions:
+            if condition not in condition_checks:
+                continue
+
+            key = (survey_uid, form_uid, condition)
+            if key not in self.__condition_results:
+                self.__condition_results[key] = condition_checks[condition]()
+
+            if not self.__condition_results[key]:
+                return False
+
+        return True
+
+
+def get_in_progress_notification_keys(survey_uids, module_ids):
+    """
+    Get the (survey_uid, module_id, severity) keys of in progress notifications
+
+    Args:
+        survey_uids: UIDs of surveys
+        module_ids: IDs of modules
+    """
+    return {
+        (row.survey_uid, row.module_id, row.severity)
+        for row in SurveyNotification.query.with_entities(
+            SurveyNotification.survey_uid,
+            SurveyNotification.module_id,
+            SurveyNotification.severity,
+        )
+        .filter(
+            SurveyNotification.survey_uid.in_(survey_uids),
+            SurveyNotification.module_id.in_(module_ids),
+            SurveyNotification.resolution_status == "in progress",
+        )
+        .distinct()
+    }
+
+
 #                       ########                    #
 #  Helper functions to check notification conditions #
 #                       ########                    #
@@ -317,3 +422,37 @@ def mapping_exists(form_uid):
 
 def media_config_exists(form_uid):
     return MediaFilesConfig.query.filter_by(form_uid=form_uid).first() is not None
+
+
+def encode_notifications_cursor(notification):
+    """
+    Encode the position of a notification in the notifications feed as a cursor
+
+    Args:
+        notification: Row of the notifications feed
+    """
+    return "|".join(
+        [
+            notification.created_at.isoformat(),
+            notification.type,
+            str(notification.notification_uid),
+        ]
+    )
+
+
+def decode_notifications_cursor(cursor):
+    """
+    Decode a notifications feed cursor into (created_at, type, notification_uid)
+
+    Args:
+        cursor: Cursor returned by encode_notifications_cursor
+
+    Raises:
+        ValueError: If the cursor is not valid
+    """
+    created_at, type, notification_uid = cursor.split("|")
+
+    if type not in ("survey", "user"):
+        raise ValueError(f"Invalid notification type {type}")
+
+    return datetime.fromisoformat(created_at), type, int(notification_uid)
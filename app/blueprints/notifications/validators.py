@@ -1,6 +1,14 @@
 from flask_wtf import FlaskForm
 from wtforms import FieldList, FormField, IntegerField, StringField
-from wtforms.validators import AnyOf, DataRequired
+from wtforms.validators import (
+    AnyOf,
+    DataRequired,
+    NumberRange,
+    Optional,
+    ValidationError,
+)
+
+from .utils import decode_notifications_cursor
 
 
 class PostNotificationsPayloadValidator(FlaskForm):
@@ -121,3 +129,43 @@ class PostActionPayloadValidator(FlaskForm):
 class BulkPostActionPayloadValidator(FlaskForm):
 
     actions = FieldList(FormField(PostActionPayloadValidator), min_entries=1)
+
+
+class GetNotificationsQueryParamValidator(FlaskForm):
+    class Meta:
+        csrf = False
+
+    resolution_status = StringField(
+        validators=[
+            Optional(),
+            AnyOf(
+                ["in progress", "done"],
+                message="Invalid Resolution Status valid values are in progress, done",
+            ),
+        ],
+        default=None,
+    )
+    limit = IntegerField(validators=[Optional(), NumberRange(min=1)], default=None)
+    cursor = StringField(default=None)
+
+    def validate_cursor(self, field):
+        if field.data:
+            try:
+                decode_notifications_cursor(field.data)
+            except ValueError:
+                raise ValidationError("Invalid cursor")
+
+
+class GetNotificationsCountQueryParamValidator(FlaskForm):
+    class Meta:
+        csrf = False
+
+    resolution_status = StringField(
+        validators=[
+            AnyOf(
+                ["in progress", "done"],
+                message="Invalid Resolution Status valid values are in progress, done",
+            ),
+        ],
+        default="in progress",
+    )
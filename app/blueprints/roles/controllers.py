@@ -1,3 +1,6 @@
+import base64
+import binascii
+
 from flask import jsonify, request
 from flask_login import current_user
 from sqlalchemy import ARRAY, Integer, cast, distinct, func, insert
@@ -10,19 +13,21 @@ from app.blueprints.module_selection.models import ModuleStatus
 from app.utils.utils import (
     custom_permissions_required,
     logged_in_active_user_required,
+    update_module_status,
     validate_payload,
     validate_query_params,
 )
 
-from .errors import InvalidRoleHierarchyError
+from .errors import InvalidRoleHierarchyError, InvalidUserHierarchyImportError
 from .models import Permission, Role, RolePermission, SurveyAdmin, UserHierarchy
 from .routes import roles_bp
-from .utils import RoleHierarchy
+from .utils import RoleHierarchy, UserHierarchyImport
 from .validators import (
     CreatePermissionPayloadValidator,
     GetPermissionsQueryParamValidator,
     SurveyRolesPayloadValidator,
     SurveyRolesQueryParamValidator,
+    UserHierarchyImportPayloadValidator,
     UserHierarchyParamValidator,
     UserHierarchyPayloadValidator,
 )
@@ -456,6 +461,70 @@ def update_user_hierarchy(validated_payload):
         )
 
 
+@roles_bp.route("/user-hierarchy/import", methods=["PUT"])
+@logged_in_active_user_required
+@validate_payload(UserHierarchyImportPayloadValidator)
+@custom_permissions_required("ADMIN", "body", "survey_uid")
+def import_user_hierarchy(validated_payload):
+    """
+    Function to replace the user hierarchy and user locations of a survey in bulk
+
+    The records are passed either as a list of users or as a base64 encoded csv
+    file. All the records are validated before any changes are made and the
+    changes are saved in one transaction.
+    """
+
+    survey_uid = validated_payload.survey_uid.data
+
+    try:
+        if validated_payload.file.data:
+            user_hierarchy_import = UserHierarchyImport.from_csv(
+                survey_uid,
+                base64.b64decode(validated_payload.file.data, validate=True).decode(
+                    "utf-8"
+                ),
+            )
+        else:
+            user_hierarchy_import = UserHierarchyImport(
+                survey_uid, validated_payload.users.data
+            )
+    except (binascii.Error, UnicodeDecodeError):
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "errors": ["File data has invalid base64 or UTF-8 encoding"],
+                }
+            ),
+            422,
+        )
+    except InvalidUserHierarchyImportError as e:
+        return (
+            jsonify({"success": False, "errors": e.user_hierarchy_errors}),
+            422,
+        )
+
+    try:
+        user_hierarchy_import.save_records()
+        # The mapping status depends on the supervisor hierarchy, so it is
+        # recalculated once for the whole import. This also commits the import.
+        update_module_status(17, survey_uid=survey_uid)
+    except IntegrityError as e:
+        db.session.rollback()
+        return jsonify(message=str(e)), 500
+
+    return (
+        jsonify(
+            {
+                "success": True,
+                "message": "User hierarchy imported successfully",
+                "data": {"user_count": len(user_hierarchy_import.records)},
+            }
+        ),
+        200,
+    )
+
+
 @roles_bp.route("/user-hierarchy", methods=["DELETE"])
 @logged_in_active_user_required
 @validate_query_params(UserHierarchyParamValidator)
@@ -1,3 +1,8 @@
 class InvalidRoleHierarchyError(Exception):
     def __init__(self, role_hierarchy_errors):
         self.role_hierarchy_errors = role_hierarchy_errors
+
+
+class InvalidUserHierarchyImportError(Exception):
+    def __init__(self, user_hierarchy_errors):
+        self.user_hierarchy_errors = user_hierarchy_errors
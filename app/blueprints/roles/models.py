@@ -72,6 +72,11 @@ class UserHierarchy(db.Model):
 
     __table_args__ = (
         db.PrimaryKeyConstraint("survey_uid", "user_uid", name="user_hierarchy_pk"),
+        db.Index(
+            "ix_user_hierarchy_survey_uid_parent_user_uid",
+            "survey_uid",
+            "parent_user_uid",
+        ),
         {"schema": "webapp"},
     )
 
@@ -1,158 +1,463 @@
+import csv
+import io
+from collections import Counter
+from functools import lru_cache
+
+from sqlalchemy import not_, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.sql.functions import func
 
 from app import db
 from app.blueprints.auth.models import User
+from app.blueprints.locations.models import Location
+from app.blueprints.surveys.models import Survey
 
-from .errors import InvalidRoleHierarchyError
-from .models import Role, SurveyAdmin
+from .errors import InvalidRoleHierarchyError, InvalidUserHierarchyImportError
+from .models import Role, SurveyAdmin, UserHierarchy
 
 
 class RoleHierarchy:
     """
     Class to represent the role hierarchy and run validations on it
+
+    The validation result and ordering are memoized on the (role_uid, role_name,
+    reporting_role_uid) values of the roles, so a survey's hierarchy is only
+    recomputed when its roles change
     """
 
     def __init__(self, roles):
         self.roles = roles
 
+        errors_list, ordered_role_uids = _resolve_role_hierarchy(
+            tuple(
+                (role["role_uid"], role["role_name"], role["reporting_role_uid"])
+                for role in roles
+            )
+        )
+        if errors_list:
+            raise InvalidRoleHierarchyError(list(errors_list))
+
+        roles_by_uid = {role["role_uid"]: role for role in roles}
+        self.ordered_roles = [roles_by_uid[role_uid] for role_uid in ordered_role_uids]
+
+
+@lru_cache(maxsize=1024)
+def _resolve_role_hierarchy(roles):
+    """
+    Function to validate a role hierarchy and order its roles from the top level role down
+
+    :param roles: Tuple of (role_uid, role_name, reporting_role_uid) tuples
+    Returns a tuple of the validation errors and a tuple of the ordered role_uids
+    """
+
+    errors_list = []
+
+    # Prechecks before we validate the tree
+
+    # There should be no duplicates on role_uid
+    for role_uid, count in Counter(role_uid for role_uid, _, _ in roles).items():
+        if count > 1:
+            errors_list.append(
+                f"Each role unique id defined in the role hierarchy should appear exactly once in the hierarchy. Role with role_uid='{role_uid}' appears {count} times in the hierarchy."
+            )
+
+    # There should be no duplicates on role_name
+    for role_name, count in Counter(role_name for _, role_name, _ in roles).items():
+        if count > 1:
+            errors_list.append(
+                f"Each role name defined in the role hierarchy should appear exactly once in the hierarchy. Role with role_name='{role_name}' appears {count} times in the hierarchy."
+            )
+
+    if len(errors_list) > 0:
+        return tuple(errors_list), ()
+
+    # Now validate the tree
+
+    # Exactly one role should have no parent
+    child_roles = {}
+    for role in roles:
+        child_roles.setdefault(role[2], []).append(role)
+    root_nodes = child_roles.get(None, [])
+
+    if len(root_nodes) == 0:
+        errors_list.append(
+            f"The hierarchy should have exactly one top level role (ie, a role with no parent). The current hierarchy has 0 roles with no parent."
+        )
+    elif len(root_nodes) > 1:
+        errors_list.append(
+            f"The hierarchy should have exactly one top level role (ie, a role with no parent). The current hierarchy has {len(root_nodes)} roles with no parent:\n{', '.join([role[1] for role in root_nodes])}"
+        )
+
+    if len(errors_list) > 0:
+        return tuple(errors_list), ()
+
+    # Traverse the tree to validate the following:
+    # 1. Each role should have at most one child role
+    # 2. The role hierarchy should not have any cycles
+    # 3. There are no roles that couldn't be visited from the top level role (graph is connected)
+    visited_nodes = [root_nodes[0]]
+    visited_role_uids = {root_nodes[0][0]}
+
+    while True:
+        child_nodes = child_roles.get(visited_nodes[-1][0], [])
+        if len(child_nodes) > 1:
+            errors_list.append(
+                f"Each role should have at most one child role. Role '{visited_nodes[-1][1]}' has {len(child_nodes)} child roles:\n{', '.join([role[1] for role in child_nodes])}"
+            )
+            break
+        elif len(child_nodes) == 1:
+            if child_nodes[0][0] in visited_role_uids:
+                errors_list.append(
+                    f"The role hierarchy should not have any cycles. The current hierarchy has a cycle starting with role '{child_nodes[0][1]}'."
+                )
+                break
+            visited_nodes.append(child_nodes[0])
+            visited_role_uids.add(child_nodes[0][0])
+        elif len(child_nodes) == 0:
+            break
+
+    if len(errors_list) > 0:
+        return tuple(errors_list), ()
+
+    # Now check that all nodes were visited
+    if len(visited_nodes) != len(roles):
+        unvisited_nodes = [role for role in roles if role[0] not in visited_role_uids]
+
+        errors_list.append(
+            f"All roles in the hierarchy should be able to be connected back to the top level role via a chain of parent role references. The current hierarchy has {len(unvisited_nodes)} roles that cannot be connected:\n{', '.join([role[1] for role in unvisited_nodes])}"
+        )
+
+        # Attempt to diagnose the unvisited nodes
+        # Not exhaustive of all issues
+        role_uids = {role[0] for role in roles}
+        for role_uid, role_name, reporting_role_uid in unvisited_nodes:
+            # Check for self-referencing
+            if reporting_role_uid == role_uid:
+                errors_list.append(
+                    f"Role '{role_name}' is referenced as its own parent. Self-referencing is not allowed."
+                )
+
+            # Check for parent referencing a non-existent role
+            elif reporting_role_uid not in role_uids:
+                errors_list.append(
+                    f"Role '{role_name}' references a parent role with unique id '{reporting_role_uid}' that is not found in the hierarchy."
+                )
+
+    return tuple(errors_list), tuple(role[0] for role in visited_nodes)
+
+
+class UserHierarchyImport:
+    """
+    Class to represent a bulk import of the user hierarchy and user locations of a
+    survey, validate it in memory and save it with set based statements
+
+    Each record has the keys user_uid, role_uid, parent_user_uid and location_uids.
+    The import replaces the full user hierarchy and user locations of the survey.
+    """
+
+    csv_columns = ["user_uid", "role_uid", "parent_user_uid", "location_uids"]
+
+    def __init__(self, survey_uid, records):
+        self.survey_uid = survey_uid
+        self.records = records
+
         try:
-            self.__validate_hierarchy()
+            self.__validate_records()
         except:
             raise
 
-        self.ordered_roles = self.__get_ordered_roles()
-
-    def __get_ordered_roles(self):
+    @classmethod
+    def from_csv(cls, survey_uid, csv_string):
         """
-        Method to create an ordered list of roles based on the role hierarchy
-        This method assumes that the role hierarchy has been validated
+        Create the import from a csv file with the columns in `csv_columns`
+
+        location_uids are separated by semicolons and parent_user_uid is left empty
+        for users of the top level role
         """
-        ordered_roles = [
-            role for role in self.roles if role["reporting_role_uid"] is None
+        # Short rows are padded with empty values so they fail the uid checks below
+        reader = csv.DictReader(io.StringIO(csv_string), restval="")
+
+        col_names = reader.fieldnames or []
+        missing_columns = [
+            column for column in cls.csv_columns if column not in col_names
         ]
+        if missing_columns:
+            raise InvalidUserHierarchyImportError(
+                [
+                    f"The file is missing the following columns: {', '.join(missing_columns)}"
+                ]
+            )
 
-        for i in range(len(self.roles) - 1):
-            for role in self.roles:
-                if role["reporting_role_uid"] == ordered_roles[i]["role_uid"]:
-                    ordered_roles.append(role)
+        errors_list = []
+        records = []
+        # Row numbers start at 2 because 1 is the header row
+        for row_number, row in enumerate(reader, start=2):
+            try:
+                records.append(
+                    {
+                        "user_uid": int(row["user_uid"]),
+                        "role_uid": int(row["role_uid"]),
+                        "parent_user_uid": (
+                            int(row["parent_user_uid"])
+                            if row["parent_user_uid"].strip()
+                            else None
+                        ),
+                        "location_uids": [
+                            int(location_uid)
+                            for location_uid in row["location_uids"].split(";")
+                            if location_uid.strip()
+                        ],
+                    }
+                )
+            except (TypeError, ValueError):
+                errors_list.append(
+                    f"Row {row_number} has a value that is not a valid unique id."
+                )
+
+        if len(errors_list) > 0:
+            raise InvalidUserHierarchyImportError(errors_list)
 
-        return ordered_roles
+        return cls(survey_uid, records)
 
-    def __validate_hierarchy(self):
+    def __validate_records(self):
         """
-        Function to run validations on the role hierarchy and return a list of errors
+        Method to validate the records against the role hierarchy of the survey
 
-        :param roles: List of roles for the survey
+        All the lookups are loaded with one query each so that the validation
+        does not depend on the number of records
         """
         errors_list = []
 
-        # Prechecks before we validate the tree
+        roles = [
+            role.to_dict()
+            for role in Role.query.filter_by(survey_uid=self.survey_uid).all()
+        ]
+        try:
+            role_hierarchy = RoleHierarchy(roles)
+        except InvalidRoleHierarchyError as e:
+            raise InvalidUserHierarchyImportError(e.role_hierarchy_errors)
+
+        reporting_role_uids = {
+            role["role_uid"]: role["reporting_role_uid"] for role in roles
+        }
+        role_names = {role["role_uid"]: role["role_name"] for role in roles}
+        bottom_level_role_uid = role_hierarchy.ordered_roles[-1]["role_uid"]
+
+        # Each user should appear exactly once in the import
+        user_uid_counts = Counter(record["user_uid"] for record in self.records)
+        for user_uid, count in user_uid_counts.items():
+            if count > 1:
+                errors_list.append(
+                    f"Each user should appear exactly once in the import. User with user_uid='{user_uid}' appears {count} times."
+                )
 
-        # There should be no duplicates on role_uid
-        role_uids = [role["role_uid"] for role in self.roles]
-        for role_uid in role_uids:
-            if role_uids.count(role_uid) > 1:
-                error_message = f"Each role unique id defined in the role hierarchy should appear exactly once in the hierarchy. Role with role_uid='{role_uid}' appears {role_uids.count(role_uid)} times in the hierarchy."
+        if len(errors_list) > 0:
+            raise InvalidUserHierarchyImportError(errors_list)
+
+        records_by_user_uid = {record["user_uid"]: record for record in self.records}
+        referenced_user_uids = set(records_by_user_uid) | {
+            record["parent_user_uid"]
+            for record in self.records
+            if record["parent_user_uid"] is not None
+        }
+        user_roles = {
+            user.user_uid: set(user.roles or [])
+            for user in User.query.filter(User.user_uid.in_(list(referenced_user_uids)))
+        }
+
+        for user_uid in sorted(referenced_user_uids - set(user_roles)):
+            errors_list.append(f"User with user_uid='{user_uid}' does not exist.")
 
-                if error_message not in errors_list:
-                    errors_list.append(error_message)
+        if len(errors_list) > 0:
+            raise InvalidUserHierarchyImportError(errors_list)
 
-        # There should be no duplicates on role_name
-        role_names = [role["role_name"] for role in self.roles]
-        for role_name in role_names:
-            if role_names.count(role_name) > 1:
-                error_message = f"Each role name defined in the role hierarchy should appear exactly once in the hierarchy. Role with role_name='{role_name}' appears {role_names.count(role_name)} times in the hierarchy."
+        for record in self.records:
+            user_uid = record["user_uid"]
+            role_uid = record["role_uid"]
+            parent_user_uid = record["parent_user_uid"]
 
-                if error_message not in errors_list:
-                    errors_list.append(error_message)
+            if role_uid not in reporting_role_uids:
+                errors_list.append(
+                    f"User with user_uid='{user_uid}' is assigned a role with role_uid='{role_uid}' that is not found in the role hierarchy of the survey."
+                )
+                continue
 
-        if len(errors_list) > 0:
-            raise InvalidRoleHierarchyError(errors_list)
+            if role_uid not in user_roles[user_uid]:
+                errors_list.append(
+                    f"User with user_uid='{user_uid}' does not have the role '{role_names[role_uid]}'."
+                )
 
-        # Now validate the tree
+            # The parent user should have the role that the user's role reports to
+            parent_role_uid = reporting_role_uids[role_uid]
+            if parent_role_uid is None:
+                if parent_user_uid is not None:
+                    errors_list.append(
+                        f"User with user_uid='{user_uid}' has the top level role '{role_names[role_uid]}' and should not have a parent user."
+                    )
+            elif parent_user_uid is None:
+                errors_list.append(
+                    f"User with user_uid='{user_uid}' should have a parent user with the role '{role_names[parent_role_uid]}'."
+                )
+            elif (
+                parent_user_uid in records_by_user_uid
+                and records_by_user_uid[parent_user_uid]["role_uid"] != parent_role_uid
+            ) or (
+                parent_user_uid not in records_by_user_uid
+                and parent_role_uid not in user_roles[parent_user_uid]
+            ):
+                errors_list.append(
+                    f"User with user_uid='{user_uid}' has the role '{role_names[role_uid]}' and should have a parent user with the role '{role_names[parent_role_uid]}'. The parent user with user_uid='{parent_user_uid}' does not have this role."
+                )
 
-        # Exactly one role should have no parent
-        root_nodes = [role for role in self.roles if role["reporting_role_uid"] is None]
+            if record["location_uids"] and role_uid != bottom_level_role_uid:
+                errors_list.append(
+                    f"User with user_uid='{user_uid}' has locations but location mapping is only allowed for the lowest supervisor role."
+                )
 
-        if len(root_nodes) == 0:
-            errors_list.append(
-                f"The hierarchy should have exactly one top level role (ie, a role with no parent). The current hierarchy has 0 roles with no parent."
-            )
-        elif len(root_nodes) > 1:
-            errors_list.append(
-                f"The hierarchy should have exactly one top level role (ie, a role with no parent). The current hierarchy has {len(root_nodes)} roles with no parent:\n{', '.join([role['role_name'] for role in root_nodes])}"
-            )
+        errors_list += self.__get_cycle_errors(records_by_user_uid)
+        errors_list += self.__get_location_errors()
 
         if len(errors_list) > 0:
-            raise InvalidRoleHierarchyError(errors_list)
-
-        # Traverse the tree to validate the following:
-        # 1. Each role should have at most one child role
-        # 2. The role hierarchy should not have any cycles
-        # 3. There are no roles that couldn't be visited from the top level role (graph is connected)
-        root_node = root_nodes[0]
-        visited_nodes = [root_node]
-
-        while True:
-            child_nodes = [
-                role
-                for role in self.roles
-                if role["reporting_role_uid"] == visited_nodes[-1]["role_uid"]
-            ]
-            if len(child_nodes) > 1:
-                errors_list.append(
-                    f"Each role should have at most one child role. Role '{visited_nodes[-1]['role_name']}' has {len(child_nodes)} child roles:\n{', '.join([role['role_name'] for role in child_nodes])}"
-                )
-                break
-            elif len(child_nodes) == 1:
-                if child_nodes[0]["role_uid"] in [
-                    role["role_uid"] for role in visited_nodes
-                ]:
+            raise InvalidUserHierarchyImportError(errors_list)
+
+        return
+
+    def __get_cycle_errors(self, records_by_user_uid):
+        """
+        Method to find cycles in the parent user references of the import
+
+        Each user is visited once, so this is linear in the number of records
+        """
+        errors_list = []
+        # Users whose chain of parents has been checked fully
+        checked_user_uids = set()
+
+        for user_uid in records_by_user_uid:
+            path = []
+            path_user_uids = set()
+            current_user_uid = user_uid
+            while (
+                current_user_uid in records_by_user_uid
+                and current_user_uid not in checked_user_uids
+            ):
+                if current_user_uid in path_user_uids:
                     errors_list.append(
-                        f"The role hierarchy should not have any cycles. The current hierarchy has a cycle starting with role '{child_nodes[0]['role_name']}'."
+                        f"The user hierarchy should not have any cycles. The current hierarchy has a cycle starting with user_uid='{current_user_uid}'."
                     )
                     break
-                visited_nodes.append(child_nodes[0])
-            elif len(child_nodes) == 0:
-                break
+                path.append(current_user_uid)
+                path_user_uids.add(current_user_uid)
+                current_user_uid = records_by_user_uid[current_user_uid][
+                    "parent_user_uid"
+                ]
 
-        if len(errors_list) > 0:
-            raise InvalidRoleHierarchyError(errors_list)
-
-        # Now check that all nodes were visited
-        if len(visited_nodes) != len(self.roles):
-            unvisited_nodes = [
-                role
-                for role in self.roles
-                if role["role_uid"]
-                not in [visited_node["role_uid"] for visited_node in visited_nodes]
+            checked_user_uids.update(path)
+
+        return errors_list
+
+    def __get_location_errors(self):
+        """
+        Method to check that the locations are prime geo level locations of the survey
+        """
+        location_uids = {
+            location_uid
+            for record in self.records
+            for location_uid in record["location_uids"]
+        }
+        if len(location_uids) == 0:
+            return []
+
+        prime_geo_level_uid = Survey.query.get(self.survey_uid).prime_geo_level_uid
+        if prime_geo_level_uid is None:
+            return [
+                "A prime geo level must be defined for the survey for user location mapping."
             ]
 
-            errors_list.append(
-                f"All roles in the hierarchy should be able to be connected back to the top level role via a chain of parent role references. The current hierarchy has {len(unvisited_nodes)} roles that cannot be connected:\n{', '.join([role['role_name'] for role in unvisited_nodes])}"
+        location_geo_levels = dict(
+            db.session.query(Location.location_uid, Location.geo_level_uid).filter(
+                Location.location_uid.in_(list(location_uids))
             )
+        )
 
-            # Attempt to diagnose the unvisited nodes
-            # Not exhaustive of all issues
-            for role in unvisited_nodes:
-                # Check for self-referencing
-                if role["reporting_role_uid"] == role["role_uid"]:
-                    errors_list.append(
-                        f"Role '{role['role_name']}' is referenced as its own parent. Self-referencing is not allowed."
-                    )
+        errors_list = []
+        for location_uid in sorted(location_uids):
+            if location_uid not in location_geo_levels:
+                errors_list.append(f"Location with UID {location_uid} does not exist.")
+            elif location_geo_levels[location_uid] != prime_geo_level_uid:
+                errors_list.append(
+                    f"Location with UID {location_uid} is not a prime geo level location."
+                )
 
-                # Check for parent referencing a non-existent role
-                elif role["reporting_role_uid"] not in [
-                    role["role_uid"] for role in self.roles
-                ]:
-                    errors_list.append(
-                        f"Role '{role['role_name']}' references a parent role with unique id '{role['reporting_role_uid']}' that is not found in the hierarchy."
-                    )
+        return errors_list
 
-        if len(errors_list) > 0:
-            raise InvalidRoleHierarchyError(errors_list)
+    def save_records(self):
+        """
+        Method to replace the user hierarchy and user locations of the survey with
+        the records of the import
 
-        return
+        The changes are added to the session and not committed
+        """
+        from app.blueprints.user_management.models import UserLocation
+
+        user_uids = [record["user_uid"] for record in self.records]
+
+        UserHierarchy.query.filter(
+            UserHierarchy.survey_uid == self.survey_uid,
+            UserHierarchy.user_uid.notin_(user_uids),
+        ).delete(synchronize_session=False)
+
+        if self.records:
+            statement = pg_insert(UserHierarchy).values(
+                [
+                    {
+                        "survey_uid": self.survey_uid,
+                        "user_uid": record["user_uid"],
+                        "role_uid": record["role_uid"],
+                        "parent_user_uid": record["parent_user_uid"],
+                    }
+                    for record in self.records
+                ]
+            )
+            db.session.execute(
+                statement.on_conflict_do_update(
+                    constraint="user_hierarchy_pk",
+                    set_={
+                        "role_uid": statement.excluded.role_uid,
+                        "parent_user_uid": statement.excluded.parent_user_uid,
+                    },
+                )
+            )
+
+        user_locations = {
+            (record["user_uid"], location_uid)
+            for record in self.records
+            for location_uid in record["location_uids"]
+        }
+
+        UserLocation.query.filter(
+            UserLocation.survey_uid == self.survey_uid,
+            not_(
+                tuple_(UserLocation.user_uid, UserLocation.location_uid).in_(
+                    list(user_locations)
+                )
+            ),
+        ).delete(synchronize_session=False)
+
+        if user_locations:
+            db.session.execute(
+                pg_insert(UserLocation)
+                .values(
+                    [
+                        {
+                            "survey_uid": self.survey_uid,
+                            "user_uid": user_uid,
+                            "location_uid": location_uid,
+                        }
+                        for user_uid, location_uid in user_locations
+                    ]
+                )
+                .on_conflict_do_nothing()
+            )
 
 
 def check_if_survey_admin(user_uid, survey_uid):
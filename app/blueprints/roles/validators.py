@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
 from wtforms import FieldList, FormField, IntegerField, StringField
-from wtforms.validators import DataRequired, ValidationError, InputRequired
+from wtforms.validators import DataRequired, ValidationError, InputRequired, Optional
 from app.blueprints.auth.models import User
 from app.blueprints.roles.models import Permission, Role
 from app.blueprints.surveys.models import Survey
@@ -124,6 +124,33 @@ class UserHierarchyPayloadValidator(FlaskForm):
             raise ValidationError(f"User with ID {field.data} does not exist.")
 
 
+class UserHierarchyImportRecordValidator(FlaskForm):
+    class Meta:
+        csrf = False
+
+    user_uid = IntegerField(validators=[DataRequired()])
+    role_uid = IntegerField(validators=[DataRequired()])
+    parent_user_uid = IntegerField(validators=[Optional()], default=None)
+    location_uids = FieldList(IntegerField(), default=[])
+
+
+class UserHierarchyImportPayloadValidator(FlaskForm):
+    survey_uid = IntegerField(validators=[DataRequired()])
+    users = FieldList(FormField(UserHierarchyImportRecordValidator), default=[])
+    file = StringField(validators=[Optional()], default=None)
+
+    def validate_survey_uid(form, field):
+        survey = Survey.query.get(field.data)
+        if not survey:
+            raise ValidationError(f"Survey with ID {field.data} does not exist.")
+
+    def validate_users(form, field):
+        if bool(form.file.data) == (len(field.data) > 0):
+            raise ValidationError(
+                "Exactly one of users and file should be provided for the import."
+            )
+
+
 class CreatePermissionPayloadValidator(FlaskForm):
     name = StringField(validators=[DataRequired()])
     description = StringField(validators=[DataRequired()])
@@ -13,18 +13,21 @@ from app.blueprints.module_selection.models import (
     ModuleDependency,
     ModuleStatus,
 )
-from app.blueprints.roles.models import Role, SurveyAdmin
+from app.blueprints.roles.models import SurveyAdmin
 from app.utils.utils import (
     custom_permissions_required,
     logged_in_active_user_required,
     validate_payload,
+    validate_query_params,
 )
 
 from .models import Survey
+from .queries import build_user_surveys_query
 from .routes import surveys_bp
 from .utils import ModuleStatusCalculator, get_final_module_status, is_module_optional
 from .validators import (
     CreateSurveyValidator,
+    GetSurveysQueryParamValidator,
     UpdateSurveyStateValidator,
     UpdateSurveyValidator,
 )
@@ -32,74 +35,43 @@ from .validators import (
 
 @surveys_bp.route("", methods=["GET"])
 @logged_in_active_user_required
-def get_all_surveys():
-    from app.blueprints.notifications.models import SurveyNotification
+@validate_query_params(GetSurveysQueryParamValidator)
+def get_all_surveys(validated_query_params):
+    """
+    Get the surveys the user has access to, with a flag for whether each survey
+    has unresolved errors. Results are ordered by survey_uid and paginated with a
+    cursor only if `limit` is specified.
+
+    """
+    search = validated_query_params.search.data
+    limit = validated_query_params.limit.data
+    cursor = validated_query_params.cursor.data
+
+    surveys_query = build_user_surveys_query(current_user, search).order_by(
+        Survey.survey_uid
+    )
 
-    if current_user.get_is_super_admin():
-        # Return all surveys for the super admin users
-        surveys = Survey.query.all()
+    if cursor is not None:
+        surveys_query = surveys_query.filter(Survey.survey_uid > cursor)
+
+    if limit is not None:
+        # Fetch one extra row to know if there is a next page
+        surveys = surveys_query.limit(limit + 1).all()
+        has_next_page = len(surveys) > limit
+        surveys = surveys[:limit]
     else:
-        survey_admin_check = SurveyAdmin.query.filter_by(
-            user_uid=current_user.user_uid
-        ).all()
-        user_roles = current_user.get_roles()
-
-        if survey_admin_check and user_roles:
-            # Get surveys where the user is a survey admin or associated with user's roles
-            survey_uids_admin = {entry.survey_uid for entry in survey_admin_check}
-            surveys_with_roles = (
-                Survey.query.join(
-                    Role, Survey.survey_uid == Role.survey_uid, isouter=True
-                )
-                .filter(
-                    (Role.role_uid.in_(user_roles))
-                    | (Survey.survey_uid.in_(survey_uids_admin))
-                )
-                .distinct()
-                .all()
-            )
-            surveys = surveys_with_roles
-        elif survey_admin_check:
-            # Get surveys where the user is a survey admin
-            survey_uids_admin = {entry.survey_uid for entry in survey_admin_check}
-            surveys = Survey.query.filter(
-                Survey.survey_uid.in_(survey_uids_admin)
-            ).all()
-        elif user_roles:
-            # Get surveys associated with the user's roles
-            surveys_with_roles = (
-                Survey.query.join(Role, Survey.survey_uid == Role.survey_uid)
-                .filter(Role.role_uid.in_(user_roles))
-                .distinct()
-                .all()
-            )
-            surveys = surveys_with_roles
-        else:
-            # No surveys for the user
-            surveys = []
-
-    # check if any unresolved notifications exist for the survey
-    data = []
-    for survey in surveys:
-        notifications = (
-            db.session.query(SurveyNotification.notification_uid)
-            .join(
-                ModuleStatus,
-                (SurveyNotification.module_id == ModuleStatus.module_id)
-                & (SurveyNotification.survey_uid == ModuleStatus.survey_uid),
-            )
-            .filter(
-                SurveyNotification.survey_uid == survey.survey_uid,
-                SurveyNotification.severity == "error",
-                SurveyNotification.resolution_status == "in progress",
-            )
-            .first()
-        )
+        surveys = surveys_query.all()
 
-        data.append({**survey.to_dict(), **{"error": True if notifications else False}})
+    data = [{**survey.to_dict(), "error": error} for survey, error in surveys]
 
     response = {"success": True, "data": data}
 
+    if limit is not None:
+        response["pagination"] = {
+            "limit": limit,
+            "next_cursor": surveys[-1][0].survey_uid if has_next_page else None,
+        }
+
     return jsonify(response), 200
 
 
@@ -224,12 +196,19 @@ def get_survey_config_status(survey_uid):
     num_error = 0
     num_optional = 0  # These are not included in the total number of modules
 
+    # Shared by all modules so that the survey data is loaded only once
+    module_status_calculator = ModuleStatusCalculator(survey_uid)
+
     for status in config_status:
         survey_state = status.survey_state
         data["overall_status"] = status["survey_overall_status"]
 
         module_status = get_final_module_status(
-            survey_uid, status.module_id, survey_state, status.config_status
+            survey_uid,
+            status.module_id,
+            survey_state,
+            status.config_status,
+            module_status_calculator,
         )
 
         if status.name in ["Background Details", "Feature Selection"]:
@@ -272,6 +251,7 @@ def get_survey_config_status(survey_uid):
                     status.optional,
                     status.required_if_conditions,
                     module_status,
+                    module_status_calculator,
                 )
 
             if calculated_optional_flag is False:
@@ -502,6 +482,7 @@ def update_survey_state(survey_uid, validated_payload):
                     status.optional,
                     status.required_if_conditions,
                     calculated_status,
+                    module_status_calculator,
                 )
 
                 if calculated_optional_flag == False and calculated_status not in [
@@ -0,0 +1,78 @@
+from sqlalchemy import exists, or_, select
+
+from app import db
+from app.blueprints.module_selection.models import ModuleStatus
+from app.blueprints.roles.models import Role, SurveyAdmin
+
+from .models import Survey
+
+
+def build_user_surveys_query(user, search=None):
+    """
+    Build a query of the surveys a user has access to, with a flag for whether
+    the survey has unresolved errors on any of its active modules
+
+    Super admins have access to all surveys, other users to the surveys they
+    are a survey admin of and the surveys of their roles.
+
+    Args:
+        user: User to get the surveys for
+        search: Only include surveys whose ID, name or project name contain this text
+    """
+
+    # Imported here to avoid a circular import through the notifications blueprint
+    from app.blueprints.notifications.models import SurveyNotification
+
+    survey_errors_subquery = (
+        db.session.query(SurveyNotification.survey_uid)
+        .join(
+            ModuleStatus,
+            (SurveyNotification.module_id == ModuleStatus.module_id)
+            & (SurveyNotification.survey_uid == ModuleStatus.survey_uid),
+        )
+        .filter(
+            SurveyNotification.severity == "error",
+            SurveyNotification.resolution_status == "in progress",
+        )
+        .group_by(SurveyNotification.survey_uid)
+        .subquery()
+    )
+
+    surveys_query = db.session.query(
+        Survey,
+        survey_errors_subquery.c.survey_uid.isnot(None).label("error"),
+    ).outerjoin(
+        survey_errors_subquery,
+        Survey.survey_uid == survey_errors_subquery.c.survey_uid,
+    )
+
+    if not user.is_super_admin:
+        surveys_query = surveys_query.filter(
+            or_(
+                Survey.survey_uid.in_(
+                    select(SurveyAdmin.survey_uid).where(
+                        SurveyAdmin.user_uid == user.user_uid
+                    )
+                ),
+                exists().where(
+                    Role.survey_uid == Survey.survey_uid,
+                    Role.role_uid.in_(user.roles or []),
+                ),
+            )
+        )
+
+    if search:
+        # Escape the LIKE wildcards so the search matches them literally
+        escaped_search = (
+            search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        search_pattern = f"%{escaped_search}%"
+        surveys_query = surveys_query.filter(
+            or_(
+                Survey.survey_id.ilike(search_pattern, escape="\\"),
+                Survey.survey_name.ilike(search_pattern, escape="\\"),
+                Survey.project_name.ilike(search_pattern, escape="\\"),
+            )
+        )
+
+    return surveys_query
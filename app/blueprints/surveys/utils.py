@@ -1,4 +1,4 @@
-from sqlalchemy import func
+from sqlalchemy import exists, func
 
 from app import db
 from app.blueprints.module_questionnaire.models import ModuleQuestionnaire
@@ -16,11 +16,17 @@ class ModuleStatusCalculator:
     "Live" and "Error" are not returned by this class as these are set based on
     external conditions and are calculated on the go when the status is fetched
 
+    The survey, its forms and its unresolved notifications are loaded once per
+    instance, per-form checks are done with one query for all forms and module
+    statuses are memoized, so a single instance should be used to calculate the
+    statuses of all the modules of a survey within a request.
+
     """
 
     def __init__(self, survey_uid):
         self.survey_uid = survey_uid
         self.state = None
+        self.surveying_method = None
 
         if self.__check_survey_exists() is False:
             raise ValueError("Survey not found")
@@ -30,10 +36,35 @@ class ModuleStatusCalculator:
 
         self.calculated_module_status = {}
 
+        self.__error_module_ids = None
+        self.__dependency_conditions = {}
+
     def __check_survey_exists(self):
         survey = Survey.query.filter_by(survey_uid=self.survey_uid).first()
+        if survey is None:
+            return False
+
         self.state = survey.state
-        return False if survey is None else True
+        self.surveying_method = survey.surveying_method
+        return True
+
+    def __get_form_uids_with_rows(self, form_uids, form_uid_column):
+        """
+        Get the subset of form_uids that have at least one row in the table of
+        form_uid_column, with a single EXISTS query for all the forms
+        """
+        from app.blueprints.forms.models import Form
+
+        if len(form_uids) == 0:
+            return set()
+
+        return {
+            row.form_uid
+            for row in db.session.query(Form.form_uid).filter(
+                Form.form_uid.in_(form_uids),
+                exists().where(form_uid_column == Form.form_uid),
+            )
+        }
 
     def __check_basic_information(self):
         module_questionnaire = ModuleQuestionnaire.query.filter_by(
@@ -74,14 +105,12 @@ class ModuleStatusCalculator:
         self.forms = [form.form_uid for form in forms]
 
         # Check if question mapping is done for all forms
-        for form in self.forms:
-            scto_question_mapping = SCTOQuestionMapping.query.filter_by(
-                form_uid=form
-            ).first()
-
-            # if there is a form for which question mapping is not done, then return in progress - incomplete
-            if scto_question_mapping is None:
-                return "In Progress - Incomplete"
+        # if there is a form for which question mapping is not done, then return in progress - incomplete
+        mapped_forms = self.__get_form_uids_with_rows(
+            self.forms, SCTOQuestionMapping.form_uid
+        )
+        if len(mapped_forms) < len(self.forms):
+            return "In Progress - Incomplete"
 
         return "Done"
 
@@ -94,9 +123,7 @@ class ModuleStatusCalculator:
 
         # If module selection is not done, then return not started
         # Additional roles/users are required based on which modules are selected
-        if self.calculated_module_status.get(2) is None:
-            self.calculated_module_status[2] = self.__check_module_selection()
-        if self.calculated_module_status[2] == "Not Started":
+        if self.get_status(2) == "Not Started":
             return "Not Started"
 
         # if field supervisor information is required - # Assignments and Emails
@@ -105,12 +132,12 @@ class ModuleStatusCalculator:
                 db.session.query(User)
                 .join(Role, Role.role_uid == func.any(User.roles))
                 .filter(Role.survey_uid == self.survey_uid)
-                .all()
+                .first()
             )
 
             if roles is None and survey_admin is None:
                 return "Not Started"
-            elif users is None or len(users) == 0:
+            elif users is None:
                 return "In Progress - Incomplete"
             else:
                 return "Done"
@@ -124,9 +151,7 @@ class ModuleStatusCalculator:
         from app.blueprints.locations.models import GeoLevel, Location
 
         # Check if module selection is done, if not then return not started
-        if self.calculated_module_status.get(2) is None:
-            self.calculated_module_status[2] = self.__check_module_selection()
-        if self.calculated_module_status[2] == "Not Started":
+        if self.get_status(2) == "Not Started":
             return "Not Started"
 
         geo_levels = GeoLevel.query.filter_by(survey_uid=self.survey_uid).first()
@@ -148,19 +173,14 @@ class ModuleStatusCalculator:
         from app.blueprints.enumerators.models import Enumerator
 
         # Check if surveycto information is present, if not then return not started
-        if self.calculated_module_status.get(3) is None:
-            self.calculated_module_status[3] = self.__check_surveycto_information()
-        if self.calculated_module_status[3] == "Not Started":
+        if self.get_status(3) == "Not Started":
             return "Not Started"
 
-        one_form = False
-        all_forms = True
-        for form in self.forms:
-            enumerators = Enumerator.query.filter_by(form_uid=form).first()
-            if enumerators is not None:
-                one_form = True
-            else:
-                all_forms = False
+        enumerator_forms = self.__get_form_uids_with_rows(
+            self.forms, Enumerator.form_uid
+        )
+        one_form = len(enumerator_forms) > 0
+        all_forms = len(enumerator_forms) == len(self.forms)
 
         if one_form and all_forms:
             return "Done"
@@ -173,20 +193,15 @@ class ModuleStatusCalculator:
         from app.blueprints.targets.models import Target, TargetConfig
 
         # Check if surveycto information is present, if not then return not started
-        if self.calculated_module_status.get(3) is None:
-            self.calculated_module_status[3] = self.__check_surveycto_information()
-        if self.calculated_module_status[3] == "Not Started":
+        if self.get_status(3) == "Not Started":
             return "Not Started"
 
-        one_form = False
-        all_forms = True
-        for form in self.forms:
-            targets = Target.query.filter_by(form_uid=form).first()
-            target_config = TargetConfig.query.filter_by(form_uid=form).first()
-            if target_config is not None:
-                one_form = True
-            if targets is None:
-                all_forms = False
+        target_config_forms = self.__get_form_uids_with_rows(
+            self.forms, TargetConfig.form_uid
+        )
+        target_forms = self.__get_form_uids_with_rows(self.forms, Target.form_uid)
+        one_form = len(target_config_forms) > 0
+        all_forms = len(target_forms) == len(self.forms)
 
         if one_form and all_forms:
             return "Done"
@@ -202,34 +217,23 @@ class ModuleStatusCalculator:
         )
 
         # Check if surveycto information is present, if not then return not started
-        if self.calculated_module_status.get(3) is None:
-            self.calculated_module_status[3] = self.__check_surveycto_information()
-        if self.calculated_module_status[3] == "Not Started":
+        if self.get_status(3) == "Not Started":
             return "Not Started"
 
         # Check is default target status mapping is present. If present, then the module is done.
         # This loads on webapp only after form selection, hence the previous check on forms
-        surveying_method = (
-            Survey.query.filter_by(survey_uid=self.survey_uid).first().surveying_method
-        )
         default_target_status_mapping = DefaultTargetStatusMapping.query.filter_by(
-            surveying_method=surveying_method
+            surveying_method=self.surveying_method
         ).first()
 
         if default_target_status_mapping:
             return "Done"
 
-        one_form = False
-        all_forms = True
-        for form in self.forms:
-            target_status_mapping = TargetStatusMapping.query.filter_by(
-                form_uid=form
-            ).first()
-
-            if target_status_mapping is not None:
-                one_form = True
-            else:
-                all_forms = False
+        target_status_mapping_forms = self.__get_form_uids_with_rows(
+            self.forms, TargetStatusMapping.form_uid
+        )
+        one_form = len(target_status_mapping_forms) > 0
+        all_forms = len(target_status_mapping_forms) == len(self.forms)
 
         if one_form and all_forms:
             return "Done"
@@ -239,14 +243,9 @@ class ModuleStatusCalculator:
             return "Not Started"
 
     def __check_assignments(self):
-        if self.calculated_module_status.get(7) is None:
-            self.calculated_module_status[7] = self.__check_enumerators()
-        if self.calculated_module_status.get(8) is None:
-            self.calculated_module_status[8] = self.__check_targets()
-
         if (
-            self.calculated_module_status[7] == "Not Started"
-            or self.calculated_module_status[8] == "Not Started"
+            self.get_status(7) == "Not Started"
+            or self.get_status(8) == "Not Started"
         ):
             return "Not Started"
         else:
@@ -260,39 +259,30 @@ class ModuleStatusCalculator:
         from app.blueprints.forms.models import Form, SCTOQuestionMapping
 
         # Check if surveycto information is present, if not then return not started
-        if self.calculated_module_status.get(3) is None:
-            self.calculated_module_status[3] = self.__check_surveycto_information()
-        if self.calculated_module_status[3] == "Not Started":
+        if self.get_status(3) == "Not Started":
             return "Not Started"
 
-        dq_config_in_progress = False
-        dq_form_in_progress = False
-        done = True
-        for form in self.forms:
-            # if dq config is present for any form, then it is in progress
-            dq_config = DQConfig.query.filter_by(form_uid=form).first()
-            if dq_config is not None:
-                dq_config_in_progress = True
-
-            # if dq form is present for any form, then it is in progress
-            dq_form_config = Form.query.filter_by(
-                survey_uid=self.survey_uid,
-                form_type="dq",
-                parent_form_uid=form,
-            ).all()
-            if dq_form_config is not None and len(dq_form_config) > 0:
-                dq_form_in_progress = True
+        # if dq config is present for any form, then it is in progress
+        dq_config_in_progress = (
+            len(self.__get_form_uids_with_rows(self.forms, DQConfig.form_uid)) > 0
+        )
 
-            # Check if scto question mapping is done for all dq forms
-            for dq_form in dq_form_config:
-                scto_question_mapping = SCTOQuestionMapping.query.filter_by(
-                    form_uid=dq_form.form_uid
-                ).first()
+        # if dq form is present for any form, then it is in progress
+        dq_forms = [
+            form.form_uid
+            for form in Form.query.filter(
+                Form.survey_uid == self.survey_uid,
+                Form.form_type == "dq",
+                Form.parent_form_uid.in_(self.forms),
+            ).all()
+        ]
+        dq_form_in_progress = len(dq_forms) > 0
 
-                # if scto question mapping is not done for any dq form, then it is not done
-                if scto_question_mapping is None:
-                    done = False
-                    break
+        # Check if scto question mapping is done for all dq forms
+        # if scto question mapping is not done for any dq form, then it is not done
+        done = len(
+            self.__get_form_uids_with_rows(dq_forms, SCTOQuestionMapping.form_uid)
+        ) == len(dq_forms)
 
         # if both dq form and dq config are not in progress, then it is not started
         if not dq_form_in_progress and not dq_config_in_progress:
@@ -314,15 +304,11 @@ class ModuleStatusCalculator:
         from app.blueprints.media_files.models import MediaFilesConfig
 
         # Check if surveycto information is present, if not then return not started
-        if self.calculated_module_status.get(3) is None:
-            self.calculated_module_status[3] = self.__check_surveycto_information()
-        if self.calculated_module_status[3] == "Not Started":
+        if self.get_status(3) == "Not Started":
             return "Not Started"
 
-        for form in self.forms:
-            media_files_config = MediaFilesConfig.query.filter_by(form_uid=form).first()
-            if media_files_config is not None:
-                return "In Progress"
+        if self.__get_form_uids_with_rows(self.forms, MediaFilesConfig.form_uid):
+            return "In Progress"
 
         return "Not Started"
 
@@ -333,28 +319,27 @@ class ModuleStatusCalculator:
         from app.blueprints.emails.models import EmailConfig, EmailTemplate
 
         # Check if surveycto information is present, if not then return not started
-        if self.calculated_module_status.get(3) is None:
-            self.calculated_module_status[3] = self.__check_surveycto_information()
-        if self.calculated_module_status[3] == "Not Started":
+        if self.get_status(3) == "Not Started":
             return "Not Started"
 
-        one_config = False
-        full_config = False
-        for form in self.forms:
-            email_config = EmailConfig.query.filter_by(form_uid=form).first()
-            if email_config is not None:
-                one_config = True
-
-            # Check if there are templates corresponding to the config
-            # We don't check schedules because it is possible that the schedule is added
-            # later like when using assignment emails
-            if email_config is not None:
-                email_template = EmailTemplate.query.filter_by(
-                    email_config_uid=email_config.email_config_uid
-                ).first()
+        one_config = (
+            len(self.__get_form_uids_with_rows(self.forms, EmailConfig.form_uid)) > 0
+        )
 
-                if email_template is not None:
-                    full_config = True
+        # Check if there are templates corresponding to the config
+        # We don't check schedules because it is possible that the schedule is added
+        # later like when using assignment emails
+        full_config = (
+            db.session.query(EmailConfig.email_config_uid)
+            .filter(
+                EmailConfig.form_uid.in_(self.forms),
+                exists().where(
+                    EmailTemplate.email_config_uid == EmailConfig.email_config_uid
+                ),
+            )
+            .first()
+            is not None
+        )
 
         # if not even one email config is present, then return not started
         if not one_config:
@@ -369,17 +354,11 @@ class ModuleStatusCalculator:
         from app.blueprints.assignments.table_config.models import TableConfig
 
         # Check if surveycto information is present, if not then return not started
-        if self.calculated_module_status.get(3) is None:
-            self.calculated_module_status[3] = self.__check_surveycto_information()
-        if self.calculated_module_status[3] == "Not Started":
+        if self.get_status(3) == "Not Started":
             return "Not Started"
 
-        for form in self.forms:
-            assignment_column_config = TableConfig.query.filter_by(
-                form_uid=form
-            ).first()
-            if assignment_column_config is not None:
-                return "In Progress"
+        if self.__get_form_uids_with_rows(self.forms, TableConfig.form_uid):
+            return "In Progress"
 
         return "Not Started"
 
@@ -389,15 +368,11 @@ class ModuleStatusCalculator:
         from app.blueprints.targets.models import Target
 
         # Check if module selection is done, if not then return not started
-        if self.calculated_module_status.get(2) is None:
-            self.calculated_module_status[2] = self.__check_module_selection()
-        if self.calculated_module_status[2] == "Not Started":
+        if self.get_status(2) == "Not Started":
             return "Not Started"
 
         # Check if surveycto information is present, if not then return not started
-        if self.calculated_module_status.get(3) is None:
-            self.calculated_module_status[3] = self.__check_surveycto_information()
-        if self.calculated_module_status[3] == "Not Started":
+        if self.get_status(3) == "Not Started":
             return "Not Started"
 
         completed = True
@@ -460,30 +435,51 @@ class ModuleStatusCalculator:
         if admin_form_config is None or len(admin_form_config) == 0:
             return "Not Started"
 
-        for form in admin_form_config:
-            scto_question_mapping = SCTOQuestionMapping.query.filter_by(
-                form_uid=form.form_uid
-            ).first()
-            if scto_question_mapping is None:
-                return "In Progress - Incomplete"
+        admin_forms = [form.form_uid for form in admin_form_config]
+        mapped_admin_forms = self.__get_form_uids_with_rows(
+            admin_forms, SCTOQuestionMapping.form_uid
+        )
+        if len(mapped_admin_forms) < len(admin_forms):
+            return "In Progress - Incomplete"
 
         return "In Progress"
 
     def check_unresolved_notifications(self, module_id):
         from app.blueprints.notifications.models import SurveyNotification
 
-        notifications = SurveyNotification.query.filter_by(
-            survey_uid=self.survey_uid,
-            module_id=module_id,
-            severity="error",  # Check if we need to check for other severity levels
-            resolution_status="in progress",
-        ).all()
-
-        if notifications is not None and len(notifications) > 0:
-            return True
-        return False
+        # Load the modules with unresolved errors for all modules at once
+        if self.__error_module_ids is None:
+            self.__error_module_ids = {
+                row.module_id
+                for row in db.session.query(SurveyNotification.module_id)
+                .filter_by(
+                    survey_uid=self.survey_uid,
+                    severity="error",  # Check if we need to check for other severity levels
+                    resolution_status="in progress",
+                )
+                .distinct()
+            }
+
+        return module_id in self.__error_module_ids
+
+    def check_dependency_conditions(self, conditions):
+        """
+        Memoized equivalent of check_module_dependency_condition for this survey
+        """
+        for condition in conditions:
+            if condition not in self.__dependency_conditions:
+                self.__dependency_conditions[
+                    condition
+                ] = check_module_dependency_condition(self.survey_uid, [condition])
+
+        return any(
+            self.__dependency_conditions[condition] for condition in conditions
+        )
 
     def get_status(self, module_id, final=False):
+        if module_id in self.calculated_module_status:
+            return self.calculated_module_status[module_id]
+
         if module_id == 1:
             status = self.__check_basic_information()
         elif module_id == 2:
@@ -524,8 +520,43 @@ class ModuleStatusCalculator:
         self.calculated_module_status[module_id] = status
         return self.calculated_module_status[module_id]
 
+    def get_final_status(self, module_id, survey_state, config_status):
+        """
+
+        Get the final module status based on:
+        1. If there are unresolved error notifications for the module
+        2. survey_state: Whether the survey is active or not
+        3. config_status: status stored in the module status table
+
+        """
+        # Check for errors on the go because config_status is not updated when there are errors
+        if self.check_unresolved_notifications(module_id):
+            return "Error"
+
+        # For 17 (mapping) and 4 (user and role management) module, we need to
+        # calculate the status based on data in the tables because the status is
+        # effected by user changes that are outside the survey configuration
+        if module_id in [4, 17]:
+            return self.get_status(module_id)
+
+        # For the output modules, if the state is active and the status is in progress or done, then the status is live
+        if (
+            module_id in [9, 10, 11, 12, 13, 15, 16, 18]
+            and survey_state == "Active"
+            and config_status
+            in [
+                "In Progress",
+                "Done",
+            ]
+        ):
+            return "Live"
+
+        return config_status
+
 
-def get_final_module_status(survey_uid, module_id, survey_state, config_status):
+def get_final_module_status(
+    survey_uid, module_id, survey_state, config_status, module_status_calculator=None
+):
     """
 
     Function to get the final module status based on:
@@ -533,31 +564,16 @@ def get_final_module_status(survey_uid, module_id, survey_state, config_status):
     2. survey_state: Whether the survey is active or not
     3. config_status: status stored in the module status table
 
+    Pass module_status_calculator when getting the status of several modules
+    of the survey so that the data it loads is shared between the modules.
+
     """
-    # Check for errors on the go because config_status is not updated when there are errors
-    module_status_calculator = ModuleStatusCalculator(survey_uid)
-    if module_status_calculator.check_unresolved_notifications(module_id):
-        return "Error"
-
-    # For 17 (mapping) and 4 (user and role management) module, we need to
-    # calculate the status based on data in the tables because the status is
-    # effected by user changes that are outside the survey configuration
-    if module_id in [4, 17]:
-        return module_status_calculator.get_status(module_id)
-
-    # For the output modules, if the state is active and the status is in progress or done, then the status is live
-    if (
-        module_id in [9, 10, 11, 12, 13, 15, 16, 18]
-        and survey_state == "Active"
-        and config_status
-        in [
-            "In Progress",
-            "Done",
-        ]
-    ):
-        return "Live"
+    if module_status_calculator is None:
+        module_status_calculator = ModuleStatusCalculator(survey_uid)
 
-    return config_status
+    return module_status_calculator.get_final_status(
+        module_id, survey_state, config_status
+    )
 
 
 def check_module_dependency_condition(survey_uid, conditions):
@@ -619,11 +635,18 @@ def check_surveying_method_mixed_mode(survey_uid):
 
 
 def is_module_optional(
-    survey_uid, saved_optional_flag, required_if_conditions, config_status
+    survey_uid,
+    saved_optional_flag,
+    required_if_conditions,
+    config_status,
+    module_status_calculator=None,
 ):
     """
     Check if the module is optional based on the conditions and the saved optional flag
 
+    Pass module_status_calculator to reuse the dependency conditions it has
+    already checked for the survey.
+
     """
 
     # These are universally mandatory modules
@@ -642,9 +665,10 @@ def is_module_optional(
         return False
 
     # check if required_if_conditions are met
-    elif required_if_conditions and check_module_dependency_condition(
-        survey_uid,
-        required_if_conditions,
+    elif required_if_conditions and (
+        module_status_calculator.check_dependency_conditions(required_if_conditions)
+        if module_status_calculator is not None
+        else check_module_dependency_condition(survey_uid, required_if_conditions)
     ):
         return False
 
@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
 from wtforms import IntegerField, StringField, DateField
-from wtforms.validators import DataRequired, AnyOf
+from wtforms.validators import DataRequired, AnyOf, NumberRange, Optional
 from wtforms import ValidationError
 
 
@@ -115,3 +115,12 @@ class UpdateSurveyStateValidator(FlaskForm):
             ),
         ]
     )
+
+
+class GetSurveysQueryParamValidator(FlaskForm):
+    class Meta:
+        csrf = False
+
+    search = StringField(default=None)
+    limit = IntegerField(validators=[Optional(), NumberRange(min=1)], default=None)
+    cursor = IntegerField(validators=[Optional()], default=None)
@@ -1,5 +1,6 @@
 import base64
 import binascii
+import io
 import json
 from datetime import datetime, timedelta
 from itertools import groupby
@@ -9,8 +10,7 @@ import pandas as pd
 import pysurveycto
 from flask import current_app, jsonify, request
 from flask_login import current_user
-from sqlalchemy import cast, update
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql.functions import func
 
@@ -20,7 +20,10 @@ from app.blueprints.locations.errors import InvalidGeoLevelHierarchyError
 from app.blueprints.locations.models import GeoLevel, Location
 from app.blueprints.locations.utils import GeoLevelHierarchy
 from app.blueprints.module_questionnaire.models import ModuleQuestionnaire
+from app.utils.replica_utils import use_read_replica
+from app.utils.scto_utils import SurveyCTOFetcher
 from app.utils.utils import (
+    build_jsonb_merge_expression,
     custom_permissions_required,
     get_aws_secret,
     logged_in_active_user_required,
@@ -232,50 +235,66 @@ def upload_targets(validated_query_params, validated_payload):
                             is_global_secret=True,
                         )
 
-                    # Set completion date intervals as - 1 week , 2 week, 1 month, 2 month, Fixed date - 2024-01-01
-                    # Iterate through the oldest date till reaching row_threshold
-                    date_today = datetime.today()
-                    oldest_date_array = [
-                        date_today - timedelta(weeks=1),
-                        date_today - timedelta(weeks=2),
-                        date_today - timedelta(weeks=4),
-                        date_today - timedelta(weeks=8),
-                        datetime(2020, 1, 1),
-                    ]
+                    scto_fetcher = SurveyCTOFetcher(
+                        form.scto_server_name,
+                        scto_credentials["username"],
+                        scto_credentials["password"],
+                        base_url=current_app.config["SCTO_API_BASE_URL"],
+                        cache_dir=current_app.config["SCTO_CACHE_DIR"],
+                        cache_ttl=current_app.config["SCTO_CACHE_TTL"],
+                    )
                     row_threshold = 10
 
+                    if encryption_key is None:
+                        # Fetch the submissions once, only new submissions are
+                        # downloaded if the form has been fetched before
+                        oldest_date_array = [None]
+                    else:
+                        # Decrypted submissions are not cached, so fetch the recent
+                        # submissions first and widen the window until there are
+                        # enough rows to preview
+                        date_today = datetime.today()
+                        oldest_date_array = [
+                            date_today - timedelta(weeks=1),
+                            date_today - timedelta(weeks=2),
+                            date_today - timedelta(weeks=4),
+                            date_today - timedelta(weeks=8),
+                            None,
+                        ]
+
                     for oldest_date in oldest_date_array:
-                        if scto_encryption_flag:
-                            scto_form = scto.get_form_data(
-                                scto_form_id,
-                                format="json",
-                                key=encryption_key,
-                                oldest_completion_date=oldest_date,
-                            )
-                        else:
-                            scto_form = scto.get_form_data(
-                                scto_form_id,
-                                format="json",
-                                oldest_completion_date=oldest_date,
-                            )
+                        scto_form = scto_fetcher.get_form_data(
+                            scto_form_id,
+                            key=encryption_key,
+                            oldest_completion_date=oldest_date,
+                        )
 
                         if len(scto_form) == 0:
                             continue
 
+                        # Preview the most recent submissions first
+                        scto_form = scto_form[::-1]
+
                         if target_scto_filter_list and len(target_scto_filter_list) > 0:
                             csv_string = apply_target_scto_filters(
                                 scto_form,
                                 target_scto_filter_list,
                                 data_format="json",
+                                row_threshold=row_threshold,
+                            )
+                            preview_row_count = (
+                                len(pd.read_csv(io.StringIO(csv_string)))
+                                if csv_string.strip()
+                                else 0
                             )
-                            if len(csv_string) > row_threshold:
-                                break
                         else:
                             # Convert JSON to CSV
                             df = pd.DataFrame.from_dict(scto_form[:row_threshold])
                             csv_string = df.to_csv(index=False)
-                            if len(df) > row_threshold:
-                                break
+                            preview_row_count = len(df)
+
+                        if preview_row_count >= row_threshold:
+                            break
 
                 if csv_string == "":
                     return (
@@ -473,7 +492,7 @@ def upload_targets(validated_query_params, validated_payload):
             )
 
     try:
-        targets_upload.save_records(
+        write_counts = targets_upload.save_records(
             column_mapping,
             validated_payload.mode.data,
         )
@@ -500,13 +519,14 @@ def upload_targets(validated_query_params, validated_payload):
             422,
         )
     else:
-        return jsonify(message="Success"), 200
+        return jsonify(message="Success", data=write_counts), 200
 
 
 @targets_bp.route("", methods=["GET"])
 @logged_in_active_user_required
 @validate_query_params(TargetsQueryParamValidator)
 @custom_permissions_required("READ Targets", "query", "form_uid")
+@use_read_replica
 def get_targets(validated_query_params):
     """
     Method to retrieve the targets information from the database
@@ -1102,33 +1122,25 @@ def bulk_update_targets(validated_payload):
                 404,
             )
 
-    basic_details_and_location_patch_keys = (
-        basic_details_patch_keys + location_patch_keys
-    )
-    if len(basic_details_and_location_patch_keys) > 0:
-        Target.query.filter(
-            Target.target_uid.in_(validated_payload.target_uids.data)
-        ).update(
-            {key: payload[key] for key in basic_details_and_location_patch_keys},
-            synchronize_session=False,
+    # Apply the basic details, location and custom fields patches to all the
+    # selected targets with a single statement
+    patch_values = {
+        key: payload[key] for key in basic_details_patch_keys + location_patch_keys
+    }
+    if len(custom_fields_patch_keys) > 0:
+        patch_values["custom_fields"] = build_jsonb_merge_expression(
+            Target.custom_fields,
+            {key: payload[key] for key in custom_fields_patch_keys},
         )
 
-    if len(custom_fields_patch_keys) > 0:
-        for custom_field in custom_fields_patch_keys:
-            db.session.execute(
-                update(Target)
-                .values(
-                    custom_fields=func.jsonb_set(
-                        Target.custom_fields,
-                        "{%s}" % custom_field,
-                        cast(
-                            payload[custom_field],
-                            JSONB,
-                        ),
-                    )
-                )
-                .where(Target.target_uid.in_(validated_payload.target_uids.data))
-            )
+    updated_count = 0
+    if len(patch_values) > 0:
+        updated_count = db.session.execute(
+            update(Target)
+            .values(patch_values)
+            .where(Target.target_uid.in_(validated_payload.target_uids.data))
+            .execution_options(synchronize_session=False)
+        ).rowcount
 
     try:
         db.session.commit()
@@ -1136,7 +1148,7 @@ def bulk_update_targets(validated_payload):
         db.session.rollback()
         return jsonify(message=str(e)), 500
 
-    return jsonify({"success": True}), 200
+    return jsonify({"success": True, "data": {"updated_count": updated_count}}), 200
 
 
 @targets_bp.route("/column-config", methods=["PUT"])
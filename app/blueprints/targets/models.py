@@ -32,6 +32,7 @@ class Target(db.Model):
             "target_id",
             name="_targets_form_uid_target_id_uc",
         ),
+        db.Index("ix_targets_location_uid", "location_uid"),
         {"schema": "webapp"},
     )
 
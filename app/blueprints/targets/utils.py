@@ -3,7 +3,10 @@ from csv import DictReader
 
 import numpy as np
 import pandas as pd
-from sqlalchemy import insert
+from sqlalchemy import cast, insert, literal_column
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.sql.functions import func
 
 from app import db
 from app.blueprints.locations.models import Location
@@ -461,6 +464,8 @@ class TargetsUpload:
     def save_records(self, column_mapping, write_mode):
         """
         Method to save the targets data to the database
+
+        Returns a dictionary with the number of inserted and updated targets
         """
 
         ####################################################################
@@ -476,6 +481,7 @@ class TargetsUpload:
         ####################################################################
 
         records_to_write = []
+        write_counts = {"inserted_count": 0, "updated_count": 0}
         self.targets_df = self.targets_df.fillna("")
 
         for row in self.targets_df.drop_duplicates().itertuples():
@@ -515,66 +521,41 @@ class TargetsUpload:
                 )
                 db.session.flush()
 
+            write_counts["inserted_count"] = len(records_to_write)
+
         elif write_mode == "merge":
             # This mode will include new records added and update the existing records with the new data;
             # target_id columns should not be updated
-            target_ids = [item["target_id"] for item in records_to_write]
-
-            # Collect records to update separately from the records to insert, so we can perform bulk updates reducing db overhead
-            records_to_insert = []
-            records_to_update = []
-
-            existing_targets = (
-                db.session.query(Target.target_id)
-                .filter(
-                    Target.form_uid == self.form_uid, Target.target_id.in_(target_ids)
-                )
-                .all()
-            )
-
-            existing_target_ids = [result[0] for result in existing_targets]
-
-            for row in records_to_write:
-                target_dict = row
-                if target_dict["target_id"] in existing_target_ids:
-                    records_to_update.append(target_dict)
-                else:
-                    records_to_insert.append(target_dict)
-
-            for record in records_to_update:
-                update_values = {
-                    key: record[key]
-                    for key in record
-                    if key not in ["target_id", "form_uid", "custom_fields"]
-                }
-
-                if update_values:
-                    Target.query.filter(
-                        Target.target_id == record["target_id"],
-                        Target.form_uid == self.form_uid,
-                    ).update(update_values, synchronize_session=False)
-
-                if "custom_fields" in record:
-                    target_record = Target.query.filter_by(
-                        target_id=record["target_id"], form_uid=record["form_uid"]
-                    ).first()
-
-                    for field_name, field_value in record["custom_fields"].items():
-                        if pd.isna(field_value) or field_value == "nan":
-                            field_value = None
-                        target_record.custom_fields[field_name] = field_value
-
-            if records_to_insert:
-                # Insert records in chunks to the database
-                chunk_size = 1000
-                for pos in range(0, len(records_to_insert), chunk_size):
-                    db.session.execute(
-                        insert(Target).values(records_to_insert[pos : pos + chunk_size])
-                    )
-                    db.session.flush()
+            # Existing targets are updated and new targets are inserted with a single upsert per chunk
+            # The custom fields of existing targets are merged with the uploaded custom fields
+            chunk_size = 1000
+            for pos in range(0, len(records_to_write), chunk_size):
+                chunk = records_to_write[pos : pos + chunk_size]
+
+                statement = pg_insert(Target).values(chunk)
+                statement = statement.on_conflict_do_update(
+                    constraint="_targets_form_uid_target_id_uc",
+                    set_={
+                        **{
+                            key: statement.excluded[key]
+                            for key in chunk[0]
+                            if key not in ["target_id", "form_uid", "custom_fields"]
+                        },
+                        "custom_fields": func.coalesce(
+                            Target.custom_fields, cast({}, JSONB)
+                        ).op("||")(statement.excluded.custom_fields),
+                    },
+                ).returning(literal_column("(xmax = 0)").label("inserted"))
+
+                # xmax is 0 for freshly inserted rows and non-zero for rows updated by the upsert
+                for row in db.session.execute(statement):
+                    if row.inserted:
+                        write_counts["inserted_count"] += 1
+                    else:
+                        write_counts["updated_count"] += 1
 
         db.session.commit()
-        return
+        return write_counts
 
     def __build_location_uid_lookup(self, column_mapping):
         """
@@ -646,105 +627,111 @@ class TargetsUpload:
         return target_dict
 
 
-def apply_target_scto_filters(csv_string, target_filters, data_format="csv"):
+# Vectorized implementations of the SurveyCTO filter operators
+# Each takes the column to filter on and the filter value and returns a boolean mask
+TARGET_SCTO_FILTER_OPERATORS = {
+    "Is": lambda column, value: column == value,
+    "Is not": lambda column, value: column != value,
+    "Contains": lambda column, value: column.str.contains(value, regex=False, na=False),
+    "Does not contain": lambda column, value: ~column.str.contains(
+        value, regex=False, na=False
+    ),
+    "Is empty": lambda column, value: column.isnull(),
+    "Is not empty": lambda column, value: column.notnull(),
+}
+
+
+def compile_target_scto_filters(target_filters):
     """
-    Create a new CSV string with the target records filtered based on the filter input
+    Compile the target filters into a function that returns the boolean mask of
+    the rows of a DataFrame that match the filters
 
-    CSV is read in chunks and filters are applied till the end of the file or a threshold is reached
+    Filters within a filter group are combined with AND and the filter groups
+    are combined with OR
 
     Args:
-        csv_string: The CSV string containing the target records
         target_filters: The filters to apply to the target records, Array of TargetSCTOFilter objects
-        json_string: The JSON string containing the target records, if data format is JSON
     """
 
-    # Create filter strings
-    final_filter_string = ""
-    filter_count = 0
-    for filter_group_arr in target_filters:
-        group_count = 0
-        filter_group = filter_group_arr["filter_group"]
-        # Initialize
-        filter_string = " ( "
-        for filter in filter_group:
-            column_name = filter["variable_name"]
-            filter_value = filter["filter_value"]
-            filter_operator = filter["filter_operator"]
-
-            if group_count > 0:
-                filter_string += " & "
-            group_count += 1
-
-            if filter_value:
-                filter_value = "'" + filter_value + "'"
-
-            if filter_operator == "Is":
-                filter_string += (
-                    "( chunk_df['" + column_name + "'] == " + filter_value + " )"
-                )
-            elif filter_operator == "Is not":
-                filter_string += (
-                    "( chunk_df['" + column_name + "'] != " + filter_value + " )"
-                )
-            elif filter_operator == "Contains":
-                filter_string += (
-                    "(  chunk_df['"
-                    + column_name
-                    + "'].str.contains('"
-                    + str(filter_value)
-                    + "')  )"
-                )
-            elif filter_operator == "Does not contain":
-                filter_string += (
-                    "(  ~chunk_df['"
-                    + column_name
-                    + "'].str.contains('"
-                    + str(filter_value)
-                    + "') )"
+    compiled_filter_groups = []
+    for filter_group in target_filters:
+        compiled_filter_groups.append(
+            [
+                (
+                    filter["variable_name"],
+                    TARGET_SCTO_FILTER_OPERATORS[filter["filter_operator"]],
+                    filter["filter_value"],
                 )
-            elif filter_operator == "Is empty":
-                filter_string += "(  chunk_df['" + column_name + "'].isnull() )"
-            elif filter_operator == "Is not empty":
-                filter_string += "(  ~chunk_df['" + column_name + "'].isnull() )"
+                for filter in filter_group["filter_group"]
+            ]
+        )
 
-        filter_string += " ) "
-        if filter_count > 0:
-            final_filter_string = final_filter_string + " | "
+    def filter_mask(df):
+        mask = pd.Series(False, index=df.index)
+        for compiled_filter_group in compiled_filter_groups:
+            group_mask = pd.Series(True, index=df.index)
+            for column_name, operator, filter_value in compiled_filter_group:
+                group_mask &= operator(df[column_name], filter_value)
+            mask |= group_mask
 
-        final_filter_string += filter_string
-        filter_count += 1
+        return mask
 
-    # Read the CSV string in chunks of 100 rows at a time
+    return filter_mask
 
-    chunk_size = 500
-    filtered_data = pd.DataFrame()
 
-    if data_format == "csv":
-        for chunk_df in pd.read_csv(
-            io.StringIO(csv_string), chunksize=chunk_size, dtype=str
-        ):
-            chunk_df = chunk_df.replace("", np.nan)
+def iter_target_scto_chunks(data, data_format="csv", chunk_size=500):
+    """
+    Yield DataFrames of string columns with at most chunk_size rows from the
+    SurveyCTO data, with empty strings replaced by nulls
 
-            # Apply the filter string to the chunk
-            filtered_chunk = chunk_df[eval(final_filter_string)]
+    Args:
+        data: The CSV string, or the list of records if the data format is JSON
+        data_format: The format of the data, csv or json
+        chunk_size: The number of rows in each chunk
+    """
 
-            filtered_data = pd.concat([filtered_data, filtered_chunk])
-            if len(filtered_data) >= 10:
-                break
+    if data_format == "csv":
+        chunks = pd.read_csv(io.StringIO(data), chunksize=chunk_size, dtype=str)
     else:
-        row_number = len(csv_string)
+        chunks = (
+            pd.DataFrame.from_dict(data[i : i + chunk_size], dtype=str)
+            for i in range(0, len(data), chunk_size)
+        )
+
+    for chunk_df in chunks:
+        yield chunk_df.replace("", np.nan)
+
+
+def apply_target_scto_filters(
+    csv_string, target_filters, data_format="csv", row_threshold=10
+):
+    """
+    Create a new CSV string with the target records filtered based on the filter input
+
+    The data is read in chunks and filters are applied till the end of the data or a threshold is reached
+
+    Args:
+        csv_string: The CSV string containing the target records, or the list of records if data format is JSON
+        target_filters: The filters to apply to the target records, Array of TargetSCTOFilter objects
+        data_format: The format of the target records, csv or json
+        row_threshold: The number of filtered records after which no more chunks are read
+    """
+
+    filter_mask = compile_target_scto_filters(target_filters)
 
-        for i in range(0, row_number, chunk_size):
-            chunk_df = pd.DataFrame.from_dict(csv_string[i : i + row_number], dtype=str)
-            chunk_df.replace("", np.nan)
+    filtered_chunks = []
+    filtered_row_count = 0
+    for chunk_df in iter_target_scto_chunks(csv_string, data_format):
+        filtered_chunk = chunk_df[filter_mask(chunk_df)]
 
-            # Apply the filter string to the chunk
-            filtered_chunk = chunk_df[eval(final_filter_string)]
+        filtered_chunks.append(filtered_chunk)
+        filtered_row_count += len(filtered_chunk)
+        if filtered_row_count >= row_threshold:
+            break
 
-            filtered_data = pd.concat([filtered_data, filtered_chunk])
-            if len(filtered_data) >= 10:
-                break
+    if not filtered_chunks:
+        return pd.DataFrame().to_csv(index=False)
 
     # Convert the filtered data back to a CSV string
-    filtered_csv_string = filtered_data.to_csv(index=False)
+    filtered_csv_string = pd.concat(filtered_chunks).to_csv(index=False)
     return filtered_csv_string
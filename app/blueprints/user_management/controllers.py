@@ -2,7 +2,7 @@ from flask import current_app, jsonify, request
 from flask_login import current_user
 from flask_mail import Message
 from passlib.pwd import genword
-from sqlalchemy import case, distinct, func, null, or_
+from sqlalchemy import case, distinct, func, insert, null, or_
 from sqlalchemy.exc import IntegrityError
 
 from app import db, mail
@@ -13,6 +13,7 @@ from app.blueprints.roles.errors import InvalidRoleHierarchyError
 from app.blueprints.roles.models import Role, SurveyAdmin, UserHierarchy
 from app.blueprints.roles.utils import RoleHierarchy
 from app.blueprints.surveys.models import Survey
+from app.utils.replica_utils import use_read_replica
 from app.utils.utils import (
     custom_permissions_required,
     logged_in_active_user_required,
@@ -22,9 +23,15 @@ from app.utils.utils import (
 
 from . import user_management_bp
 from .models import Invite, UserLanguage, UserLocation
-from .utils import generate_invite_code, send_invite_email
+from .utils import (
+    generate_invite_code,
+    generate_invite_codes,
+    send_invite_email,
+    send_invite_emails,
+)
 from .validators import (
     AddUserValidator,
+    BulkAddUsersValidator,
     CheckUserValidator,
     CompleteRegistrationValidator,
     EditUserValidator,
@@ -362,6 +369,110 @@ def add_user(validated_payload):
     )
 
 
+@user_management_bp.route("/users/bulk", methods=["POST"])
+@logged_in_active_user_required
+@validate_payload(BulkAddUsersValidator)
+@custom_permissions_required("ADMIN", "body", "survey_uid")
+def bulk_add_users(validated_payload):
+    """
+    Endpoint to invite multiple users by email in one request
+
+    Requires JSON body with the following keys:
+    - users: list of users with the keys email, first_name, last_name, roles, gender
+    - survey_uid
+
+    Emails that already belong to a user, or that are repeated in the payload,
+    are skipped. The users and their invites are created with one insert each
+    and the invitation emails are queued to be sent in the background.
+
+    Requires X-CSRF-Token in the header, obtained from the cookie set by /get-csrf
+    """
+
+    users = {}
+    for user in validated_payload.users.data:
+        users.setdefault(user["email"], user)
+
+    existing_emails = {
+        email
+        for (email,) in db.session.query(User.email).filter(
+            User.email.in_(list(users))
+        )
+    }
+    skipped_emails = [email for email in users if email in existing_emails]
+    new_users = [user for email, user in users.items() if email not in existing_emails]
+
+    if len(new_users) == 0:
+        return (
+            jsonify(
+                message="Success: users invited",
+                users=[],
+                skipped_emails=skipped_emails,
+            ),
+            200,
+        )
+
+    created_users = db.session.execute(
+        insert(User)
+        .values(
+            [
+                {
+                    "email": user["email"],
+                    "first_name": user["first_name"],
+                    "last_name": user["last_name"],
+                    "password_secure": None,
+                    "roles": user["roles"],
+                    "gender": user["gender"],
+                    "is_super_admin": False,
+                    "can_create_survey": False,
+                }
+                for user in new_users
+            ]
+        )
+        .returning(User.user_uid, User.email)
+    ).all()
+
+    invite_codes = generate_invite_codes(len(created_users))
+    db.session.execute(
+        insert(Invite).values(
+            [
+                {
+                    "invite_code": invite_code,
+                    "email": user.email,
+                    "user_uid": user.user_uid,
+                    "is_active": True,
+                }
+                for user, invite_code in zip(created_users, invite_codes)
+            ]
+        )
+    )
+
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        return jsonify(message=str(e)), 500
+
+    # queue the invitation emails to the users
+    send_invite_emails(
+        [
+            (user.email, invite_code)
+            for user, invite_code in zip(created_users, invite_codes)
+        ]
+    )
+
+    return (
+        jsonify(
+            message="Success: users invited",
+            users=[
+                {"user_uid": user.user_uid, "email": user.email}
+                for user in created_users
+            ],
+            skipped_emails=skipped_emails,
+        ),
+        200,
+    )
+
+
 @user_management_bp.route("/users/complete-registration", methods=["POST"])
 @validate_payload(CompleteRegistrationValidator)
 def complete_registration(validated_payload):
@@ -535,6 +646,7 @@ def get_user(user_uid):
 @logged_in_active_user_required
 @validate_query_params(GetUsersQueryParamValidator)
 @custom_permissions_required("ADMIN", "query", "survey_uid")
+@use_read_replica
 def get_all_users(validated_query_params):
     """
     Endpoint to get information for all users.
@@ -999,7 +1111,7 @@ def get_user_gender(validated_query_params):
         User.user_uid,
         func.concat(User.first_name, " ", User.last_name).label("user_name"),
         User.gender,
-    ).filter(User.active.is_(True), User.roles.any(bottom_level_role_uid))
+    ).filter(User.active.is_(True), User.roles.contains([bottom_level_role_uid]))
 
     if user_uid:
         user_gender_query = user_gender_query.filter(User.user_uid == user_uid)
@@ -5,6 +5,7 @@ from flask import current_app
 from flask_mail import Message
 
 from app import mail
+from app.utils.mail_utils import get_mail_dispatcher
 
 
 def generate_invite_code():
@@ -12,9 +13,9 @@ def generate_invite_code():
     return "".join(random.choices(string.ascii_uppercase + string.digits, k=8))
 
 
-def send_invite_email(email, invite_code):
-    """Send an invitation email to the user with the invite code."""
-    rp_message = Message(
+def build_invite_email(email, invite_code):
+    """Build the invitation email for a user with the invite code."""
+    return Message(
         subject="Welcome to SurveyStream - Invitation",
         html="Welcome to SurveyStream! Your invitation link is <a href='%s/complete-registration/%s'>here</a>.<br><br>Click on the link to complete your registration. The link will expire in 24 hours."
         % (
@@ -23,4 +24,29 @@ def send_invite_email(email, invite_code):
         ),
         recipients=[email],
     )
-    mail.send(rp_message)
+
+
+def send_invite_email(email, invite_code):
+    """Send an invitation email to the user with the invite code."""
+    mail.send(build_invite_email(email, invite_code))
+
+
+def send_invite_emails(invites):
+    """
+    Queue invitation emails for a list of (email, invite_code) pairs
+
+    The emails are sent by the mail dispatcher in batches over one SMTP connection,
+    and the ones that fail are kept in the dispatcher's failures
+    """
+    get_mail_dispatcher().send(
+        [build_invite_email(email, invite_code) for email, invite_code in invites]
+    )
+
+
+def generate_invite_codes(count):
+    """Generate a set of unique random 8-character invite codes."""
+    invite_codes = set()
+    while len(invite_codes) < count:
+        invite_codes.add(generate_invite_code())
+
+    return list(invite_codes)
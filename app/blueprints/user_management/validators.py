@@ -2,6 +2,7 @@ from flask_wtf import FlaskForm
 from wtforms import (
     BooleanField,
     FieldList,
+    FormField,
     IntegerField,
     PasswordField,
     StringField,
@@ -189,6 +190,22 @@ class AddUserValidator(FlaskForm):
             )
 
 
+class BulkAddUserRecordValidator(FlaskForm):
+    class Meta:
+        csrf = False
+
+    email = StringField("Email", validators=[Email(), DataRequired()])
+    first_name = StringField("First Name", validators=[DataRequired()])
+    last_name = StringField("Last Name", validators=[DataRequired()])
+    roles = FieldList(IntegerField("Roles"), default=[], validators=[Optional()])
+    gender = StringField("Gender", validators=[Optional()])
+
+
+class BulkAddUsersValidator(FlaskForm):
+    users = FieldList(FormField(BulkAddUserRecordValidator), min_entries=1)
+    survey_uid = IntegerField("survey_uid", default=None)
+
+
 class EditUserValidator(FlaskForm):
     email = StringField("Email", validators=[Email(), DataRequired()])
     first_name = StringField("First Name", validators=[DataRequired()])
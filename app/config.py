@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import os
+import tempfile
 
 
 class Config:
@@ -22,22 +23,86 @@ class Config:
     # Admin account for global secrets
     ADMIN_ACCOUNT = os.getenv("ADMIN_ACCOUNT")
 
+    # Secrets are read from the AWS secrets manager, or from environment variables
+    # ("env") or a JSON file ("file") for local development, and cached per process
+    SECRETS_BACKEND = os.getenv("SECRETS_BACKEND", "aws")
+    SECRETS_FILE = os.getenv("SECRETS_FILE")
+    SECRETS_CACHE_TTL = int(os.getenv("SECRETS_CACHE_TTL", 300))
+
     # Flask secret key
     SECRET_KEY = os.getenv("SECRET_KEY")
 
     # Web assets bucket name
     S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
 
+    # SurveyCTO server URL template and local cache for downloaded form submissions.
+    # Cached forms are downloaded again in full after SCTO_CACHE_TTL seconds
+    SCTO_API_BASE_URL = "https://{server_name}.surveycto.com"
+    SCTO_CACHE_DIR = os.getenv(
+        "SCTO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "surveystream_scto_cache")
+    )
+    SCTO_CACHE_TTL = int(os.getenv("SCTO_CACHE_TTL", 86400))
+
     # DB login details
     DB_HOST = os.getenv("DB_HOST")
     DB_USER = os.getenv("DB_USER")
     DB_PASS = os.getenv("DB_PASS")
     DB_NAME = os.getenv("DB_NAME")
 
+    # Optional read replica for the read-only routes decorated with use_read_replica.
+    # A user's reads stay on the primary for READ_REPLICA_LAG_WINDOW seconds after
+    # they write, so they always see their own changes
+    DB_READ_HOST = os.getenv("DB_READ_HOST")
+    READ_REPLICA_LAG_WINDOW = int(os.getenv("READ_REPLICA_LAG_WINDOW", 10))
+
+    # DB connection pool settings. Each gunicorn worker gets its own pool, and
+    # DB_POOL_TIMEOUT is how long (in seconds) a request waits for a free connection
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 20))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+
+    # Server-side timeouts in milliseconds. They are off by default (0), leaving
+    # the database's own settings in place, since the same engine also runs the
+    # migrations and the large upload and COPY statements
+    DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT", 0))
+    DB_IDLE_IN_TRANSACTION_TIMEOUT = int(os.getenv("DB_IDLE_IN_TRANSACTION_TIMEOUT", 0))
+
+    # Behind pgbouncer in transaction pooling mode the server connection changes
+    # between transactions, so the timeouts are applied with SET LOCAL at the start
+    # of each transaction instead of as session settings on connect
+    DB_PGBOUNCER_MODE = os.getenv("DB_PGBOUNCER_MODE", "false").lower() == "true"
+
+    # Under the gunicorn gevent worker psycopg2 yields to other greenlets while it
+    # waits on the database instead of blocking the whole worker
+    DB_GEVENT_WAIT_CALLBACK = (
+        os.getenv("DB_GEVENT_WAIT_CALLBACK", "true").lower() == "true"
+    )
+
     # DB settings
     SQLALCHEMY_ENGINE_OPTIONS = {
         "pool_pre_ping": True,
         "pool_recycle": 300,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "connect_args": (
+            {}
+            if DB_PGBOUNCER_MODE
+            or not (DB_STATEMENT_TIMEOUT or DB_IDLE_IN_TRANSACTION_TIMEOUT)
+            else {
+                "options": " ".join(
+                    f"-c {setting}={timeout}"
+                    for setting, timeout in [
+                        ("statement_timeout", DB_STATEMENT_TIMEOUT),
+                        (
+                            "idle_in_transaction_session_timeout",
+                            DB_IDLE_IN_TRANSACTION_TIMEOUT,
+                        ),
+                    ]
+                    if timeout
+                )
+            }
+        ),
     }
 
     # Mail settings
@@ -49,6 +114,15 @@ class Config:
     MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
     MAIL_SUPPRESS_SEND = False
 
+    # Queued emails are sent in batches over one SMTP connection per batch, with at
+    # most MAIL_DISPATCH_RATE_LIMIT messages per second. On exit a worker waits up to
+    # MAIL_DISPATCH_SHUTDOWN_TIMEOUT seconds for its queued emails to be sent
+    MAIL_DISPATCH_BATCH_SIZE = int(os.getenv("MAIL_DISPATCH_BATCH_SIZE", 100))
+    MAIL_DISPATCH_RATE_LIMIT = float(os.getenv("MAIL_DISPATCH_RATE_LIMIT", 10))
+    MAIL_DISPATCH_SHUTDOWN_TIMEOUT = int(
+        os.getenv("MAIL_DISPATCH_SHUTDOWN_TIMEOUT", 30)
+    )
+
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     REACT_BASE_URL = "http://localhost:3000"
@@ -146,6 +220,9 @@ class UnitTestConfig(Config):
         "surveystream",
     )
 
+    # The test database is configured a second time as the read replica
+    SQLALCHEMY_BINDS = {"read_replica": SQLALCHEMY_DATABASE_URI}
+
     TESTING = True
     DEBUG = True
 
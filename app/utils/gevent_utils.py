@@ -0,0 +1,64 @@
+import sys
+
+from psycopg2 import OperationalError, extensions
+
+
+def gevent_wait_callback(conn, timeout=None):
+    """
+    psycopg2 wait callback that yields to the gevent hub while a query is running
+
+    With the callback installed psycopg2 runs its queries in non-blocking mode
+    and calls this function to wait on the connection socket, so other greenlets
+    in the worker keep running while one of them waits on the database.
+    """
+
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f"Bad result from poll: {state}")
+
+
+def is_gevent_patched():
+    """
+    Check if the process is running with gevent's monkey patching, as in the
+    gunicorn gevent worker
+    """
+
+    if "gevent" not in sys.modules:
+        return False
+
+    from gevent import monkey
+
+    return monkey.is_module_patched("socket")
+
+
+def init_gevent_db_driver(app):
+    """
+    Install the gevent wait callback for psycopg2 when the app is running under
+    gevent and DB_GEVENT_WAIT_CALLBACK is enabled
+    """
+
+    if not app.config.get("DB_GEVENT_WAIT_CALLBACK", True) or not is_gevent_patched():
+        return
+
+    if extensions.get_wait_callback() is None:
+        extensions.set_wait_callback(gevent_wait_callback)
+        app.logger.info("Installed the gevent wait callback for psycopg2")
+
+
+def is_green_db_driver():
+    """
+    Check if psycopg2 is running with a wait callback
+
+    COPY is not supported by psycopg2 while a wait callback is installed.
+    """
+
+    return extensions.get_wait_callback() is not None
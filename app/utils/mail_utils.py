@@ -0,0 +1,201 @@
+import atexit
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+
+from flask import current_app
+
+from app import mail
+
+# Dispatchers of this process, drained before the process exits
+_mail_dispatchers = weakref.WeakSet()
+
+
+class MailDispatcher:
+    """
+    Class to send emails from a background queue
+
+    Queued messages are sent in batches of up to `batch_size` messages over a
+    single SMTP connection, at most `rate_limit` messages per second. When
+    Flask-Mail is in suppress mode no connection is opened and the messages are
+    only recorded, so `mail.record_messages()` can be used in tests.
+
+    The worker thread stops once the queue has been empty for `idle_timeout`
+    seconds and is started again by the next `send`. Messages that could not be
+    sent are logged, and the last `max_failures` of them are kept in `failures`
+    as (recipients, error) pairs. The queue is drained when the process exits so
+    queued messages are not lost on a worker restart.
+    """
+
+    def __init__(
+        self,
+        app,
+        mail,
+        batch_size=100,
+        rate_limit=10,
+        idle_timeout=5,
+        max_failures=1000,
+    ):
+        self.app = app
+        self.mail = mail
+        self.batch_size = batch_size
+        self.rate_limit = rate_limit
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._failures = deque(maxlen=max_failures)
+
+        _mail_dispatchers.add(self)
+
+    @property
+    def failures(self):
+        """
+        List of (recipients, error) pairs of the messages that could not be sent
+        """
+
+        with self._lock:
+            return list(self._failures)
+
+    def pop_failures(self):
+        """
+        Get the (recipients, error) pairs of the failed messages and clear them
+        """
+
+        with self._lock:
+            failures = list(self._failures)
+            self._failures.clear()
+
+        return failures
+
+    def send(self, messages):
+        """
+        Queue messages to be sent by the background worker
+        """
+
+        for message in messages:
+            self._queue.put(message)
+
+        self.__start_worker()
+
+    def join(self, timeout=None):
+        """
+        Block until all the queued messages have been sent, or until `timeout`
+        seconds have passed
+
+        Returns True if the queue was drained
+        """
+
+        if timeout is None:
+            self._queue.join()
+            return True
+
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+
+        return True
+
+    def __start_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self.__run, name="mail-dispatcher", daemon=True
+                )
+                self._worker.start()
+
+    def __run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.idle_timeout)]
+            except queue.Empty:
+                # Checked again under the lock so a message queued while the
+                # worker is stopping starts a new worker
+                with self._lock:
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+                continue
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                with self.app.app_context():
+                    self.__send_batch(batch)
+            except Exception as e:
+                self.app.logger.exception(
+                    f"Failed to send a batch of {len(batch)} emails"
+                )
+                self.__record_failures(batch, e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def __send_batch(self, batch):
+        # Rate limiting is only needed when the messages go to the SMTP server
+        rate_limit = None if self.app.extensions["mail"].suppress else self.rate_limit
+
+        with self.mail.connect() as connection:
+            for i, message in enumerate(batch):
+                try:
+                    connection.send(message)
+                except Exception as e:
+                    self.app.logger.exception(
+                        f"Failed to send email to {message.recipients}"
+                    )
+                    self.__record_failures([message], e)
+
+                if rate_limit and i < len(batch) - 1:
+                    time.sleep(1 / rate_limit)
+
+    def __record_failures(self, messages, error):
+        with self._lock:
+            self._failures.extend(
+                (list(message.recipients), str(error)) for message in messages
+            )
+
+
+def get_mail_dispatcher():
+    """
+    Get the mail dispatcher for the current app, creating it on first use
+    from the MAIL_DISPATCH_BATCH_SIZE and MAIL_DISPATCH_RATE_LIMIT settings
+    """
+
+    dispatcher = current_app.extensions.get("mail_dispatcher")
+
+    if dispatcher is None:
+        dispatcher = MailDispatcher(
+            current_app._get_current_object(),
+            mail,
+            batch_size=current_app.config.get("MAIL_DISPATCH_BATCH_SIZE", 100),
+            rate_limit=current_app.config.get("MAIL_DISPATCH_RATE_LIMIT", 10),
+        )
+        current_app.extensions["mail_dispatcher"] = dispatcher
+
+    return dispatcher
+
+
+@atexit.register
+def drain_mail_dispatchers():
+    """
+    Send the queued messages of all the dispatchers before the process exits,
+    e.g. when gunicorn restarts a worker
+    """
+
+    for dispatcher in list(_mail_dispatchers):
+        if not dispatcher.join(
+            timeout=dispatcher.app.config.get("MAIL_DISPATCH_SHUTDOWN_TIMEOUT", 30)
+        ):
+            dispatcher.app.logger.error(
+                "Exited with queued emails that could not be sent in time"
+            )
@@ -0,0 +1,124 @@
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+
+class PoolCheckoutStats:
+    """
+    Class to collect the time requests spend waiting for a pooled DB connection
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def record(self, wait_time, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.total_wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "total_wait_time_ms": round(self.total_wait_time * 1000, 3),
+                "avg_wait_time_ms": (
+                    round(self.total_wait_time * 1000 / self.checkouts, 3)
+                    if self.checkouts
+                    else 0
+                ),
+                "max_wait_time_ms": round(self.max_wait_time * 1000, 3),
+            }
+
+
+class MeasuredQueuePool(QueuePool):
+    """
+    QueuePool that records how long each connection checkout waits on the pool
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = PoolCheckoutStats()
+
+    def recreate(self):
+        # Keep the stats when the pool is recreated after a disconnect
+        pool = super().recreate()
+        pool.checkout_stats = self.checkout_stats
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.checkout_stats.record(time.perf_counter() - start, timed_out)
+
+
+def init_db_pool(app, db):
+    """
+    Configure the DB connection pool of the app before `db.init_app()` is called
+
+    Connections are taken from a MeasuredQueuePool, and in DB_PGBOUNCER_MODE the
+    statement and idle in transaction timeouts are set at the start of each
+    session transaction with SET LOCAL, so no state is left on the server
+    connection when pgbouncer hands it to another client.
+    """
+
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "poolclass": MeasuredQueuePool,
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+    }
+
+    if (
+        app.config.get("DB_PGBOUNCER_MODE")
+        and (
+            app.config.get("DB_STATEMENT_TIMEOUT")
+            or app.config.get("DB_IDLE_IN_TRANSACTION_TIMEOUT")
+        )
+        and not event.contains(db.session, "after_begin", _set_transaction_timeouts)
+    ):
+        event.listen(db.session, "after_begin", _set_transaction_timeouts)
+
+
+def _set_transaction_timeouts(session, transaction, connection):
+    # Timeouts left at 0 are not set, so the database's own settings apply
+    for setting, config_key in [
+        ("statement_timeout", "DB_STATEMENT_TIMEOUT"),
+        ("idle_in_transaction_session_timeout", "DB_IDLE_IN_TRANSACTION_TIMEOUT"),
+    ]:
+        timeout = current_app.config.get(config_key, 0)
+        if timeout:
+            connection.exec_driver_sql("SET LOCAL %s = %d" % (setting, timeout))
+
+
+def get_pool_status(engine):
+    """
+    Get the size, usage and checkout wait time metrics of an engine's pool
+    """
+
+    pool = engine.pool
+    status = {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+
+    checkout_stats = getattr(pool, "checkout_stats", None)
+    if checkout_stats is not None:
+        status.update(checkout_stats.to_dict())
+
+    return status
@@ -0,0 +1,92 @@
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context, request, session
+from flask_login import current_user
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+READ_REPLICA_BIND_KEY = "read_replica"
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the reads of routes decorated with `use_read_replica` to
+    the read replica engine
+
+    Flushes and INSERT, UPDATE and DELETE statements always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and has_app_context()
+            and g.get("use_read_replica", False)
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+        ):
+            return self._db.engines[READ_REPLICA_BIND_KEY]
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def init_read_replica(app):
+    """
+    Configure the read replica engine of the app before `db.init_app()` is called
+
+    The replica is read from the `read_replica` entry of SQLALCHEMY_BINDS if set,
+    otherwise it is the primary database on DB_READ_HOST. Without either, all the
+    queries go to the primary.
+    """
+
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+
+    if READ_REPLICA_BIND_KEY not in binds and app.config.get("DB_READ_HOST"):
+        binds[READ_REPLICA_BIND_KEY] = (
+            make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+            .set(host=app.config["DB_READ_HOST"])
+            .render_as_string(hide_password=False)
+        )
+
+    app.config["SQLALCHEMY_BINDS"] = binds
+
+    if READ_REPLICA_BIND_KEY in binds:
+        app.after_request(record_user_write)
+
+
+def record_user_write(response):
+    """
+    Record the time of the logged in user's last successful write in their session,
+    so their reads go to the primary until the replica has caught up
+    """
+
+    if (
+        request.method in current_app.config["WTF_CSRF_METHODS"]
+        and response.status_code < 400
+        and current_user.is_authenticated
+    ):
+        session["last_write_at"] = time.time()
+
+    return response
+
+
+def use_read_replica(fn):
+    """
+    Decorator to send the queries of a read-only route to the read replica
+
+    Reads stay on the primary when no replica is configured, or for
+    READ_REPLICA_LAG_WINDOW seconds after the same user's last write.
+    """
+
+    @wraps(fn)
+    def decorated_function(*args, **kwargs):
+        g.use_read_replica = (
+            READ_REPLICA_BIND_KEY in current_app.config.get("SQLALCHEMY_BINDS", {})
+            and time.time() - session.get("last_write_at", 0)
+            >= current_app.config.get("READ_REPLICA_LAG_WINDOW", 10)
+        )
+
+        return fn(*args, **kwargs)
+
+    return decorated_function
@@ -0,0 +1,256 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+import requests
+
+# Format of the CompletionDate field in SurveyCTO JSON exports, e.g. "Oct 15, 2020 1:28:33 PM"
+SCTO_COMPLETION_DATE_FORMAT = "%b %d, %Y %I:%M:%S %p"
+
+
+class SurveyCTOFetcher:
+    """
+    Class to fetch SurveyCTO form submissions
+
+    Submissions are fetched incrementally: after the first download, only the
+    submissions completed since the latest CompletionDate seen are requested
+    and merged into the previous download by their KEY. The raw submissions of
+    unencrypted forms are cached per form on local disk so the incremental
+    state is shared by requests and workers on the same host.
+
+    The submissions contain respondent data, so the cache directory and files
+    are only accessible by the owner of the process, and cached forms expire
+    after `cache_ttl` seconds. Decrypted submissions of encrypted forms are
+    never written to disk.
+    """
+
+    def __init__(
+        self,
+        server_name,
+        username,
+        password,
+        base_url="https://{server_name}.surveycto.com",
+        cache_dir=None,
+        cache_ttl=86400,
+        timeout=300,
+    ):
+        """
+        :param server_name (str): SurveyCTO server name
+        :param username (str): SurveyCTO login username
+        :param password (str): SurveyCTO login password
+        :param base_url (str): Template for the server URL, can point to a local stub server
+        :param cache_dir (str): Directory to cache the form submissions in, no caching if None
+        :param cache_ttl (int): Seconds after which a cached form is downloaded again in full
+        :param timeout (int): Timeout in seconds for each request to SurveyCTO
+        """
+
+        self.server_name = server_name
+        self.base_url = base_url.format(server_name=server_name).rstrip("/")
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        self.timeout = timeout
+
+        # Defining both to be compatible with all SurveyCTO versions
+        self.auth_basic = requests.auth.HTTPBasicAuth(username, password)
+        self.auth_digest = requests.auth.HTTPDigestAuth(username, password)
+        self.default_headers = {
+            "X-OpenRosa-Version": "1.0",
+        }
+
+    def get_form_data(self, form_id, key=None, oldest_completion_date=None):
+        """
+        Get the submissions of a form in JSON format
+
+        Without `oldest_completion_date` all the submissions are returned, and the
+        submissions of unencrypted forms are fetched incrementally through the cache.
+        With it, only the submissions completed after that datetime are downloaded,
+        bypassing the cache.
+
+        :param form_id (str): The form_id of the SurveyCTO form
+        :param key (str): The private key to decrypt the form data, if the form is encrypted
+        :param oldest_completion_date (datetime): Only get submissions completed after this date
+        """
+
+        if oldest_completion_date is not None:
+            return self.__fetch_submissions(
+                form_id,
+                oldest_completion_date.strftime(SCTO_COMPLETION_DATE_FORMAT),
+                key,
+            )
+
+        cache = None
+        if key is None:
+            cache = self.__read_cache(form_id)
+
+        if cache is None:
+            cache = {"last_completion_date": None, "submissions": []}
+
+        new_submissions = self.__fetch_submissions(
+            form_id, cache["last_completion_date"], key
+        )
+
+        if len(new_submissions) > 0:
+            # Merge on KEY so that submissions returned again replace the cached ones
+            submissions = {
+                submission["KEY"]: submission for submission in cache["submissions"]
+            }
+            for submission in new_submissions:
+                submissions[submission["KEY"]] = submission
+
+            cache = {
+                "last_completion_date": self.__get_last_completion_date(
+                    new_submissions, cache["last_completion_date"]
+                ),
+                "submissions": list(submissions.values()),
+            }
+
+            if key is None:
+                self.__write_cache(form_id, cache)
+
+        return cache["submissions"]
+
+    def __fetch_submissions(self, form_id, oldest_completion_date, key):
+        """
+        Download the submissions completed after the given CompletionDate string
+        """
+
+        url_date = 0
+        if oldest_completion_date is not None:
+            url_date = quote(oldest_completion_date)
+
+        url = f"{self.base_url}/api/v2/forms/data/wide/json/{quote(form_id)}?date={url_date}"
+
+        response = self.__request(url, key)
+        if response.status_code == 401:
+            # Try digest authentication which works for old SurveyCTO versions
+            response = self.__request(url, key, auth=self.auth_digest)
+        response.raise_for_status()
+
+        return response.json()
+
+    def __request(self, url, key, auth=None):
+        """
+        Make the request for the form data, posting the private key if provided
+        """
+
+        if auth is None:
+            auth = self.auth_basic
+
+        if key is None:
+            return requests.get(
+                url, headers=self.default_headers, auth=auth, timeout=self.timeout
+            )
+
+        return requests.post(
+            url,
+            files={"private_key": key},
+            headers=self.default_headers,
+            auth=auth,
+            timeout=self.timeout,
+        )
+
+    @staticmethod
+    def __get_last_completion_date(submissions, last_completion_date):
+        """
+        Get the latest CompletionDate string among the submissions and the previous value
+        """
+
+        completion_dates = [
+            submission["CompletionDate"]
+            for submission in submissions
+            if submission.get("CompletionDate")
+        ]
+        if last_completion_date is not None:
+            completion_dates.append(last_completion_date)
+
+        if len(completion_dates) == 0:
+            return None
+
+        return max(
+            completion_dates,
+            key=lambda date: datetime.strptime(date, SCTO_COMPLETION_DATE_FORMAT),
+        )
+
+    def __get_cache_path(self, form_id):
+        return os.path.join(
+            self.__get_server_cache_dir(),
+            f"{quote(form_id, safe='')}.json",
+        )
+
+    def __get_server_cache_dir(self):
+        return os.path.join(self.cache_dir, quote(self.server_name, safe=""))
+
+    def __is_expired(self, path):
+        return (
+            self.cache_ttl is not None
+            and time.time() - os.path.getmtime(path) > self.cache_ttl
+        )
+
+    def __read_cache(self, form_id):
+        """
+        Read the cached submissions of the form, if any
+
+        Expired cache files are removed and not returned
+        """
+
+        if self.cache_dir is None:
+            return None
+
+        cache_path = self.__get_cache_path(form_id)
+        try:
+            if self.__is_expired(cache_path):
+                os.remove(cache_path)
+                return None
+
+            with open(cache_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def __write_cache(self, form_id, cache):
+        """
+        Write the submissions of the form to the cache
+
+        The file is written to a temporary path first so readers never see a partial
+        file. Nothing is written if the cache directory is owned by another user.
+        """
+
+        if self.cache_dir is None:
+            return
+
+        server_cache_dir = self.__get_server_cache_dir()
+        for directory in [self.cache_dir, server_cache_dir]:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            if os.stat(directory).st_uid != os.getuid():
+                return
+            os.chmod(directory, 0o700)
+
+        cache_path = self.__get_cache_path(form_id)
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with os.fdopen(
+            os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w"
+        ) as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, cache_path)
+
+        self.__remove_expired_cache_files(server_cache_dir)
+
+    def __remove_expired_cache_files(self, server_cache_dir):
+        """
+        Remove the cache files of the server that have not been refreshed within the TTL
+        """
+
+        if self.cache_ttl is None:
+            return
+
+        for file_name in os.listdir(server_cache_dir):
+            path = os.path.join(server_cache_dir, file_name)
+            try:
+                if self.__is_expired(path):
+                    os.remove(path)
+            except OSError:
+                # Removed by another worker in the meantime
+                pass
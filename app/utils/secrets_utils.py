@@ -0,0 +1,208 @@
+import base64
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import boto3
+from flask import current_app
+
+
+class AWSSecretsBackend:
+    """
+    Backend to fetch secrets from the AWS secrets manager
+
+    boto3 clients are reused across lookups, and the credentials of the role
+    assumed for global secrets are reused until they are close to expiry
+    """
+
+    # Assumed role credentials are refreshed this long before they expire
+    CREDENTIALS_EXPIRY_MARGIN = timedelta(minutes=5)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._assumed_role_credentials = {}
+
+    def get_secret(self, secret_name, region_name, is_global_secret=False):
+        client = self.__get_secret_client(is_global_secret, region_name)
+
+        secret_value_response = client.get_secret_value(SecretId=secret_name)
+
+        if "SecretString" in secret_value_response:
+            secret = secret_value_response["SecretString"]
+        else:
+            secret = base64.b64decode(secret_value_response["SecretBinary"])
+
+        return secret
+
+    def __get_secret_client(self, is_global_secret, region_name):
+        """
+        Get the secrets manager client, creating it if needed
+        """
+
+        if is_global_secret:
+            ADMIN_ACCOUNT = current_app.config["ADMIN_ACCOUNT"]
+
+            admin_global_secrets_role_arn = (
+                f"arn:aws:iam::{ADMIN_ACCOUNT}:role/web-assume-task-role"
+            )
+            credentials = self.__get_assumed_role_credentials(
+                admin_global_secrets_role_arn
+            )
+        else:
+            credentials = None
+
+        # Clients for global secrets are recreated when the assumed role credentials change
+        access_key_id = credentials["AccessKeyId"] if credentials else None
+        client_key = (region_name, is_global_secret)
+
+        with self._lock:
+            cached = self._clients.get(client_key)
+            if cached is not None and cached[0] == access_key_id:
+                return cached[1]
+
+            if credentials:
+                client = boto3.client(
+                    service_name="secretsmanager",
+                    region_name=region_name,
+                    aws_access_key_id=credentials["AccessKeyId"],
+                    aws_secret_access_key=credentials["SecretAccessKey"],
+                    aws_session_token=credentials["SessionToken"],
+                )
+            else:
+                client = boto3.client(
+                    service_name="secretsmanager", region_name=region_name
+                )
+
+            self._clients[client_key] = (access_key_id, client)
+
+        return client
+
+    def __get_assumed_role_credentials(self, role_arn):
+        """
+        Get the credentials for an AWS role to be assumed, assuming it again
+        only if the cached credentials are close to expiry
+        """
+
+        refresh_after = datetime.now(timezone.utc) + self.CREDENTIALS_EXPIRY_MARGIN
+
+        with self._lock:
+            credentials = self._assumed_role_credentials.get(role_arn)
+            if credentials is not None and credentials["Expiration"] > refresh_after:
+                return credentials
+
+        # Create session using your current creds
+        boto_sts = boto3.client("sts")
+
+        # Request to assume the role like this, the ARN is the Role's ARN from
+        # the other account you wish to assume. Not your current ARN.
+        sts_response = boto_sts.assume_role(
+            RoleArn=role_arn, RoleSessionName="new_session"
+        )
+
+        with self._lock:
+            self._assumed_role_credentials[role_arn] = sts_response["Credentials"]
+
+        return sts_response["Credentials"]
+
+
+class EnvSecretsBackend:
+    """
+    Backend to read secrets from environment variables, for local development and tests
+
+    The secret `dod-surveycto-server` is read from `SECRET_DOD_SURVEYCTO_SERVER`
+    """
+
+    def get_secret(self, secret_name, region_name, is_global_secret=False):
+        env_var_name = "SECRET_" + re.sub(r"[^A-Za-z0-9]", "_", secret_name).upper()
+
+        secret = os.getenv(env_var_name)
+        if secret is None:
+            raise KeyError(f"Secret {secret_name} not found in {env_var_name}")
+
+        return secret
+
+
+class FileSecretsBackend:
+    """
+    Backend to read secrets from a JSON file mapping secret names to values, for
+    local development and tests
+
+    Values that are not strings are returned JSON encoded, like the secrets manager
+    """
+
+    def __init__(self, secrets_file):
+        self.secrets_file = secrets_file
+
+    def get_secret(self, secret_name, region_name, is_global_secret=False):
+        with open(self.secrets_file, "r") as f:
+            secrets = json.load(f)
+
+        if secret_name not in secrets:
+            raise KeyError(f"Secret {secret_name} not found in {self.secrets_file}")
+
+        secret = secrets[secret_name]
+        if not isinstance(secret, str):
+            secret = json.dumps(secret)
+
+        return secret
+
+
+class SecretsProvider:
+    """
+    Class to get secrets from a backend with a per-process TTL cache
+    """
+
+    def __init__(self, backend, ttl=300):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def get_secret(self, secret_name, region_name, is_global_secret=False):
+        cache_key = (secret_name, region_name, is_global_secret)
+
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None and cached[1] > time.monotonic():
+                return cached[0]
+
+        secret = self.backend.get_secret(secret_name, region_name, is_global_secret)
+
+        with self._lock:
+            self._cache[cache_key] = (secret, time.monotonic() + self.ttl)
+
+        return secret
+
+    def clear(self):
+        with self._lock:
+            self._cache = {}
+
+
+def get_secrets_provider():
+    """
+    Get the secrets provider for the current app, creating it on first use
+    from the SECRETS_BACKEND, SECRETS_FILE and SECRETS_CACHE_TTL settings
+    """
+
+    provider = current_app.extensions.get("secrets_provider")
+
+    if provider is None:
+        backend_name = current_app.config.get("SECRETS_BACKEND", "aws")
+
+        if backend_name == "env":
+            backend = EnvSecretsBackend()
+        elif backend_name == "file":
+            backend = FileSecretsBackend(current_app.config["SECRETS_FILE"])
+        else:
+            backend = AWSSecretsBackend()
+
+        provider = SecretsProvider(
+            backend, ttl=current_app.config.get("SECRETS_CACHE_TTL", 300)
+        )
+        current_app.extensions["secrets_provider"] = provider
+
+    return provider
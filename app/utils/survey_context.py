@@ -0,0 +1,182 @@
+from functools import cached_property
+
+from flask import g, has_app_context
+from sqlalchemy import event
+
+from app import db
+from app.blueprints.forms.models import Form
+from app.blueprints.locations.models import GeoLevel
+from app.blueprints.locations.utils import GeoLevelHierarchy
+from app.blueprints.module_questionnaire.models import ModuleQuestionnaire
+from app.blueprints.roles.models import Role
+from app.blueprints.roles.utils import RoleHierarchy
+from app.blueprints.surveys.models import Survey
+
+
+class SurveyContext:
+    """
+    Class to represent a snapshot of the survey level configuration used by the
+    assignments, mapping and email helpers
+
+    The survey, its module questionnaire, roles and geo levels are loaded in three
+    queries when the context is created, and the column configs of each form on
+    first use. Use `SurveyContext.for_survey` or `SurveyContext.for_form` to share
+    one context between all the helpers of a request.
+    """
+
+    def __init__(self, survey_uid):
+        self.survey_uid = survey_uid
+
+        survey = (
+            db.session.query(
+                Survey.prime_geo_level_uid,
+                ModuleQuestionnaire.target_mapping_criteria,
+                ModuleQuestionnaire.surveyor_mapping_criteria,
+            )
+            .outerjoin(
+                ModuleQuestionnaire,
+                ModuleQuestionnaire.survey_uid == Survey.survey_uid,
+            )
+            .filter(Survey.survey_uid == survey_uid)
+            .first()
+        )
+
+        self.prime_geo_level_uid = survey.prime_geo_level_uid if survey else None
+        self.target_mapping_criteria = (
+            survey.target_mapping_criteria if survey else None
+        )
+        self.surveyor_mapping_criteria = (
+            survey.surveyor_mapping_criteria if survey else None
+        )
+
+        self.roles = [
+            role.to_dict() for role in Role.query.filter_by(survey_uid=survey_uid).all()
+        ]
+
+        self.geo_levels = (
+            db.session.query(
+                GeoLevel.geo_level_uid,
+                GeoLevel.geo_level_name,
+                GeoLevel.parent_geo_level_uid,
+            )
+            .filter(GeoLevel.survey_uid == survey_uid)
+            .all()
+        )
+
+        self.__target_column_configs = {}
+        self.__enumerator_column_configs = {}
+
+    @classmethod
+    def for_survey(cls, survey_uid):
+        """
+        Get the context of a survey for the current request, loading it on first use
+        """
+
+        survey_contexts = g.setdefault("survey_contexts", {})
+        if survey_uid not in survey_contexts:
+            survey_contexts[survey_uid] = cls(survey_uid)
+
+        return survey_contexts[survey_uid]
+
+    @classmethod
+    def for_form(cls, form_uid):
+        """
+        Get the context of a form's survey for the current request
+
+        Returns None if the form does not exist
+        """
+
+        form_survey_uids = g.setdefault("survey_context_form_survey_uids", {})
+        if form_uid not in form_survey_uids:
+            form_survey_uids[form_uid] = (
+                db.session.query(Form.survey_uid)
+                .filter(Form.form_uid == form_uid)
+                .scalar()
+            )
+
+        if form_survey_uids[form_uid] is None:
+            return None
+
+        return cls.for_survey(form_survey_uids[form_uid])
+
+    @cached_property
+    def role_hierarchy(self):
+        """
+        RoleHierarchy of the survey, None if the survey has no roles
+
+        Raises InvalidRoleHierarchyError if the hierarchy is invalid
+        """
+
+        if len(self.roles) == 0:
+            return None
+
+        return RoleHierarchy(self.roles)
+
+    @cached_property
+    def geo_level_hierarchy(self):
+        """
+        GeoLevelHierarchy of the survey
+
+        Raises InvalidGeoLevelHierarchyError if the hierarchy is invalid
+        """
+
+        return GeoLevelHierarchy(self.geo_levels)
+
+    def get_target_column_configs(self, form_uid, column_type=None):
+        """
+        Get the target column configs of a form, optionally of one column type
+        """
+
+        # Imported here to avoid a circular import through the targets blueprint
+        from app.blueprints.targets.models import TargetColumnConfig
+
+        if form_uid not in self.__target_column_configs:
+            self.__target_column_configs[form_uid] = (
+                db.session.query(
+                    TargetColumnConfig.column_type, TargetColumnConfig.column_name
+                )
+                .filter(TargetColumnConfig.form_uid == form_uid)
+                .all()
+            )
+
+        return [
+            row
+            for row in self.__target_column_configs[form_uid]
+            if column_type is None or row.column_type == column_type
+        ]
+
+    def get_enumerator_column_configs(self, form_uid, column_type=None):
+        """
+        Get the enumerator column configs of a form, optionally of one column type
+        """
+
+        # Imported here to avoid a circular import through the enumerators blueprint
+        from app.blueprints.enumerators.models import EnumeratorColumnConfig
+
+        if form_uid not in self.__enumerator_column_configs:
+            self.__enumerator_column_configs[form_uid] = (
+                db.session.query(
+                    EnumeratorColumnConfig.column_type,
+                    EnumeratorColumnConfig.column_name,
+                )
+                .filter(EnumeratorColumnConfig.form_uid == form_uid)
+                .all()
+            )
+
+        return [
+            row
+            for row in self.__enumerator_column_configs[form_uid]
+            if column_type is None or row.column_type == column_type
+        ]
+
+
+@event.listens_for(db.session, "after_flush")
+def clear_survey_contexts(session, flush_context):
+    """
+    Drop the survey contexts of the current request when the session writes
+    changes, so helpers called after a write see the new configuration
+    """
+
+    if has_app_context():
+        g.pop("survey_contexts", None)
+        g.pop("survey_context_form_survey_uids", None)
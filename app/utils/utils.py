@@ -1,17 +1,16 @@
-import base64
 import math
 import time
 from functools import wraps
 
-import boto3
-from botocore.exceptions import ClientError
-from flask import current_app, jsonify, request, session
+from flask import jsonify, request, session
 from flask_login import current_user, login_required, logout_user
-from sqlalchemy import and_, func, or_
+from sqlalchemy import and_, cast, func, or_
+from sqlalchemy.dialects.postgresql import JSONB
 from wtforms.fields import Field
 
 from app import db
 from app.blueprints.auth.models import User
+from app.utils.secrets_utils import get_secrets_provider
 
 
 def concat_names(name_tuple):
@@ -84,66 +83,15 @@ def logged_in_active_user_required(f):
 def get_aws_secret(secret_name, region_name, is_global_secret=False):
     """
     Function to get secrets from the aws secrets manager
-    """
-
-    client = get_secret_client(is_global_secret, region_name)
-
-    try:
-        secret_value_response = client.get_secret_value(SecretId=secret_name)
-    except ClientError as e:
-        raise e
-    else:
-        if "SecretString" in secret_value_response:
-            secret = secret_value_response["SecretString"]
-        else:
-            secret = base64.b64decode(secret_value_response["SecretBinary"])
-
-    return secret
-
-
-def get_secret_client(is_global_secret, region_name):
-    """
-    Function to get secrets client
-    """
-
-    if is_global_secret:
-        ADMIN_ACCOUNT = current_app.config["ADMIN_ACCOUNT"]
-
-        admin_global_secrets_role_arn = (
-            f"arn:aws:iam::{ADMIN_ACCOUNT}:role/web-assume-task-role"
-        )
-        sts_response = get_sts_assume_role_response(admin_global_secrets_role_arn)
-
-        client = boto3.client(
-            service_name="secretsmanager",
-            region_name=region_name,
-            aws_access_key_id=sts_response["Credentials"]["AccessKeyId"],
-            aws_secret_access_key=sts_response["Credentials"]["SecretAccessKey"],
-            aws_session_token=sts_response["Credentials"]["SessionToken"],
-        )
-
-    else:
-        client = boto3.client(service_name="secretsmanager", region_name=region_name)
-
-    return client
 
-
-def get_sts_assume_role_response(admin_global_secrets_role_arn):
-    """
-    Function to return details for an AWS role to be assumed
+    Secrets are cached per process for SECRETS_CACHE_TTL seconds, and can be read
+    from a local backend instead of AWS by setting SECRETS_BACKEND
     """
 
-    # Create session using your current creds
-    boto_sts = boto3.client("sts")
-
-    # Request to assume the role like this, the ARN is the Role's ARN from
-    # the other account you wish to assume. Not your current ARN.
-    sts_response = boto_sts.assume_role(
-        RoleArn=admin_global_secrets_role_arn, RoleSessionName="new_session"
+    return get_secrets_provider().get_secret(
+        secret_name, region_name, is_global_secret=is_global_secret
     )
 
-    return sts_response
-
 
 def get_survey_uids(param_location, param_name):
     """
@@ -520,13 +468,15 @@ def update_module_status(module_id, survey_uid=None, form_uid=None):
         8: [9],
     }
 
+    # Get the active modules of the survey once for all the effected modules
+    active_module_ids = {
+        module_status.module_id
+        for module_status in ModuleStatus.query.filter_by(survey_uid=survey_uid)
+    }
+
     for effected_module_id in effected_modules_dict.get(module_id, []):
         # Check if module is in the list of active modules for the survey
-        module_status = ModuleStatus.query.filter_by(
-            survey_uid=survey_uid, module_id=effected_module_id
-        ).first()
-
-        if module_status:
+        if effected_module_id in active_module_ids:
             calculated_module_status = module_status_calculator.get_status(
                 effected_module_id
             )
@@ -538,6 +488,17 @@ def update_module_status(module_id, survey_uid=None, form_uid=None):
     db.session.commit()
 
 
+def build_jsonb_merge_expression(column, patch):
+    """
+    Return an expression that merges the keys of the `patch` dict into a JSONB
+    column (`column || :patch`), treating NULL values as an empty object
+    """
+
+    return func.coalesce(column, cast({}, JSONB)).op("||", return_type=JSONB)(
+        cast(patch, JSONB)
+    )
+
+
 class SurveyNotFoundError(Exception):
     def __init__(self, errors):
         self.errors = [errors]
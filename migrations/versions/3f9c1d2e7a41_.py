@@ -0,0 +1,126 @@
+"""Persist DQ check validity on the dq_checks table and index checks by form and type.
+
+The validity of a check (whether its questions still exist in the form definitions)
+was previously recomputed on every read of the checks. It is now stored on the check
+and refreshed when the check or a form definition changes. Existing checks are
+backfilled here.
+
+Revision ID: 3f9c1d2e7a41
+Revises: 7338dc7732d2
+Create Date: 2026-10-19 08:05:12.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3f9c1d2e7a41"
+down_revision = "7338dc7732d2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("dq_checks", schema="webapp") as batch_op:
+        batch_op.add_column(
+            sa.Column("is_valid", sa.Boolean(), server_default="t", nullable=False)
+        )
+        batch_op.add_column(sa.Column("note", sa.String(), nullable=True))
+        batch_op.create_index(
+            "ix_dq_checks_form_uid_type_id", ["form_uid", "type_id"], unique=False
+        )
+
+    # Backfill the validity of existing checks
+    # The updates are ordered so that later rules take precedence for the note
+    op.execute(
+        """
+        UPDATE webapp.dq_checks c
+        SET is_valid = false, note = 'Question not found in DQ form definition'
+        WHERE c.type_id IN (7, 8, 9)
+        AND c.all_questions = false
+        AND NOT EXISTS (
+            SELECT 1 FROM webapp.scto_form_questions q
+            WHERE q.form_uid = c.dq_scto_form_uid AND q.question_name = c.question_name
+        )
+        """
+    )
+    op.execute(
+        """
+        UPDATE webapp.dq_checks c
+        SET is_valid = false, note = 'Question not found in form definition'
+        WHERE c.type_id NOT IN (8, 9)
+        AND c.all_questions = false
+        AND NOT EXISTS (
+            SELECT 1 FROM webapp.scto_form_questions q
+            WHERE q.form_uid = c.form_uid AND q.question_name = c.question_name
+        )
+        """
+    )
+    op.execute(
+        """
+        UPDATE webapp.dq_checks c
+        SET is_valid = false, note = 'Filter question not found in form definition'
+        WHERE EXISTS (
+            SELECT 1 FROM webapp.dq_check_filters f
+            WHERE f.dq_check_uid = c.dq_check_uid
+            AND f.question_name IS DISTINCT FROM c.question_name
+            AND NOT EXISTS (
+                SELECT 1 FROM webapp.scto_form_questions q
+                WHERE q.question_name = f.question_name
+                AND q.form_uid = CASE
+                    WHEN c.type_id IN (7, 8, 9) THEN c.dq_scto_form_uid
+                    ELSE c.form_uid
+                END
+            )
+        )
+        """
+    )
+    op.execute(
+        """
+        UPDATE webapp.dq_checks c
+        SET is_valid = false, note = 'Logic check question not found in form definition'
+        WHERE c.type_id = 1
+        AND EXISTS (
+            SELECT 1 FROM webapp.dq_logic_check_questions l
+            WHERE l.dq_check_uid = c.dq_check_uid
+            AND NOT EXISTS (
+                SELECT 1 FROM webapp.scto_form_questions q
+                WHERE q.form_uid = c.form_uid AND q.question_name = l.question_name
+            )
+        )
+        """
+    )
+    op.execute(
+        """
+        UPDATE webapp.dq_checks c
+        SET is_valid = false, note = 'GPS variable not found in form definition'
+        WHERE c.type_id = 10
+        AND COALESCE(c.check_components ->> 'gps_variable', '') != ''
+        AND NOT EXISTS (
+            SELECT 1 FROM webapp.scto_form_questions q
+            WHERE q.form_uid = c.form_uid
+            AND q.question_name = c.check_components ->> 'gps_variable'
+        )
+        """
+    )
+    op.execute(
+        """
+        UPDATE webapp.dq_checks c
+        SET is_valid = false, note = 'Grid ID not found in form definition'
+        WHERE c.type_id = 10
+        AND COALESCE(c.check_components ->> 'grid_id', '') != ''
+        AND NOT EXISTS (
+            SELECT 1 FROM webapp.scto_form_questions q
+            WHERE q.form_uid = c.form_uid
+            AND q.question_name = c.check_components ->> 'grid_id'
+        )
+        """
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("dq_checks", schema="webapp") as batch_op:
+        batch_op.drop_index("ix_dq_checks_form_uid_type_id")
+        batch_op.drop_column("note")
+        batch_op.drop_column("is_valid")
@@ -0,0 +1,90 @@
+"""Add indexes for the foreign keys used by the listing and mapping queries.
+
+Revision ID: 8b2e4f6a9c13
+Revises: 3f9c1d2e7a41
+Create Date: 2026-10-19 09:10:42.503127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8b2e4f6a9c13"
+down_revision = "3f9c1d2e7a41"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("targets", schema="webapp") as batch_op:
+        batch_op.create_index(
+            "ix_targets_location_uid", ["location_uid"], unique=False
+        )
+
+    with op.batch_alter_table("surveyor_assignments", schema="webapp") as batch_op:
+        batch_op.create_index(
+            "ix_surveyor_assignments_enumerator_uid", ["enumerator_uid"], unique=False
+        )
+
+    with op.batch_alter_table("location_surveyor_mapping", schema="webapp") as batch_op:
+        batch_op.create_index(
+            "ix_location_surveyor_mapping_form_uid_location_uid",
+            ["form_uid", "location_uid"],
+            unique=False,
+        )
+
+    with op.batch_alter_table("user_hierarchy", schema="webapp") as batch_op:
+        batch_op.create_index(
+            "ix_user_hierarchy_survey_uid_parent_user_uid",
+            ["survey_uid", "parent_user_uid"],
+            unique=False,
+        )
+
+    with op.batch_alter_table("user_target_mapping", schema="webapp") as batch_op:
+        batch_op.create_index(
+            "ix_user_target_mapping_user_uid", ["user_uid"], unique=False
+        )
+
+    with op.batch_alter_table("survey_notifications", schema="webapp") as batch_op:
+        batch_op.create_index(
+            "ix_survey_notifications_survey_module_severity_resolution",
+            ["survey_uid", "module_id", "severity", "resolution_status"],
+            unique=False,
+        )
+
+    with op.batch_alter_table("locations", schema="webapp") as batch_op:
+        batch_op.create_index(
+            "ix_locations_parent_location_uid", ["parent_location_uid"], unique=False
+        )
+
+    with op.batch_alter_table("users", schema="webapp") as batch_op:
+        batch_op.create_index(
+            "ix_users_roles", ["roles"], unique=False, postgresql_using="gin"
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("users", schema="webapp") as batch_op:
+        batch_op.drop_index("ix_users_roles", postgresql_using="gin")
+
+    with op.batch_alter_table("locations", schema="webapp") as batch_op:
+        batch_op.drop_index("ix_locations_parent_location_uid")
+
+    with op.batch_alter_table("survey_notifications", schema="webapp") as batch_op:
+        batch_op.drop_index("ix_survey_notifications_survey_module_severity_resolution")
+
+    with op.batch_alter_table("user_target_mapping", schema="webapp") as batch_op:
+        batch_op.drop_index("ix_user_target_mapping_user_uid")
+
+    with op.batch_alter_table("user_hierarchy", schema="webapp") as batch_op:
+        batch_op.drop_index("ix_user_hierarchy_survey_uid_parent_user_uid")
+
+    with op.batch_alter_table("location_surveyor_mapping", schema="webapp") as batch_op:
+        batch_op.drop_index("ix_location_surveyor_mapping_form_uid_location_uid")
+
+    with op.batch_alter_table("surveyor_assignments", schema="webapp") as batch_op:
+        batch_op.drop_index("ix_surveyor_assignments_enumerator_uid")
+
+    with op.batch_alter_table("targets", schema="webapp") as batch_op:
+        batch_op.drop_index("ix_targets_location_uid")
@@ -0,0 +1,76 @@
+import time
+
+import gevent
+import pytest
+from psycopg2 import extensions
+from sqlalchemy import text
+
+from app import db
+from app.utils.gevent_utils import gevent_wait_callback
+
+
+@pytest.mark.concurrency
+class TestConcurrency:
+    """
+    Compare the throughput of concurrent requests in one gevent worker with and
+    without the psycopg2 wait callback
+
+    Each simulated request runs in its own greenlet with its own app context and
+    spends `query_time` seconds in a database query.
+    """
+
+    concurrent_requests = 10
+    query_time = 0.5
+
+    @pytest.fixture()
+    def wait_callback(self):
+        """
+        Install the gevent wait callback for the duration of the test
+        """
+
+        extensions.set_wait_callback(gevent_wait_callback)
+
+        yield
+
+        extensions.set_wait_callback(None)
+
+    def run_concurrent_requests(self, app):
+        def request():
+            with app.app_context():
+                db.session.execute(
+                    text("SELECT pg_sleep(:query_time)"),
+                    {"query_time": self.query_time},
+                )
+                db.session.remove()
+
+        start = time.perf_counter()
+        gevent.joinall(
+            [gevent.spawn(request) for _ in range(self.concurrent_requests)],
+            raise_error=True,
+        )
+        elapsed = time.perf_counter() - start
+
+        print(
+            f"{self.concurrent_requests} requests in {elapsed:.2f}s "
+            f"({self.concurrent_requests / elapsed:.1f} requests/s)"
+        )
+
+        return elapsed
+
+    def test_throughput_without_wait_callback(self, app):
+        """
+        Test that without the wait callback the requests run one after the other
+        """
+
+        elapsed = self.run_concurrent_requests(app)
+
+        assert elapsed >= self.concurrent_requests * self.query_time
+
+    def test_throughput_with_wait_callback(self, app, wait_callback):
+        """
+        Test that with the wait callback the requests wait on the database together
+        """
+
+        elapsed = self.run_concurrent_requests(app)
+
+        assert elapsed < self.concurrent_requests * self.query_time / 2
@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import text
+
+from app import db
+
+
+@pytest.mark.indexes
+class TestIndexes:
+    """
+    Check that the hot-path filters are served by their indexes
+
+    Sequential scans are disabled for the transaction so that the planner picks
+    the index whenever it can be used, even on the small seeded tables.
+    """
+
+    @pytest.mark.parametrize(
+        "query, index_name",
+        [
+            (
+                "SELECT * FROM webapp.targets WHERE location_uid = 1",
+                "ix_targets_location_uid",
+            ),
+            (
+                "SELECT * FROM webapp.surveyor_assignments WHERE enumerator_uid = 1",
+                "ix_surveyor_assignments_enumerator_uid",
+            ),
+            (
+                "SELECT * FROM webapp.location_surveyor_mapping WHERE form_uid = 1 AND location_uid = 1",
+                "ix_location_surveyor_mapping_form_uid_location_uid",
+            ),
+            (
+                "SELECT * FROM webapp.user_hierarchy WHERE survey_uid = 1 AND parent_user_uid = 1",
+                "ix_user_hierarchy_survey_uid_parent_user_uid",
+            ),
+            (
+                "SELECT * FROM webapp.user_target_mapping WHERE user_uid = 1",
+                "ix_user_target_mapping_user_uid",
+            ),
+            (
+                "SELECT * FROM webapp.survey_notifications WHERE survey_uid = 1 AND module_id = 1 AND severity = 'error' AND resolution_status = 'in progress'",
+                "ix_survey_notifications_survey_module_severity_resolution",
+            ),
+            (
+                "SELECT * FROM webapp.locations WHERE parent_location_uid = 1",
+                "ix_locations_parent_location_uid",
+            ),
+            (
+                "SELECT * FROM webapp.users WHERE roles @> ARRAY[1]",
+                "ix_users_roles",
+            ),
+        ],
+    )
+    def test_query_uses_index(self, app, query, index_name):
+        """
+        Test that the EXPLAIN plan of each hot-path query uses its index
+        """
+
+        with app.app_context():
+            db.session.execute(text("SET LOCAL enable_seqscan = off"))
+            plan = db.session.execute(text(f"EXPLAIN {query}")).scalars().all()
+            db.session.rollback()
+
+        assert index_name in "\n".join(plan)
+
+    def test_supervisors_query_uses_roles_index(self, app):
+        """
+        Test that the supervisors query built by the mapping helpers filters users
+        by role with the index on users.roles
+        """
+
+        from app.blueprints.mapping.queries import (
+            build_supervisors_with_mapping_criteria_values_subquery,
+        )
+
+        with app.app_context():
+            supervisors_subquery = (
+                build_supervisors_with_mapping_criteria_values_subquery(
+                    survey_uid=1, bottom_level_role_uid=1, mapping_criteria=["Gender"]
+                )
+            )
+            statement = (
+                db.session.query(supervisors_subquery)
+                .statement.compile(dialect=db.engine.dialect)
+            )
+
+            db.session.execute(text("SET LOCAL enable_seqscan = off"))
+            plan = [
+                row[0]
+                for row in db.session.connection().exec_driver_sql(
+                    f"EXPLAIN {statement}", statement.params
+                )
+            ]
+            db.session.rollback()
+
+        assert "ix_users_roles" in "\n".join(plan)
@@ -38,6 +38,75 @@ class TestLocations:
 
         yield
 
+    @pytest.fixture()
+    def create_module_questionnaire(
+        self, client, login_test_user, csrf_token, test_user_credentials, create_survey
+    ):
+        """
+        Insert new module_questionnaire as a setup step for the location upload tests
+        """
+
+        payload = {
+            "assignment_process": "Manual",
+            "language_location_mapping": False,
+            "reassignment_required": False,
+            "target_mapping_criteria": ["Location"],
+            "surveyor_mapping_criteria": ["Location"],
+            "supervisor_hierarchy_exists": False,
+            "supervisor_surveyor_relation": "1:many",
+            "survey_uid": 1,
+            "target_assignment_criteria": ["Location of surveyors"],
+        }
+
+        response = client.put(
+            "/api/module-questionnaire/1",
+            json=payload,
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 200
+
+        yield
+
+    @pytest.fixture()
+    def create_form(
+        self,
+        client,
+        login_test_user,
+        csrf_token,
+        create_survey,
+        create_module_questionnaire,
+    ):
+        """
+        Insert new form as a setup step for the location upload tests
+        The locations upload requires a parent form for the survey
+        """
+
+        payload = {
+            "survey_uid": 1,
+            "scto_form_id": "test_scto_input_output",
+            "form_name": "Agrifieldnet Main Form",
+            "tz_name": "Asia/Kolkata",
+            "scto_server_name": "dod",
+            "encryption_key_shared": True,
+            "server_access_role_granted": True,
+            "server_access_allowed": True,
+            "form_type": "parent",
+            "parent_form_uid": None,
+            "dq_form_type": None,
+            "number_of_attempts": 7,
+        }
+
+        response = client.post(
+            "/api/forms",
+            json=payload,
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 201
+
+        yield
+
     @pytest.fixture()
     def create_geo_levels(self, client, login_test_user, csrf_token, create_survey):
         """
@@ -72,7 +141,7 @@ class TestLocations:
 
     @pytest.fixture()
     def create_geo_levels_for_locations_file(
-        self, client, login_test_user, csrf_token, create_survey
+        self, client, login_test_user, csrf_token, create_form
     ):
         """
         Insert new geo levels as a setup step for the location upload tests
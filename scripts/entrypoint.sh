@@ -3,11 +3,23 @@
 set -e
 echo "Starting"
 
+# Gunicorn concurrency settings, see "Running the API with gunicorn" in the README
+GUNICORN_WORKER_CLASS=${GUNICORN_WORKER_CLASS:-gevent}
+GUNICORN_WORKERS=${GUNICORN_WORKERS:-2}
+GUNICORN_WORKER_CONNECTIONS=${GUNICORN_WORKER_CONNECTIONS:-100}
+GUNICORN_THREADS=${GUNICORN_THREADS:-8}
+
+if [ "$GUNICORN_WORKER_CLASS" = "gthread" ]; then
+	GUNICORN_CONCURRENCY_ARGS="--threads $GUNICORN_THREADS"
+else
+	GUNICORN_CONCURRENCY_ARGS="--worker-connections $GUNICORN_WORKER_CONNECTIONS"
+fi
+
 case "$1" in
   api)
 	if [ -z $2 ]; then 
 
-	gunicorn --chdir app --timeout 300 "app:create_app()" -b "0.0.0.0:5001" -k gevent -w 2
+	gunicorn --chdir app --timeout 300 "app:create_app()" -b "0.0.0.0:5001" -k $GUNICORN_WORKER_CLASS -w $GUNICORN_WORKERS $GUNICORN_CONCURRENCY_ARGS
 	
 	else
 	flask db upgrade
@@ -15,7 +27,7 @@ case "$1" in
 	echo "Upgraded......"
 
 	echo "Starting API..........."
-	gunicorn --chdir app --timeout 300 "app:create_app()" -b "0.0.0.0:5001" -k gevent -w 2
+	gunicorn --chdir app --timeout 300 "app:create_app()" -b "0.0.0.0:5001" -k $GUNICORN_WORKER_CLASS -w $GUNICORN_WORKERS $GUNICORN_CONCURRENCY_ARGS
 	fi
 	;;
-esac
\ No newline at end of file
+esac
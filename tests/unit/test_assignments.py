@@ -2071,6 +2071,44 @@ class TestAssignments:
         checkdiff = jsondiff.diff(expected_response, response.json)
         assert checkdiff == {}
 
+    def test_survey_context_shared_within_request(
+        self, app, create_geo_levels, create_roles
+    ):
+        """
+        Test that the survey context is loaded once per request and dropped
+        when the session writes changes
+        """
+
+        from app.blueprints.locations.models import GeoLevel
+        from app.utils.survey_context import SurveyContext
+
+        with app.test_request_context():
+            survey_context = SurveyContext.for_form(1)
+
+            assert SurveyContext.for_form(1) is survey_context
+            assert SurveyContext.for_survey(1) is survey_context
+            assert SurveyContext.for_form(999) is None
+
+            assert [
+                role["role_name"]
+                for role in survey_context.role_hierarchy.ordered_roles
+            ] == ["Core User", "Cluster Coordinator", "Regional Coordinator"]
+            assert [
+                geo_level.geo_level_name
+                for geo_level in survey_context.geo_level_hierarchy.ordered_geo_levels
+            ] == ["District", "Mandal", "PSU"]
+
+            GeoLevel.query.filter_by(geo_level_uid=3).first().geo_level_name = "Ward"
+            db.session.flush()
+
+            survey_context = SurveyContext.for_form(1)
+            assert [
+                geo_level.geo_level_name
+                for geo_level in survey_context.geo_level_hierarchy.ordered_geo_levels
+            ] == ["District", "Mandal", "Ward"]
+
+            db.session.rollback()
+
     def test_assignments_no_targets(
         self,
         client,
@@ -1293,6 +1293,88 @@ class TestEmails:
             checkdiff = jsondiff.diff(expected_response, response.json)
             assert checkdiff == {}
 
+    def test_emails_get_configs_column_catalog_refreshed(
+        self,
+        client,
+        csrf_token,
+        login_test_user,
+        create_email_config,
+    ):
+        """
+        Test that the default email variables are refreshed when the enumerator
+        column config of the form changes after they were first computed
+        """
+
+        default_variables = [
+            "Surveyor Name",
+            "Surveyor Email",
+            "Surveyor Language",
+            "Surveyor ID",
+            "Assignment Date",
+            "Survey Name",
+            "Schedule Name",
+            "Config Name",
+            "SCTO Form ID",
+        ]
+
+        response = client.get(
+            "api/emails/config?form_uid=1",
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 200
+        assert (
+            response.json["data"][0]["email_source_columns"]
+            == ["test_column"] + default_variables
+        )
+
+        payload = {
+            "form_uid": 1,
+            "column_config": [
+                {
+                    "column_name": column_name,
+                    "column_type": "personal_details",
+                    "bulk_editable": False,
+                    "allow_null_values": False,
+                }
+                for column_name in [
+                    "enumerator_id",
+                    "name",
+                    "email",
+                    "mobile_primary",
+                    "language",
+                    "home_address",
+                    "gender",
+                ]
+            ]
+            + [
+                {
+                    "column_name": "Age",
+                    "column_type": "custom_fields",
+                    "bulk_editable": False,
+                    "allow_null_values": True,
+                },
+            ],
+        }
+        response = client.put(
+            "/api/enumerators/column-config",
+            query_string={"form_uid": 1},
+            json=payload,
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 200
+
+        response = client.get(
+            "api/emails/config?form_uid=1",
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 200
+        assert response.json["data"][0]["email_source_columns"] == [
+            "test_column"
+        ] + default_variables + ["Enumerators : Age"]
+
     def test_emails_update_config(
         self, client, csrf_token, create_email_config, user_permissions, request
     ):
@@ -3138,6 +3220,49 @@ class TestEmails:
             )
             assert checkdiff == {}
 
+    def test_emails_bulk_create_templates_existing_language(
+        self, client, csrf_token, login_test_user, create_email_template
+    ):
+        """
+        Test that bulk creating templates fails without creating any template
+        if one of the languages already has a template for the config
+        """
+
+        payload = {
+            "email_config_uid": create_email_template["email_config_uid"],
+            "templates": [
+                {
+                    "subject": "Test Assignments Email",
+                    "language": language,
+                    "content": "Test Content",
+                    "variable_list": [],
+                    "table_list": [],
+                }
+                for language in ["hindi", "english"]
+            ],
+        }
+
+        response = client.post(
+            "/api/emails/templates",
+            json=payload,
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 400
+        assert response.json == {
+            "error": "Email Template already exists for english, Use PUT methood for update"
+        }
+
+        get_response = client.get(
+            f"api/emails/template?email_config_uid={create_email_template['email_config_uid']}",
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert get_response.status_code == 200
+        assert [template["language"] for template in get_response.json["data"]] == [
+            "english"
+        ]
+
     def test_emails_update_template(
         self, client, csrf_token, create_email_template, user_permissions, request
     ):
@@ -4181,6 +4306,81 @@ class TestEmails:
 
             assert checkdiff == {}
 
+    def test_email_get_delivery_report_date_range_pagination(
+        self,
+        client,
+        csrf_token,
+        login_test_user,
+        create_email_delivery_report,
+    ):
+        """
+        Test filtering delivery reports by slot date and paginating over slots
+        """
+
+        payload = {
+            "form_uid": 1,
+            "reports": [
+                {
+                    "email_config_uid": 1,
+                    "email_schedule_uid": 1,
+                    "delivery_time": f"{slot_date} 00:00:00",
+                    "slot_date": slot_date,
+                    "slot_time": "00:00:00",
+                    "slot_type": "schedule",
+                    "enumerator_status": [
+                        {
+                            "enumerator_id": "0294612",
+                            "status": "sent",
+                        },
+                    ],
+                }
+                for slot_date in ["2021-06-02", "2021-06-03"]
+            ],
+        }
+
+        response = client.post(
+            "/api/emails/report",
+            json=payload,
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 200
+
+        response = client.get(
+            "/api/emails/report",
+            query_string={
+                "email_config_uid": 1,
+                "email_schedule_uid": 1,
+                "slot_type": "schedule",
+                "from_date": "2021-06-02",
+                "page": 2,
+                "per_page": 1,
+            },
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 200
+
+        assert response.json["pagination"] == {
+            "count": 2,
+            "page": 2,
+            "per_page": 1,
+            "pages": 2,
+        }
+        assert len(response.json["data"]) == 1
+        assert response.json["data"][0]["slot_date"] == "Thu, 03 Jun 2021 00:00:00 GMT"
+        assert response.json["data"][0]["enumerator_status"] == [
+            {
+                "enumerator_email": "eric.dodge@idinsight.org",
+                "enumerator_id": "0294612",
+                "enumerator_name": "Eric Dodge",
+                "error_message": None,
+                "status": "sent",
+                "supervisor_email": "newuser3@example.com",
+                "supervisor_name": "John Doe",
+            }
+        ]
+
     def test_email_get_delivery_report_exception(
         self,
         client,
@@ -3900,6 +3900,7 @@ class TestEnumerators:
         )
         print(response.json)
         assert response.status_code == 200
+        assert response.json["data"] == {"updated_count": 2}
 
         expected_response = {
             "data": [
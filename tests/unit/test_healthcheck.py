@@ -10,3 +10,18 @@ def test_healthcheck(client):
     response = client.get("/api/healthcheck")
 
     assert response.status_code == 200
+
+
+@pytest.mark.healthcheck
+def test_db_pool_status(client):
+    """
+    Check the DB pool metrics include the checkout wait times
+    """
+
+    client.get("/api/healthcheck")
+    response = client.get("/api/healthcheck/db-pool")
+
+    assert response.status_code == 200
+    assert response.json["data"]["checkouts"] >= 1
+    assert response.json["data"]["timeouts"] == 0
+    assert "max_wait_time_ms" in response.json["data"]
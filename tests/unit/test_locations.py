@@ -1,4 +1,5 @@
 import base64
+import io
 from pathlib import Path
 
 import jsondiff
@@ -1249,6 +1250,59 @@ class TestLocations:
         checkdiff = jsondiff.diff(expected_response, response.json)
         assert checkdiff == {}
 
+    def test_get_locations_csv_export(
+        self, client, login_test_user, upload_locations_csv
+    ):
+        """
+        Test that the locations can be exported in wide format as a CSV file
+        """
+
+        filepath = (
+            Path(__file__).resolve().parent
+            / f"data/file_uploads/sample_locations_small.csv"
+        )
+
+        df = pd.read_csv(filepath, dtype=str)
+        df = df[
+            [
+                "district_id",
+                "district_name",
+                "mandal_id",
+                "mandal_name",
+                "psu_id",
+                "psu_name",
+            ]
+        ].rename(
+            columns={
+                "district_id": "District ID",
+                "district_name": "District Name",
+                "mandal_id": "Mandal ID",
+                "mandal_name": "Mandal Name",
+                "psu_id": "PSU ID",
+                "psu_name": "PSU Name",
+            }
+        )
+
+        response = client.get(
+            "/api/locations", query_string={"survey_uid": 1, "file_format": "csv"}
+        )
+
+        assert response.status_code == 200
+        assert response.mimetype == "text/csv"
+        assert (
+            response.headers["Content-Disposition"]
+            == "attachment; filename=locations_1.csv"
+        )
+
+        response_df = pd.read_csv(io.StringIO(response.text), dtype=str)
+        pd.testing.assert_frame_equal(response_df, df)
+
+        # Check that an invalid file format is rejected
+        response = client.get(
+            "/api/locations", query_string={"survey_uid": 1, "file_format": "xlsx"}
+        )
+        assert response.status_code == 400
+
     def test_update_survey_prime_geo_level(
         self,
         client,
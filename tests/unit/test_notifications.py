@@ -1939,6 +1939,87 @@ class TestNotifications:
 
         assert checkdiff == {}
 
+    def test_notifications_get_user_notifications_paginated(
+        self,
+        client,
+        login_test_user,
+        create_user_notification,
+        create_second_survey_notification_for_DQ,
+        csrf_token,
+    ):
+        """
+        TEST Get user notifications page by page using the returned cursor
+        Expect: Same notifications in the same order as the unpaginated response
+        """
+
+        response = client.get(
+            "/api/notifications",
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 200
+        all_notifications = response.json["data"]
+        assert len(all_notifications) == 5
+
+        paginated_notifications = []
+        query_string = {"limit": 2}
+        while True:
+            response = client.get(
+                "/api/notifications",
+                query_string=query_string,
+                content_type="application/json",
+                headers={"X-CSRF-Token": csrf_token},
+            )
+            assert response.status_code == 200
+            assert len(response.json["data"]) <= 2
+
+            paginated_notifications += response.json["data"]
+
+            next_cursor = response.json["pagination"]["next_cursor"]
+            if next_cursor is None:
+                break
+            query_string["cursor"] = next_cursor
+
+        assert paginated_notifications == all_notifications
+
+        response = client.get(
+            "/api/notifications",
+            query_string={"cursor": "not a cursor"},
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 400
+
+    def test_notifications_get_user_notifications_count(
+        self,
+        client,
+        login_test_user,
+        create_user_notification,
+        create_second_survey_notification_for_DQ,
+        csrf_token,
+    ):
+        """
+        TEST Get the number of notifications for the notifications badge
+        Expect: All notifications are unresolved, none are done
+        """
+
+        response = client.get(
+            "/api/notifications/count",
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 200
+        assert response.json == {"success": True, "data": {"count": 5}}
+
+        response = client.get(
+            "/api/notifications/count",
+            query_string={"resolution_status": "done"},
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 200
+        assert response.json == {"success": True, "data": {"count": 0}}
+
     def test_get_errored_modules(
         self,
         client,
@@ -2051,6 +2132,60 @@ class TestNotifications:
         checkdiff = jsondiff.diff(expected_response, response_json)
         assert checkdiff == {}
 
+    def test_create_bulk_notifications_repeated_action(
+        self,
+        client,
+        login_test_user,
+        csrf_token,
+        create_form,
+        upload_targets_csv,
+        upload_enumerators_csv,
+    ):
+        """
+        Test that repeating an action in the bulk payload creates each
+        survey notification only once
+
+        Expect: Success, no duplicate notifications
+        """
+        payload = {
+            "actions": [
+                {
+                    "survey_uid": 1,
+                    "action": "Location hierarchy changed",
+                    "form_uid": 1,
+                }
+            ]
+            * 2
+        }
+        response = client.post(
+            "/api/notifications/action/bulk",
+            json=payload,
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        print(response.json)
+        assert response.status_code == 200
+        assert len(response.json["data"]) == 2
+
+        get_response = client.get(
+            "/api/notifications",
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert get_response.status_code == 200
+
+        notification_keys = [
+            (
+                notification["survey_uid"],
+                notification["module_id"],
+                notification["severity"],
+            )
+            for notification in get_response.json["data"]
+            if notification["type"] == "survey"
+        ]
+        assert len(notification_keys) > 0
+        assert len(notification_keys) == len(set(notification_keys))
+
     def test_create_bulk_notifications_error(
         self,
         client,
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+from flask import g, session
+from sqlalchemy import insert, select
+
+from app import db
+from app.blueprints.auth.models import User
+from app.utils.replica_utils import use_read_replica
+
+
+@pytest.mark.replica
+class TestReadReplica:
+    def test_reads_are_routed_to_replica(self, app):
+        """
+        Test that reads go to the replica and writes to the primary when the
+        replica is enabled for the request
+        """
+
+        with app.test_request_context():
+            g.use_read_replica = True
+
+            assert db.session.get_bind(clause=select(User)) is db.engines[
+                "read_replica"
+            ]
+            assert db.session.get_bind(clause=insert(User)) is db.engine
+
+            g.use_read_replica = False
+
+            assert db.session.get_bind(clause=select(User)) is db.engine
+
+    def test_reads_stay_on_primary_after_write(self, app):
+        """
+        Test that the decorator keeps a user's reads on the primary for the lag
+        window after their last write
+        """
+
+        @use_read_replica
+        def read_route():
+            return g.use_read_replica
+
+        with app.test_request_context():
+            session["last_write_at"] = time.time()
+            assert read_route() is False
+
+            session["last_write_at"] = (
+                time.time() - app.config["READ_REPLICA_LAG_WINDOW"]
+            )
+            assert read_route() is True
+
+    def test_write_is_recorded_in_session(self, client, login_test_user):
+        """
+        Test that a successful write by a logged in user is recorded in their session
+        """
+
+        with client.session_transaction() as user_session:
+            assert user_session["last_write_at"] <= time.time()
+
+    def test_get_users_from_replica(self, app, client, login_test_user):
+        """
+        Test that a read-only route returns the same data when served by the replica
+        """
+
+        app.config["READ_REPLICA_LAG_WINDOW"] = 0
+
+        response = client.get("/api/users")
+
+        assert response.status_code == 200
+        assert len(response.json) >= 1
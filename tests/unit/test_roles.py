@@ -749,3 +749,39 @@ class TestRoles:
         )
 
         assert response.status_code == 200
+
+    def test_role_hierarchy_memoized_until_roles_change(self):
+        """
+        Test that the role hierarchy is resolved once for the same roles and
+        recomputed when a role changes
+        """
+
+        from app.blueprints.roles.errors import InvalidRoleHierarchyError
+        from app.blueprints.roles.utils import RoleHierarchy, _resolve_role_hierarchy
+
+        roles = [
+            {"role_uid": 2, "role_name": "Cluster Coordinator", "reporting_role_uid": 1},
+            {"role_uid": 1, "role_name": "Core User", "reporting_role_uid": None},
+        ]
+
+        _resolve_role_hierarchy.cache_clear()
+
+        assert [role["role_uid"] for role in RoleHierarchy(roles).ordered_roles] == [
+            1,
+            2,
+        ]
+        assert [role["role_uid"] for role in RoleHierarchy(roles).ordered_roles] == [
+            1,
+            2,
+        ]
+        assert _resolve_role_hierarchy.cache_info().hits == 1
+
+        roles[0]["reporting_role_uid"] = 2
+
+        with pytest.raises(InvalidRoleHierarchyError) as e:
+            RoleHierarchy(roles)
+
+        assert e.value.role_hierarchy_errors == [
+            "All roles in the hierarchy should be able to be connected back to the top level role via a chain of parent role references. The current hierarchy has 1 roles that cannot be connected:\nCluster Coordinator",
+            "Role 'Cluster Coordinator' is referenced as its own parent. Self-referencing is not allowed.",
+        ]
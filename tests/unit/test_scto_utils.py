@@ -0,0 +1,204 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from app.utils.scto_utils import SCTO_COMPLETION_DATE_FORMAT, SurveyCTOFetcher
+
+
+class StubSurveyCTOHandler(BaseHTTPRequestHandler):
+    """
+    Minimal stand-in for the SurveyCTO form data API
+    """
+
+    # form_id -> list of submissions, and the (method, form_id, date) of each request
+    submissions = {}
+    requests = []
+
+    def do_GET(self):
+        self.__respond("GET")
+
+    def do_POST(self):
+        self.__respond("POST")
+
+    def __respond(self, method):
+        if "Authorization" not in self.headers:
+            self.send_response(401)
+            self.end_headers()
+            return
+
+        url = urlparse(self.path)
+        form_id = url.path.split("/")[-1]
+        date = parse_qs(url.query)["date"][0]
+        self.requests.append((method, form_id, date))
+
+        submissions = self.submissions.get(form_id, [])
+        if date != "0":
+            oldest_completion_date = datetime.strptime(
+                date, SCTO_COMPLETION_DATE_FORMAT
+            )
+            submissions = [
+                submission
+                for submission in submissions
+                if datetime.strptime(
+                    submission["CompletionDate"], SCTO_COMPLETION_DATE_FORMAT
+                )
+                > oldest_completion_date
+            ]
+
+        body = json.dumps(submissions).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.mark.scto
+class TestSurveyCTOFetcher:
+    @pytest.fixture()
+    def stub_server(self):
+        """
+        Run a stub SurveyCTO server on a free local port
+        """
+
+        StubSurveyCTOHandler.submissions = {
+            "test_form": [
+                {"KEY": "uuid:1", "CompletionDate": "Jan 5, 2024 9:15:00 AM"},
+                {"KEY": "uuid:2", "CompletionDate": "Jan 6, 2024 4:30:00 PM"},
+            ],
+            "test_form_2": [
+                {"KEY": "uuid:3", "CompletionDate": "Feb 1, 2024 10:00:00 AM"},
+            ],
+        }
+        StubSurveyCTOHandler.requests = []
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubSurveyCTOHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        yield f"http://127.0.0.1:{server.server_port}"
+
+        server.shutdown()
+        server.server_close()
+
+    def test_get_form_data_incremental(self, stub_server, tmp_path):
+        """
+        Test that submissions are downloaded once and later fetches only request
+        submissions completed after the latest CompletionDate seen
+        """
+
+        fetcher = SurveyCTOFetcher(
+            "test_server", "user", "password", base_url=stub_server, cache_dir=tmp_path
+        )
+
+        submissions = fetcher.get_form_data("test_form")
+
+        assert [submission["KEY"] for submission in submissions] == [
+            "uuid:1",
+            "uuid:2",
+        ]
+        assert StubSurveyCTOHandler.requests == [("GET", "test_form", "0")]
+        assert Path(tmp_path, "test_server", "test_form.json").exists()
+
+        # Add a new submission and fetch again with a new fetcher using the same cache
+        StubSurveyCTOHandler.submissions["test_form"].append(
+            {"KEY": "uuid:4", "CompletionDate": "Jan 8, 2024 11:00:00 AM"}
+        )
+        fetcher = SurveyCTOFetcher(
+            "test_server", "user", "password", base_url=stub_server, cache_dir=tmp_path
+        )
+
+        submissions = fetcher.get_form_data("test_form")
+
+        assert [submission["KEY"] for submission in submissions] == [
+            "uuid:1",
+            "uuid:2",
+            "uuid:4",
+        ]
+        assert StubSurveyCTOHandler.requests[-1] == (
+            "GET",
+            "test_form",
+            "Jan 6, 2024 4:30:00 PM",
+        )
+
+    def test_get_form_data_encrypted_not_cached(self, stub_server, tmp_path):
+        """
+        Test that the private key is posted for encrypted forms and the
+        decrypted submissions are not cached on disk
+        """
+
+        fetcher = SurveyCTOFetcher(
+            "test_server", "user", "password", base_url=stub_server, cache_dir=tmp_path
+        )
+
+        submissions = fetcher.get_form_data("test_form", key="private-key")
+
+        assert len(submissions) == 2
+        assert StubSurveyCTOHandler.requests == [("POST", "test_form", "0")]
+        assert not Path(tmp_path, "test_server", "test_form.json").exists()
+
+    def test_get_form_data_encrypted_since_date(self, stub_server, tmp_path):
+        """
+        Test that only the submissions completed after the given date are
+        downloaded for an encrypted form, without using the cache
+        """
+
+        fetcher = SurveyCTOFetcher(
+            "test_server", "user", "password", base_url=stub_server, cache_dir=tmp_path
+        )
+
+        submissions = fetcher.get_form_data(
+            "test_form", key="private-key", oldest_completion_date=datetime(2024, 1, 6)
+        )
+
+        assert [submission["KEY"] for submission in submissions] == ["uuid:2"]
+        assert StubSurveyCTOHandler.requests == [
+            ("POST", "test_form", "Jan 06, 2024 12:00:00 AM")
+        ]
+        assert not Path(tmp_path, "test_server").exists()
+
+    def test_cache_permissions_and_expiry(self, stub_server, tmp_path):
+        """
+        Test that the cache is only accessible by its owner and that expired
+        cache files are downloaded again in full
+        """
+
+        cache_dir = tmp_path / "scto_cache"
+        fetcher = SurveyCTOFetcher(
+            "test_server",
+            "user",
+            "password",
+            base_url=stub_server,
+            cache_dir=cache_dir,
+            cache_ttl=60,
+        )
+
+        fetcher.get_form_data("test_form")
+
+        cache_path = Path(cache_dir, "test_server", "test_form.json")
+        assert cache_dir.stat().st_mode & 0o777 == 0o700
+        assert cache_path.parent.stat().st_mode & 0o777 == 0o700
+        assert cache_path.stat().st_mode & 0o777 == 0o600
+
+        # Age the cache file past the TTL
+        expired_time = time.time() - 120
+        os.utime(cache_path, (expired_time, expired_time))
+
+        submissions = fetcher.get_form_data("test_form")
+
+        assert len(submissions) == 2
+        assert StubSurveyCTOHandler.requests == [
+            ("GET", "test_form", "0"),
+            ("GET", "test_form", "0"),
+        ]
+        assert cache_path.exists()
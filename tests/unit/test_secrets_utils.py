@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from app.utils.secrets_utils import (
+    EnvSecretsBackend,
+    FileSecretsBackend,
+    SecretsProvider,
+)
+
+
+@pytest.mark.secrets
+class TestSecrets:
+    @pytest.fixture()
+    def secrets_file(self, tmp_path):
+        """
+        Write a local secrets file
+        """
+
+        filepath = tmp_path / "secrets.json"
+        with open(filepath, "w") as f:
+            json.dump(
+                {
+                    "test-surveycto-server": {"username": "user", "password": "pw"},
+                    "test-encryption-key": "private-key",
+                },
+                f,
+            )
+
+        yield filepath
+
+    @pytest.fixture()
+    def file_secrets_backend_app(self, app, secrets_file):
+        """
+        Point the app at the local secrets file for the duration of a test
+        """
+
+        original_config = {
+            key: app.config.get(key) for key in ["SECRETS_BACKEND", "SECRETS_FILE"]
+        }
+        app.config.update(SECRETS_BACKEND="file", SECRETS_FILE=str(secrets_file))
+        app.extensions.pop("secrets_provider", None)
+
+        yield app
+
+        app.config.update(original_config)
+        app.extensions.pop("secrets_provider", None)
+
+    def test_get_aws_secret_file_backend(self, file_secrets_backend_app):
+        """
+        Test that get_aws_secret reads from the configured local backend
+        """
+
+        from app.utils.utils import get_aws_secret
+
+        with file_secrets_backend_app.app_context():
+            secret = get_aws_secret(
+                "test-surveycto-server", "ap-south-1", is_global_secret=True
+            )
+            assert json.loads(secret) == {"username": "user", "password": "pw"}
+
+            assert get_aws_secret("test-encryption-key", "ap-south-1") == "private-key"
+
+    def test_secrets_cached_until_ttl(self, secrets_file):
+        """
+        Test that secrets are served from the cache until the TTL expires
+        """
+
+        provider = SecretsProvider(FileSecretsBackend(secrets_file), ttl=300)
+        assert provider.get_secret("test-encryption-key", "ap-south-1") == "private-key"
+
+        with open(secrets_file, "w") as f:
+            json.dump({"test-encryption-key": "rotated-key"}, f)
+
+        assert provider.get_secret("test-encryption-key", "ap-south-1") == "private-key"
+
+        provider.clear()
+        assert provider.get_secret("test-encryption-key", "ap-south-1") == "rotated-key"
+
+        # A zero TTL always reads from the backend
+        provider = SecretsProvider(FileSecretsBackend(secrets_file), ttl=0)
+        assert provider.get_secret("test-encryption-key", "ap-south-1") == "rotated-key"
+
+    def test_env_backend(self, monkeypatch):
+        """
+        Test that secrets can be read from environment variables
+        """
+
+        monkeypatch.setenv("SECRET_TEST_SURVEYCTO_SERVER", '{"username": "user"}')
+
+        provider = SecretsProvider(EnvSecretsBackend())
+        assert (
+            provider.get_secret("test-surveycto-server", "ap-south-1")
+            == '{"username": "user"}'
+        )
+
+        with pytest.raises(KeyError):
+            provider.get_secret("missing-secret", "ap-south-1")
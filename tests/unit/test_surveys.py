@@ -690,6 +690,50 @@ class TestSurveys:
         checkdiff = jsondiff.diff(expected_response, response.json)
         assert checkdiff == {}
 
+    def test_get_surveys_search_pagination(
+        self, client, login_test_user, create_surveys, test_user_credentials
+    ):
+        """
+        Test that the surveys can be searched and paginated with a cursor
+        """
+        update_logged_in_user_roles(
+            client,
+            test_user_credentials,
+            is_survey_admin=True,
+            survey_uid=1,
+            is_super_admin=True,
+        )
+
+        login_user(client, test_user_credentials)
+
+        response = client.get("/api/surveys", query_string={"search": "USER SURVEY"})
+        assert response.status_code == 200
+        assert [survey["survey_uid"] for survey in response.json["data"]] == [2]
+        assert "pagination" not in response.json
+
+        # LIKE wildcards in the search are matched literally
+        response = client.get("/api/surveys", query_string={"search": "%"})
+        assert response.status_code == 200
+        assert response.json["data"] == []
+
+        response = client.get(
+            "/api/surveys", query_string={"search": "survey", "limit": 1}
+        )
+        assert response.status_code == 200
+        assert [survey["survey_uid"] for survey in response.json["data"]] == [1]
+        assert response.json["data"][0]["error"] is False
+        assert response.json["pagination"] == {"limit": 1, "next_cursor": 1}
+
+        response = client.get(
+            "/api/surveys", query_string={"search": "survey", "limit": 1, "cursor": 1}
+        )
+        assert response.status_code == 200
+        assert [survey["survey_uid"] for survey in response.json["data"]] == [2]
+        assert response.json["pagination"] == {"limit": 1, "next_cursor": None}
+
+        response = client.get("/api/surveys", query_string={"limit": 0})
+        assert response.status_code == 400
+
     def test_get_surveys_for_survey_admin_user(
         self, client, login_test_user, create_surveys, test_user_credentials
     ):
@@ -3842,6 +3842,7 @@ class TestTargets:
 
         if expected_permission:
             assert response.status_code == 200
+            assert response.json["data"] == {"updated_count": 2}
 
             expected_response = {
                 "data": [
@@ -4086,6 +4087,7 @@ class TestTargets:
             headers={"X-CSRF-Token": csrf_token},
         )
         assert response.status_code == 200
+        assert response.json["data"] == {"inserted_count": 1, "updated_count": 2}
 
         expected_response = {
             "data": [
@@ -4247,7 +4249,7 @@ class TestTargets:
                     "target_assignable": None,
                     "target_id": "3",
                     "target_locations": None,
-                    "target_uid": 3,
+                    "target_uid": 5,
                     "webapp_tag_color": None,
                     "scto_fields": None,
                 },
@@ -1,3 +1,4 @@
+import base64
 import pytest
 import json
 import jsondiff
@@ -257,3 +258,151 @@ class TestUserHierarchy:
         )
         assert response_get_user_hierarchy.status_code == 404
         assert b"User hierarchy not found" in response_get_user_hierarchy.data
+
+    def test_import_user_hierarchy(
+        self, client, login_test_user, csrf_token, create_survey, create_roles
+    ):
+        """
+        Test importing the full user hierarchy of a survey as JSON and as a csv file
+        Expect the hierarchy to be replaced and invalid parent roles to be rejected
+        """
+        survey_uid = create_survey.get("data", {}).get("survey", {}).get("survey_uid")
+        core_role_uid = create_roles.get("data")[0].get("role_uid")
+        coordinator_role_uid = create_roles.get("data")[1].get("role_uid")
+
+        user_uids = []
+        for i, role_uid in enumerate(
+            [core_role_uid, coordinator_role_uid, coordinator_role_uid]
+        ):
+            response = client.post(
+                "/api/users",
+                json={
+                    "email": f"importuser{i + 1}@example.com",
+                    "first_name": f"Import{i + 1}",
+                    "last_name": f"User{i + 1}",
+                    "roles": [str(role_uid)],
+                },
+                content_type="application/json",
+                headers={"X-CSRF-Token": csrf_token},
+            )
+            assert response.status_code == 200
+            user_uids.append(response.json["user"]["user_uid"])
+
+        core_user_uid, coordinator_1_uid, coordinator_2_uid = user_uids
+
+        response = client.put(
+            "/api/user-hierarchy/import",
+            json={
+                "survey_uid": survey_uid,
+                "users": [
+                    {
+                        "user_uid": core_user_uid,
+                        "role_uid": core_role_uid,
+                        "parent_user_uid": None,
+                        "location_uids": [],
+                    },
+                    {
+                        "user_uid": coordinator_1_uid,
+                        "role_uid": coordinator_role_uid,
+                        "parent_user_uid": core_user_uid,
+                        "location_uids": [],
+                    },
+                    {
+                        "user_uid": coordinator_2_uid,
+                        "role_uid": coordinator_role_uid,
+                        "parent_user_uid": core_user_uid,
+                        "location_uids": [],
+                    },
+                ],
+            },
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 200
+        assert response.json["data"] == {"user_count": 3}
+
+        response = client.get(
+            "/api/user-hierarchy",
+            query_string={"survey_uid": survey_uid, "user_uid": coordinator_2_uid},
+        )
+        assert response.status_code == 200
+        assert response.json["data"]["parent_user_uid"] == core_user_uid
+
+        # A coordinator cannot report to another coordinator
+        response = client.put(
+            "/api/user-hierarchy/import",
+            json={
+                "survey_uid": survey_uid,
+                "users": [
+                    {
+                        "user_uid": core_user_uid,
+                        "role_uid": core_role_uid,
+                        "parent_user_uid": None,
+                        "location_uids": [],
+                    },
+                    {
+                        "user_uid": coordinator_1_uid,
+                        "role_uid": coordinator_role_uid,
+                        "parent_user_uid": coordinator_2_uid,
+                        "location_uids": [],
+                    },
+                    {
+                        "user_uid": coordinator_2_uid,
+                        "role_uid": coordinator_role_uid,
+                        "parent_user_uid": core_user_uid,
+                        "location_uids": [],
+                    },
+                ],
+            },
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 422
+        assert response.json["errors"] == [
+            f"User with user_uid='{coordinator_1_uid}' has the role 'Regional Coordinator' and should have a parent user with the role 'Core User'. The parent user with user_uid='{coordinator_2_uid}' does not have this role."
+        ]
+
+        # Import a smaller hierarchy from a csv file
+        csv_string = (
+            "user_uid,role_uid,parent_user_uid,location_uids\n"
+            f"{core_user_uid},{core_role_uid},,\n"
+            f"{coordinator_1_uid},{coordinator_role_uid},{core_user_uid},\n"
+        )
+        response = client.put(
+            "/api/user-hierarchy/import",
+            json={
+                "survey_uid": survey_uid,
+                "file": base64.b64encode(csv_string.encode("utf-8")).decode("utf-8"),
+            },
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 200
+        assert response.json["data"] == {"user_count": 2}
+
+        # The user not included in the import is removed from the hierarchy
+        response = client.get(
+            "/api/user-hierarchy",
+            query_string={"survey_uid": survey_uid, "user_uid": coordinator_2_uid},
+        )
+        assert response.status_code == 404
+
+        # A short row is rejected with a row level error
+        csv_string = (
+            "user_uid,role_uid,parent_user_uid,location_uids\n"
+            f"{core_user_uid},{core_role_uid},,\n"
+            f"{coordinator_1_uid}\n"
+        )
+        response = client.put(
+            "/api/user-hierarchy/import",
+            json={
+                "survey_uid": survey_uid,
+                "file": base64.b64encode(csv_string.encode("utf-8")).decode("utf-8"),
+            },
+            content_type="application/json",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 422
+        assert response.json["errors"] == [
+            "Row 3 has a value that is not a valid unique id."
+        ]
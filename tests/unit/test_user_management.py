@@ -828,6 +828,131 @@ class TestUserManagement:
         checkdiff = jsondiff.diff(expected_response, response_get_user.json)
         assert checkdiff == {}
 
+    @pytest.fixture()
+    def suppressed_mail_app(self, app):
+        """
+        Record the emails of the app instead of sending them
+        """
+        from app import mail
+
+        app.config.update(MAIL_SUPPRESS_SEND=True)
+        mail.init_app(app)
+
+        yield app
+
+    def test_bulk_add_users(
+        self,
+        suppressed_mail_app,
+        client,
+        login_test_user,
+        csrf_token,
+        test_user_credentials,
+    ):
+        """
+        Test inviting multiple users in one request
+        Expect existing and repeated emails to be skipped and one invitation
+        email to be queued per new user
+        """
+        from app import mail
+
+        app = suppressed_mail_app
+
+        with mail.record_messages() as outbox:
+            response = client.post(
+                "/api/users/bulk",
+                json={
+                    "users": [
+                        {
+                            "email": test_user_credentials["email"],
+                            "first_name": "Existing",
+                            "last_name": "User",
+                        },
+                        {
+                            "email": "bulkuser1@example.com",
+                            "first_name": "Bulk",
+                            "last_name": "User1",
+                            "roles": [],
+                            "gender": "Female",
+                        },
+                        {
+                            "email": "bulkuser2@example.com",
+                            "first_name": "Bulk",
+                            "last_name": "User2",
+                        },
+                        {
+                            "email": "bulkuser1@example.com",
+                            "first_name": "Repeated",
+                            "last_name": "User1",
+                        },
+                    ]
+                },
+                content_type="application/json",
+                headers={"X-CSRF-Token": csrf_token},
+            )
+
+            assert response.status_code == 200
+            assert app.extensions["mail_dispatcher"].join(timeout=10)
+
+        assert app.extensions["mail_dispatcher"].failures == []
+
+        assert [user["email"] for user in response.json["users"]] == [
+            "bulkuser1@example.com",
+            "bulkuser2@example.com",
+        ]
+        assert response.json["skipped_emails"] == [test_user_credentials["email"]]
+        assert sorted(message.recipients[0] for message in outbox) == [
+            "bulkuser1@example.com",
+            "bulkuser2@example.com",
+        ]
+
+        response = client.get(
+            f"/api/users/{response.json['users'][0]['user_uid']}",
+            headers={"X-CSRF-Token": csrf_token},
+        )
+        assert response.status_code == 200
+        assert response.json["first_name"] == "Bulk"
+        assert response.json["gender"] == "Female"
+
+    def test_mail_dispatcher_records_failures(self, suppressed_mail_app):
+        """
+        Test that the dispatcher keeps the recipients of the emails it could not
+        send and stops its worker when the queue is idle
+        """
+        from flask_mail import Message
+
+        from app.utils.mail_utils import MailDispatcher
+
+        class UnreachableMail:
+            def connect(self):
+                raise ConnectionRefusedError("SMTP server unreachable")
+
+        dispatcher = MailDispatcher(
+            suppressed_mail_app, UnreachableMail(), idle_timeout=0.1, max_failures=2
+        )
+
+        # Message reads the default sender from the app
+        with suppressed_mail_app.app_context():
+            dispatcher.send(
+                [
+                    Message(subject="Test", recipients=[f"failed{i}@example.com"])
+                    for i in range(1, 4)
+                ]
+            )
+
+        assert dispatcher.join(timeout=10)
+
+        # Only the last max_failures failures are kept
+        assert dispatcher.pop_failures() == [
+            (["failed2@example.com"], "SMTP server unreachable"),
+            (["failed3@example.com"], "SMTP server unreachable"),
+        ]
+        assert dispatcher.failures == []
+
+        worker = dispatcher._worker
+        if worker is not None:
+            worker.join(timeout=10)
+            assert not worker.is_alive()
+
     def test_add_user_at_survey_level(
         self,
         client,
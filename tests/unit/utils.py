@@ -273,6 +273,12 @@ def delete_scto_question(app, db, form_uid, question_name):
             "DELETE FROM webapp.scto_form_questions WHERE form_uid=:form_uid AND question_name=:question_name",
             {"form_uid": form_uid, "question_name": question_name},
         )
+
+        # Mirror the form definition refresh, which updates the DQ check validity
+        from app.blueprints.dq.utils import refresh_form_dq_check_validity
+
+        refresh_form_dq_check_validity(form_uid)
+
         db.session.commit()
 
 